@@ -0,0 +1,6 @@
+'''
+Tinymovr Studio benchmarks, run against the simulated (InSilico)
+bus. Run with:
+
+    python -m benchmarks [<pattern>] [--save] [--compare=<commit>]
+'''
@@ -0,0 +1,59 @@
+'''
+Benchmarks of payload serialization and deserialization
+'''
+from tinymovr.codec import MultibyteCodec, compile_codec
+from tinymovr.iface.can_bus import can_endpoints
+
+
+class Codec:
+    '''
+    Serialization of a single payload
+    '''
+
+    def setup(self):
+        self.types = can_endpoints["set_pos_setpoint"]["types"]
+        self.values = (1000.0, 10, -20)
+        self.codec = MultibyteCodec()
+        self.compiled = compile_codec(*self.types)
+        self.payload = self.compiled.serialize(self.values)
+
+    def time_serialize(self):
+        self.codec.serialize(self.values, *self.types)
+
+    def time_deserialize(self):
+        self.codec.deserialize(self.payload, *self.types)
+
+    def time_compiled_serialize(self):
+        self.compiled.serialize(self.values)
+
+    def time_compiled_deserialize(self):
+        self.compiled.deserialize(self.payload)
+
+
+class BatchDecode:
+    '''
+    Decoding of a batch of payloads
+    '''
+
+    items = 10000
+
+    def setup(self):
+        self.endpoint = can_endpoints["encoder_estimates"]
+        codec = compile_codec(*self.endpoint["types"])
+        self.payloads = [codec.serialize((float(i), 1.0)) for i in range(self.items)]
+        self.joined = b"".join(self.payloads)
+
+    def time_compiled_loop(self):
+        codec = compile_codec(*self.endpoint["types"])
+        for payload in self.payloads:
+            codec.deserialize(payload)
+
+    def time_vectorized(self):
+        from tinymovr.codec.vectorized import decode_payloads
+
+        decode_payloads(self.joined, self.endpoint)
+
+    def time_vectorized_units(self):
+        from tinymovr.codec.vectorized import decode_payloads
+
+        decode_payloads(self.joined, self.endpoint, units={"position": "turn"})
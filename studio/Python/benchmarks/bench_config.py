@@ -0,0 +1,34 @@
+'''
+Benchmarks of configuration export and restore
+'''
+import os
+import tempfile
+import can
+
+from tinymovr import Tinymovr
+from tinymovr.iface.can_bus import CANBus
+
+
+class Config:
+    '''
+    Export and restore of the configuration of a node
+    '''
+
+    number = 5
+
+    def setup(self):
+        self.bus = can.Bus(interface="insilico", channel="bench")
+        self.tm = Tinymovr(node_id=1, iface=CANBus(self.bus))
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "config.json")
+        self.tm.export_config(self.path)
+
+    def teardown(self):
+        self.dir.cleanup()
+        self.bus.shutdown()
+
+    def time_export_config(self):
+        self.tm.export_config(self.path)
+
+    def time_restore_config(self):
+        self.tm.restore_config(self.path)
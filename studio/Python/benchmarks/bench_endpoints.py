@@ -0,0 +1,57 @@
+'''
+Benchmarks of single endpoint calls
+'''
+import can
+
+from tinymovr import Tinymovr
+from tinymovr.iface.can_bus import CANBus
+from tinymovr.units import get_registry
+
+
+class EndpointCalls:
+    '''
+    Endpoint reads and writes of a single node
+    '''
+
+    def setup(self):
+        self.bus = can.Bus(interface="insilico", channel="bench")
+        self.tm = Tinymovr(node_id=1, iface=CANBus(self.bus))
+        self.estimates = self.tm.endpoint("encoder_estimates")
+        self.current = get_registry().Quantity(0.5, "ampere")
+
+    def teardown(self):
+        self.bus.shutdown()
+
+    def time_read(self):
+        self.tm.encoder_estimates
+
+    def time_read_raw(self):
+        self.estimates.raw()
+
+    def time_write(self):
+        self.tm.set_cur_setpoint(0.0)
+
+    def time_write_quantity(self):
+        self.tm.set_cur_setpoint(self.current)
+
+    def time_write_raw(self):
+        self.tm.set_cur_setpoint.raw(0.0)
+
+    def time_read_write(self):
+        self.tm.get_set_pos_vel(0.0, 0.0)
+
+
+class DispatchedEndpointCalls(EndpointCalls):
+    '''
+    Endpoint reads and writes of a single node, with a dispatcher
+    '''
+
+    def setup(self):
+        self.bus = can.Bus(interface="insilico", channel="bench")
+        self.iface = CANBus(self.bus, dispatch=True)
+        self.tm = Tinymovr(node_id=1, iface=self.iface)
+        self.estimates = self.tm.endpoint("encoder_estimates")
+        self.current = get_registry().Quantity(0.5, "ampere")
+
+    def teardown(self):
+        self.iface.shutdown()
@@ -0,0 +1,20 @@
+'''
+Benchmarks of the startup time of programs importing Tinymovr
+'''
+import sys
+import subprocess
+
+
+class Import:
+    '''
+    Import of the tinymovr package in a new interpreter, and the
+    startup of the interpreter alone, for reference
+    '''
+
+    number = 1
+
+    def time_interpreter(self):
+        subprocess.check_call([sys.executable, "-c", "pass"])
+
+    def time_import(self):
+        subprocess.check_call([sys.executable, "-c", "import tinymovr"])
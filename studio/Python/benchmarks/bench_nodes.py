@@ -0,0 +1,78 @@
+'''
+Benchmarks of multi-node polling and of instance construction
+'''
+import can
+
+from tinymovr import Tinymovr, TinymovrGroup
+from tinymovr.iface.can_bus import CANBus
+
+
+class MultiNodePolling:
+    '''
+    Reading an endpoint of eight nodes
+    '''
+
+    nodes = 8
+
+    def setup(self):
+        self.bus = can.Bus(interface="insilico", channel="bench")
+        self.iface = CANBus(self.bus, dispatch=True)
+        self.tms = [
+            Tinymovr(node_id=i + 1, iface=self.iface) for i in range(self.nodes)
+        ]
+        self.accessors = [tm.endpoint("encoder_estimates") for tm in self.tms]
+        self.group = TinymovrGroup(self.tms)
+
+    def teardown(self):
+        self.iface.shutdown()
+
+    def time_sequential(self):
+        for accessor in self.accessors:
+            accessor.raw()
+
+    def time_group(self):
+        self.group.read("encoder_estimates", raw=True)
+
+
+class Construction:
+    '''
+    Construction of a Tinymovr instance
+    '''
+
+    def setup(self):
+        self.bus = can.Bus(interface="insilico", channel="bench")
+        self.iface = CANBus(self.bus)
+
+    def teardown(self):
+        self.bus.shutdown()
+
+    def time_construct(self):
+        Tinymovr(node_id=1, iface=self.iface)
+
+    def time_construct_no_version_check(self):
+        Tinymovr(node_id=1, iface=self.iface, version_check=False)
+
+
+class FleetConstruction:
+    '''
+    Construction of instances of a fleet of 64 nodes,
+    one at a time, and as a group
+    '''
+
+    nodes = 64
+    items = 64
+
+    def setup(self):
+        self.bus = can.Bus(interface="insilico", channel="bench")
+        self.iface = CANBus(self.bus, dispatch=True)
+        self.node_ids = range(1, self.nodes + 1)
+
+    def teardown(self):
+        self.iface.shutdown()
+
+    def time_sequential(self):
+        for node_id in self.node_ids:
+            Tinymovr(node_id=node_id, iface=self.iface)
+
+    def time_group(self):
+        TinymovrGroup.create(self.iface, self.node_ids)
@@ -0,0 +1,38 @@
+'''
+Benchmarks of presentation and unit conversion of endpoint values
+'''
+import can
+
+from tinymovr import Tinymovr
+from tinymovr.iface.can_bus import CANBus
+from tinymovr.units import get_registry
+
+
+class Presenters:
+    '''
+    Presentation of a response payload, and serialization of
+    arguments, with and without units
+    '''
+
+    def setup(self):
+        self.bus = can.Bus(interface="insilico", channel="bench")
+        self.tm = Tinymovr(node_id=1, iface=CANBus(self.bus))
+        self.estimates = self.tm.endpoint("encoder_estimates")
+        self.payload = self.estimates.request()
+        self.setpoint = self.tm.endpoint("set_pos_setpoint")
+        self.position = get_registry().Quantity(1.0, "turn")
+
+    def teardown(self):
+        self.bus.shutdown()
+
+    def time_present(self):
+        self.estimates.present(self.payload)
+
+    def time_present_raw(self):
+        self.estimates.present_raw(self.payload)
+
+    def time_serialize(self):
+        self.setpoint.serialize((1000.0,), {})
+
+    def time_serialize_quantity(self):
+        self.setpoint.serialize((self.position,), {})
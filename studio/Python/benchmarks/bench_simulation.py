@@ -0,0 +1,77 @@
+'''
+Benchmarks of simulating fleets of nodes
+'''
+import can
+
+from tinymovr.iface.can_bus import create_frame, can_endpoints
+from tinymovr.codec import MultibyteCodec
+
+
+class FleetStep:
+    '''
+    A 1 ms simulation step of a fleet of 200 nodes in velocity control
+    '''
+
+    nodes = 200
+    items = 200
+
+    def setup(self):
+        self.bus = can.Bus(interface="insilico", channel="bench", virtual_time=True)
+        codec = MultibyteCodec()
+        state_types = can_endpoints["set_state"]["types"]
+        for node_id in range(1, self.nodes + 1):
+            # Calibrate, then enter velocity control
+            for state, mode in ((1, 0), (2, 1)):
+                payload = codec.serialize((state, mode), *state_types)
+                self.bus.send(create_frame(node_id, 0x07, False, payload))
+            payload = codec.serialize(
+                (node_id, 0.0), *can_endpoints["set_vel_setpoint"]["types"]
+            )
+            self.bus.send(create_frame(node_id, 0x0D, False, payload))
+
+    def teardown(self):
+        self.bus.shutdown()
+
+    def time_step(self):
+        self.bus.advance(0.001)
+
+
+class FirmwareControllerStep:
+    '''
+    A 1 ms simulation step, of 20 steps of the firmware
+    controller, of a single node in position control
+    '''
+
+    nodes = 1
+    items = 20
+
+    def setup(self):
+        self.bus = can.Bus(
+            interface="insilico", channel="bench", virtual_time=True, controller="firmware"
+        )
+        codec = MultibyteCodec()
+        state_types = can_endpoints["set_state"]["types"]
+        for node_id in range(1, self.nodes + 1):
+            for state, mode in ((1, 0), (2, 2)):
+                payload = codec.serialize((state, mode), *state_types)
+                self.bus.send(create_frame(node_id, 0x07, False, payload))
+            payload = codec.serialize(
+                (1000.0 * node_id, 0, 0), *can_endpoints["set_pos_setpoint"]["types"]
+            )
+            self.bus.send(create_frame(node_id, 0x0C, False, payload))
+
+    def teardown(self):
+        self.bus.shutdown()
+
+    def time_step(self):
+        self.bus.advance(0.001)
+
+
+class FirmwareControllerFleetStep(FirmwareControllerStep):
+    '''
+    A 1 ms simulation step, of 20 steps of the firmware
+    controller, of 200 nodes in position control
+    '''
+
+    nodes = 200
+    items = 4000
@@ -0,0 +1,236 @@
+"""Tinymovr Benchmark Runner
+
+Usage:
+    benchmarks [<pattern>] [--repeat=<n>] [--min-time=<s>] [--save] [--compare=<results>] [--threshold=<r>]
+    benchmarks -h | --help
+
+Options:
+    <pattern>              Run only benchmarks whose name contains pattern
+    --repeat=<n>           Number of timed repeats per benchmark [default: 5]
+    --min-time=<s>         Minimum duration of each repeat, in seconds [default: 0.1]
+    --save                 Save results to benchmarks/results/<commit>.json
+    --compare=<results>    Compare with a results file, or a commit with saved results
+    --threshold=<r>        Relative slowdown reported as a regression [default: 0.2]
+"""
+
+'''
+This module discovers and runs benchmarks against the simulated
+(InSilico) bus, so that no hardware is required.
+
+Benchmarks are classes in benchmarks/bench_*.py modules, with optional
+setup() and teardown() methods, and one or more time_* methods, each
+timing a single operation. The number of operations per repeat is
+calibrated to last at least min_time seconds, unless the class sets a
+fixed number. If the class sets items, each operation is considered to
+process that many items (e.g. payloads of a batch).
+
+Results hold the best and median time per operation of each benchmark,
+along with the commit, machine and Python version they were measured
+on, and are stored as JSON so that they can be compared across commits.
+'''
+
+import os
+import sys
+import json
+import time
+import inspect
+import pkgutil
+import platform
+import importlib
+import subprocess
+from datetime import datetime
+from statistics import median
+from typing import Callable, Dict, Iterator, List, Tuple
+from docopt import docopt
+
+
+results_dir: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def discover(pattern: str = None) -> Iterator[Tuple[str, type, str]]:
+    """
+    Yield the name, class and method name of each benchmark
+    """
+    package_dir: str = os.path.dirname(os.path.abspath(__file__))
+    for module_info in sorted(pkgutil.iter_modules([package_dir]), key=lambda m: m.name):
+        if not module_info.name.startswith("bench_"):
+            continue
+        module = importlib.import_module("benchmarks." + module_info.name)
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__ or cls_name.startswith("_"):
+                continue
+            for method_name, _ in inspect.getmembers(cls, inspect.isfunction):
+                if not method_name.startswith("time_"):
+                    continue
+                name: str = "{}.{}.{}".format(module_info.name[6:], cls_name, method_name[5:])
+                if pattern is None or pattern in name:
+                    yield name, cls, method_name
+
+
+def measure(fn: Callable, number: int) -> float:
+    start: float = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return time.perf_counter() - start
+
+
+def calibrate(fn: Callable, min_time: float) -> int:
+    """
+    Return the number of calls of fn that last at least min_time
+    """
+    number: int = 1
+    while True:
+        elapsed: float = measure(fn, number)
+        if elapsed >= min_time or number >= 1 << 24:
+            return number
+        if elapsed <= 0:
+            number *= 10
+        else:
+            number = max(number * 2, int(number * min_time / elapsed * 1.2))
+
+
+def run_benchmark(cls: type, method_name: str, repeat: int, min_time: float) -> Dict:
+    """
+    Set up, run and tear down a single benchmark
+    and return its result
+    """
+    instance = cls()
+    if hasattr(instance, "setup"):
+        instance.setup()
+    try:
+        fn: Callable = getattr(instance, method_name)
+        # Warm up, e.g. caches and compiled codecs
+        fn()
+        number: int = getattr(cls, "number", None) or calibrate(fn, min_time)
+        repeat = getattr(cls, "repeat", None) or repeat
+        times: List[float] = [measure(fn, number) / number for _ in range(repeat)]
+    finally:
+        if hasattr(instance, "teardown"):
+            instance.teardown()
+    best: float = min(times)
+    items: int = getattr(cls, "items", 1)
+    return {
+        "seconds": best,
+        "median": median(times),
+        "per_second": items / best if best > 0 else float("inf"),
+        "items": items,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(pattern: str = None, repeat: int = 5, min_time: float = 0.1, out=sys.stdout) -> Dict:
+    """
+    Run all benchmarks matching pattern and return a results
+    dictionary, printing each result as it is measured
+    """
+    results: Dict[str, Dict] = {}
+    for name, cls, method_name in discover(pattern):
+        try:
+            result: Dict = run_benchmark(cls, method_name, repeat, min_time)
+        except Exception as e:
+            print("{:<48} failed: {!r}".format(name, e), file=out)
+            continue
+        results[name] = result
+        print(
+            "{:<48} {:>12} {:>14.0f} /s".format(
+                name, format_time(result["seconds"]), result["per_second"]
+            ),
+            file=out,
+        )
+    return {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def compare(before: Dict, after: Dict, threshold: float = 0.2, out=sys.stdout) -> List[str]:
+    """
+    Print a comparison of two results dictionaries and return the
+    names of benchmarks that got slower by more than threshold
+    """
+    regressions: List[str] = []
+    print(
+        "Comparing {} ({}) with {} ({})".format(
+            after["commit"], after["machine"], before["commit"], before["machine"]
+        ),
+        file=out,
+    )
+    for name, result in after["results"].items():
+        previous: Dict = before["results"].get(name)
+        if previous is None:
+            continue
+        ratio: float = result["seconds"] / previous["seconds"]
+        flag: str = ""
+        if ratio > 1 + threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            flag = "improvement"
+        print(
+            "{:<48} {:>12} {:>12} {:>7.2f}x {}".format(
+                name,
+                format_time(previous["seconds"]),
+                format_time(result["seconds"]),
+                ratio,
+                flag,
+            ),
+            file=out,
+        )
+    return regressions
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return "{:.3f} {}".format(seconds / scale, unit)
+    return "{:.1f} ns".format(seconds * 1e9)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def results_path(commit: str) -> str:
+    return os.path.join(results_dir, "{}.json".format(commit))
+
+
+def load(results: str) -> Dict:
+    """
+    Load results from a file, or from the saved results of a commit
+    """
+    path: str = results if os.path.isfile(results) else results_path(results)
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    arguments: Dict = docopt(__doc__)
+    results: Dict = run(
+        arguments["<pattern>"],
+        repeat=int(arguments["--repeat"]),
+        min_time=float(arguments["--min-time"]),
+    )
+    if arguments["--save"]:
+        os.makedirs(results_dir, exist_ok=True)
+        path: str = results_path(results["commit"])
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("Results saved to {}".format(path))
+    if arguments["--compare"]:
+        regressions: List[str] = compare(
+            load(arguments["--compare"]), results, float(arguments["--threshold"])
+        )
+        if regressions:
+            sys.exit(1)
@@ -32,17 +32,21 @@ setup(
         "docopt",
         "pynumparser",
         "flatten-dict",
-        "pint"
+        "pint",
+        "numpy"
     ],
     extras_require={
         'plot': ["matplotlib"]
     },
     entry_points={
         "console_scripts": [
-            "tinymovr=tinymovr.shell:spawn_shell"
+            "tinymovr=tinymovr.shell:spawn_shell",
+            "tinymovr-sim=tinymovr.bus.sim_server:main"
         ],
         "can.interface": [
             "insilico=tinymovr.bus:InSilico",
+            "replay=tinymovr.bus:Replay",
+            "simclient=tinymovr.bus:SimClient",
         ]
     }
 )
@@ -0,0 +1,64 @@
+'''
+This unit test suite tests the creation of per-endpoint
+accessors of Tinymovr instances.
+'''
+import can
+
+from tinymovr import Tinymovr
+from tinymovr.accessors import Getter, Setter
+from tinymovr.iface.can_bus import CANBus
+
+import unittest
+
+bustype = "insilico"
+channel = "test"
+
+
+class TestAccessors(unittest.TestCase):
+
+    def setUp(self):
+        self.can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        self.tm = Tinymovr(node_id=1, iface=CANBus(self.can_bus))
+
+    def tearDown(self):
+        self.can_bus.shutdown()
+
+    def test_lazy_creation(self):
+        '''
+        Test that accessors are created on first use, and
+        that write accessors become instance attributes
+        '''
+        self.assertNotIn("set_limits", self.tm._accessors)
+        self.assertNotIn("set_limits", vars(self.tm))
+        self.tm.set_limits(1000, 5)
+        setter = self.tm._accessors["set_limits"]
+        self.assertIsInstance(setter, Setter)
+        self.assertIs(vars(self.tm)["set_limits"], setter)
+        self.assertIs(self.tm.set_limits, setter)
+        self.assertEqual(self.tm.limits.velocity.magnitude, 1000)
+        self.assertIsInstance(self.tm._accessors["limits"], Getter)
+        self.assertNotIn("limits", vars(self.tm))
+
+    def test_endpoint(self):
+        '''
+        Test that endpoint() and attribute access share accessors
+        '''
+        getter = self.tm.endpoint("encoder_estimates")
+        self.assertIs(self.tm.endpoint("encoder_estimates"), getter)
+        self.tm.encoder_estimates
+        self.assertIs(self.tm._accessors["encoder_estimates"], getter)
+        self.assertIs(self.tm.endpoint("set_vel_setpoint"), self.tm.set_vel_setpoint)
+
+    def test_unknown_attribute(self):
+        '''
+        Test that unknown attributes and endpoints raise errors
+        '''
+        with self.assertRaises(AttributeError):
+            self.tm.not_an_endpoint
+        self.assertFalse(hasattr(self.tm, "not_an_endpoint"))
+        with self.assertRaises(KeyError):
+            self.tm.endpoint("not_an_endpoint")
+
+
+if __name__ == '__main__':
+    unittest.main()
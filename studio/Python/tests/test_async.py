@@ -0,0 +1,82 @@
+'''
+This unit test suite tests the asyncio API of the
+Tinymovr Studio using simulated Tinymovr devices.
+'''
+import asyncio
+import can
+
+from tinymovr import AsyncTinymovr
+from tinymovr.iface.can_bus import CANBus
+from tinymovr.units import get_registry
+
+import unittest
+
+ureg = get_registry()
+A = ureg.ampere
+ticks = ureg.ticks
+
+bustype = "insilico"
+channel = "test"
+
+
+class TestAsync(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        cls.iface: CANBus = CANBus(cls.can_bus, dispatch=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.iface.shutdown()
+
+    def run_async(self, coro):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+    def test_create(self):
+        async def create():
+            return await AsyncTinymovr.create(node_id=1, iface=self.iface)
+        tm = self.run_async(create())
+        self.assertEqual(tm.fw_version.count("."), 2)
+
+    def test_concurrent_nodes(self):
+        async def run():
+            tms = await asyncio.gather(
+                *[AsyncTinymovr.create(node_id=i, iface=self.iface) for i in range(1, 9)]
+            )
+            await asyncio.gather(*[tm.reset() for tm in tms])
+            await asyncio.gather(*[tm.calibrate() for tm in tms])
+            await asyncio.gather(*[tm.current_control() for tm in tms])
+            await asyncio.gather(
+                *[tm.set_cur_setpoint(0.1 * i * A) for i, tm in enumerate(tms)]
+            )
+            return await asyncio.gather(*[tm.Iq for tm in tms])
+        results = self.run_async(run())
+        for i, Iq in enumerate(results):
+            self.assertAlmostEqual(Iq.estimate, 0.1 * i * A, delta=1e-6 * A)
+
+    def test_read_write_endpoint(self):
+        async def run():
+            tm = AsyncTinymovr(node_id=1, iface=self.iface, raw=True)
+            await tm.reset()
+            await tm.calibrate()
+            await tm.position_control()
+            return await tm.get_set_pos_vel(0, 0)
+        values = self.run_async(run())
+        self.assertIsInstance(values.position, float)
+
+    def test_timeout(self):
+        async def run():
+            tm = AsyncTinymovr(node_id=1, iface=self.iface, timeout=0.05)
+            return await tm.endpoint("offset_dir")()
+        with self.assertRaises(TimeoutError):
+            self.run_async(run())
+        self.assertFalse(self.iface.dispatcher._pending.get((1, 0x02)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+'''
+This unit test suite runs each benchmark once, so that
+benchmarks keep working as the library changes.
+'''
+import io
+
+from benchmarks.runner import compare, discover, run
+
+import unittest
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_run_all(self):
+        '''
+        Test that all benchmarks run without errors
+        '''
+        out = io.StringIO()
+        results = run(repeat=1, min_time=0, out=out)
+        self.assertNotIn("failed", out.getvalue())
+        self.assertEqual(len(results["results"]), len(list(discover())))
+        self.assertIn("endpoints.EndpointCalls.read", results["results"])
+
+    def test_compare(self):
+        '''
+        Test that slowdowns beyond the threshold are reported
+        '''
+        before = {"commit": "a", "machine": "m", "results": {
+            "x": {"seconds": 1.0}, "y": {"seconds": 1.0}}}
+        after = {"commit": "b", "machine": "m", "results": {
+            "x": {"seconds": 1.5}, "y": {"seconds": 0.5}, "z": {"seconds": 1.0}}}
+        self.assertEqual(compare(before, after, 0.2, out=io.StringIO()), ["x"])
+
+
+if __name__ == '__main__':
+    unittest.main()
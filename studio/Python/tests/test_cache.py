@@ -0,0 +1,137 @@
+'''
+This unit test suite tests caching of slow-changing
+endpoints, and invalidation by their setters.
+'''
+import time
+import can
+
+from tinymovr import Tinymovr
+from tinymovr.cache import EndpointCache
+from tinymovr.iface.can_bus import CANBus, can_endpoints
+
+import unittest
+
+bustype = "insilico"
+channel = "test"
+
+
+class TestEndpointCache(unittest.TestCase):
+
+    def test_invalidation_map(self):
+        '''
+        Test that setters invalidate the getters sharing their ser_map keys
+        '''
+        cache = EndpointCache(can_endpoints)
+        for name in ("limits", "gains", "motor_config", "motor_RL", "device_info"):
+            cache.put(name, b"\x00")
+        cache.written("set_limits")
+        self.assertIsNone(cache.get("limits"))
+        self.assertIsNotNone(cache.get("gains"))
+        cache.written("set_motor_config")
+        self.assertIsNone(cache.get("motor_config"))
+        self.assertIsNone(cache.get("motor_RL"))
+        cache.written("set_pos_setpoint")
+        self.assertIsNotNone(cache.get("gains"))
+        cache.written("set_state")
+        self.assertIsNone(cache.get("gains"))
+        self.assertIsNone(cache.get("device_info"))
+
+    def test_ttl(self):
+        '''
+        Test that responses expire, and that only
+        endpoints with a time-to-live are cached
+        '''
+        cache = EndpointCache(can_endpoints, {"gains": 0.05, "device_info": None})
+        cache.put("gains", b"\x01")
+        cache.put("device_info", b"\x02")
+        cache.put("encoder_estimates", b"\x03")
+        self.assertEqual(cache.get("gains"), b"\x01")
+        self.assertIsNone(cache.get("encoder_estimates"))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("gains"))
+        self.assertEqual(cache.get("device_info"), b"\x02")
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        self.tm = Tinymovr(node_id=1, iface=CANBus(self.can_bus), cache=True)
+        self.tm.enable_stats()
+
+    def tearDown(self):
+        self.can_bus.shutdown()
+
+    def calls(self, ep_name: str) -> int:
+        stats = self.tm.stats().get(ep_name)
+        return stats.calls if stats else 0
+
+    def test_cached_reads(self):
+        '''
+        Test that repeated reads of configuration do not reach the bus,
+        while other endpoints are always read
+        '''
+        for _ in range(5):
+            self.tm.gains
+            self.tm.device_info
+            self.tm.endpoint("gains").raw()
+            self.tm.encoder_estimates
+        self.assertEqual(self.calls("gains"), 1)
+        self.assertEqual(self.calls("device_info"), 0)
+        self.assertEqual(self.calls("encoder_estimates"), 5)
+
+    def test_setter_invalidates(self):
+        '''
+        Test that writing a setter reads its getter again
+        '''
+        self.tm.set_limits(1000, 5)
+        self.assertEqual(self.tm.endpoint("limits").raw().velocity, 1000)
+        self.tm.set_limits(2000, 5)
+        self.assertEqual(self.tm.endpoint("limits").raw().velocity, 2000)
+        self.assertEqual(self.calls("limits"), 2)
+
+    def test_refresh(self):
+        '''
+        Test dropping cached responses explicitly
+        '''
+        self.tm.gains
+        self.tm.limits
+        self.tm.refresh(["gains"])
+        self.tm.gains
+        self.tm.limits
+        self.assertEqual(self.calls("gains"), 2)
+        self.assertEqual(self.calls("limits"), 1)
+        self.tm.refresh()
+        self.tm.limits
+        self.assertEqual(self.calls("limits"), 2)
+
+    def test_calibration(self):
+        '''
+        Test that the motor config is not cached while calibrating,
+        and is cached again once the state is read back
+        '''
+        self.tm.motor_config
+        self.tm.calibrate()
+        self.tm.motor_config
+        self.tm.motor_config
+        self.assertEqual(self.calls("motor_config"), 3)
+        self.tm.state
+        self.tm.motor_config
+        self.tm.motor_config
+        self.assertEqual(self.calls("motor_config"), 4)
+        self.assertEqual(self.tm.motor_config.flags, 1)
+
+    def test_disabled(self):
+        '''
+        Test that instances do not cache by default
+        '''
+        tm = Tinymovr(node_id=2, iface=self.tm.iface)
+        tm.enable_stats()
+        tm.gains
+        tm.gains
+        self.assertEqual(tm.stats()["gains"].calls, 2)
+        tm.refresh()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+'''
+This unit test suite tests the serialization and
+deserialization of endpoint payloads.
+'''
+import struct
+
+from tinymovr.codec import DataType, MultibyteCodec, compile_codec
+from tinymovr.iface.can_bus import can_endpoints
+
+import unittest
+
+
+class TestCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = MultibyteCodec()
+
+    def test_round_trip(self):
+        '''
+        Test serialization followed by deserialization
+        '''
+        types = (DataType.FLOAT, DataType.INT16, DataType.UINT8)
+        payload = self.codec.serialize((1.5, -300, 200), *types)
+        self.assertEqual(len(payload), 7)
+        self.assertEqual(self.codec.deserialize(payload, *types), (1.5, -300, 200))
+
+    def test_integer_cast(self):
+        '''
+        Test that floats are truncated for integer fields
+        '''
+        types = (DataType.FLOAT, DataType.INT16)
+        payload = self.codec.serialize((2, 10.7), *types)
+        self.assertEqual(self.codec.deserialize(payload, *types), (2.0, 10))
+
+    def test_compiled_codec_cached(self):
+        '''
+        Test that endpoint codecs are compiled once
+        '''
+        types = can_endpoints["encoder_estimates"]["types"]
+        self.assertIs(compile_codec(*types), self.codec.compile(*types))
+        self.assertEqual(compile_codec(*types).size, 8)
+
+    def test_pack_unpack_memoryview(self):
+        '''
+        Test packing into and unpacking from memoryviews
+        '''
+        codec = compile_codec(DataType.FLOAT, DataType.FLOAT)
+        buffer = bytearray(12)
+        view = memoryview(buffer)
+        codec.pack_into(view, 4, (1.0, -2.0))
+        self.assertEqual(struct.unpack("<ff", buffer[4:]), (1.0, -2.0))
+        self.assertEqual(codec.unpack_from(view, 4), (1.0, -2.0))
+
+    def test_all_endpoints_compile(self):
+        '''
+        Test that all endpoint type tuples fit a CAN frame
+        '''
+        for ep in can_endpoints.values():
+            if "types" in ep:
+                self.assertLessEqual(compile_codec(*ep["types"]).size, 8)
+
+    def test_decode_payloads(self):
+        '''
+        Test that batch decoding matches per-payload decoding,
+        for all supported payload containers
+        '''
+        import numpy as np
+        from tinymovr.codec.vectorized import decode_payloads
+        ep = can_endpoints["encoder_estimates"]
+        codec = compile_codec(*ep["types"])
+        values = [(float(i), -2.0 * i) for i in range(10)]
+        payloads = [codec.serialize(v) for v in values]
+        padded = np.frombuffer(
+            b"".join(bytes(p) + b"\0\0" for p in payloads), dtype=np.uint8
+        ).reshape(-1, 10)
+        for batch in (payloads, b"".join(payloads), padded):
+            columns = decode_payloads(batch, ep)
+            self.assertEqual(list(columns.keys()), ["position", "velocity"])
+            self.assertEqual(list(zip(columns["position"], columns["velocity"])), values)
+        records = decode_payloads(payloads, ep, as_records=True)
+        self.assertEqual(records.velocity[3], -6.0)
+        with self.assertRaises(ValueError):
+            decode_payloads([b"\0\0\0\0"], ep)
+
+    def test_decode_payloads_units(self):
+        '''
+        Test unit conversion of batch decoded columns
+        '''
+        from tinymovr.codec.vectorized import decode_payloads
+        from tinymovr.units import get_registry
+        ep = can_endpoints["encoder_estimates"]
+        codec = compile_codec(*ep["types"])
+        payloads = [codec.serialize((8192.0 * i, 8192.0)) for i in range(4)]
+        columns = decode_payloads(payloads, ep, units={"position": "turn"})
+        self.assertEqual(list(columns["position"]), [0.0, 1.0, 2.0, 3.0])
+        self.assertEqual(list(columns["velocity"]), [8192.0] * 4)
+        quantities = decode_payloads(payloads, ep, as_quantity=True)
+        self.assertEqual(
+            quantities["velocity"][0], get_registry().Quantity(8192.0, "tick/second")
+        )
+        # Units are not resolved unless conversion or quantities are requested
+        columns = decode_payloads(payloads, dict(ep, units=("unknown", "unknown")))
+        self.assertEqual(list(columns["velocity"]), [8192.0] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+'''
+This unit test suite tests exporting and restoring the
+configuration of simulated Tinymovr nodes.
+'''
+import os
+import json
+import tempfile
+import can
+
+from tinymovr import Tinymovr, TinymovrGroup
+from tinymovr.config import config_endpoints
+from tinymovr.iface.can_bus import CANBus, can_endpoints
+
+import unittest
+
+bustype = "insilico"
+channel = "test"
+
+
+class TestConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        self.iface: CANBus = CANBus(self.can_bus, dispatch=True)
+        self.tm = Tinymovr(node_id=1, iface=self.iface)
+        fd, self.file_path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file_path)
+        self.iface.shutdown()
+
+    def test_config_endpoints(self):
+        '''
+        Test pairing getters and setters, writing the CAN config last
+        '''
+        pairs = config_endpoints(can_endpoints)
+        self.assertIn(("motor_RL", "set_motor_RL"), pairs)
+        self.assertIn(("motor_config", "set_motor_config"), pairs)
+        self.assertEqual(pairs[-1], ("can_config", "set_can_config"))
+        self.assertEqual(len(pairs), 6)
+
+    def test_export_restore(self):
+        '''
+        Test that restoring an exported config writes nothing,
+        and that endpoints sharing a key are both exported
+        '''
+        self.tm.export_config(self.file_path)
+        with open(self.file_path) as f:
+            config = json.load(f)
+        self.assertEqual(set(config["motor"]), {"pole_pairs", "I_cal", "R", "L"})
+        self.assertEqual(config["can"]["id"], 1)
+        self.assertEqual(self.tm.restore_config(self.file_path), [])
+
+    def test_restore_diff(self):
+        '''
+        Test that only changed endpoints are written, leaving
+        values missing from the config unchanged
+        '''
+        self.tm.set_motor_config(0, 7, 5.0)
+        with open(self.file_path, "w") as f:
+            json.dump({"motor": {"R": 0.3, "pole_pairs": 11}, "gains": {"position": 20.0}}, f)
+        written = self.tm.restore_config(self.file_path)
+        self.assertEqual(sorted(written), ["set_motor_RL", "set_motor_config"])
+        self.assertEqual(self.tm.endpoint("motor_config").raw().pole_pairs, 11)
+        self.assertEqual(self.tm.endpoint("motor_config").raw().I_cal, 5.0)
+        self.assertAlmostEqual(self.tm.endpoint("motor_RL").raw().R, 0.3, places=6)
+        self.assertEqual(self.tm.restore_config(self.file_path), [])
+
+    def test_calibrated_motor(self):
+        '''
+        Test that motor config flags, which are read as calibrated |
+        is_gimbal << 1 and written as is_gimbal, are written back in
+        the encoding of the setter
+        '''
+        self.tm.calibrate()
+        self.assertEqual(self.tm.endpoint("motor_config").raw().flags, 1)
+        with open(self.file_path, "w") as f:
+            json.dump({"motor": {"pole_pairs": 11}}, f)
+        self.assertEqual(self.tm.restore_config(self.file_path), ["set_motor_config"])
+        config = self.tm.endpoint("motor_config").raw()
+        self.assertEqual((config.flags, config.pole_pairs), (1, 11))
+        self.assertEqual(self.tm.restore_config(self.file_path), [])
+
+    def test_timeout(self):
+        '''
+        Test that the requests of a failed read are discarded
+        '''
+        can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel, node_ids=(1,))
+        iface: CANBus = CANBus(can_bus, dispatch=True)
+        try:
+            tms = [
+                Tinymovr(node_id=i, iface=iface, version_check=False, device_info=self.tm.device_info)
+                for i in (1, 2)
+            ]
+            with self.assertRaises(TimeoutError):
+                TinymovrGroup(tms).read_config(timeout=0.05)
+            pending = iface.dispatcher._pending
+            self.assertFalse(any(pending.get(key) for key in list(pending)))
+        finally:
+            iface.shutdown()
+
+    def test_group(self):
+        '''
+        Test reading and writing the config of many nodes at once
+        '''
+        group = TinymovrGroup(
+            [Tinymovr(node_id=i, iface=self.iface, version_check=False) for i in range(1, 9)]
+        )
+        configs = group.read_config()
+        self.assertEqual([c["can"]["id"] for c in configs], list(range(1, 9)))
+        for index, config in enumerate(configs):
+            if index % 2:
+                config["limits"]["current"] = 2.0
+        written = group.write_config(configs)
+        self.assertEqual(written, [[], ["set_limits"]] * 4)
+        self.assertEqual(group.write_config(configs), [[]] * 8)
+        self.assertEqual(
+            [c["limits"]["current"] for c in group.read_config()], [10.0, 2.0] * 4
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
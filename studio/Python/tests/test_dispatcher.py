@@ -0,0 +1,93 @@
+'''
+This unit test suite tests concurrent, dispatched
+communication with multiple simulated Tinymovr nodes.
+'''
+import can
+
+from tinymovr import Tinymovr
+from tinymovr.codec import MultibyteCodec
+from tinymovr.iface.can_bus import CANBus, can_endpoints, create_frame
+
+import unittest
+
+bustype = "insilico"
+channel = "test"
+
+
+class TestDispatcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        cls.iface: CANBus = CANBus(cls.can_bus, dispatch=True)
+        cls.tm1: Tinymovr = Tinymovr(node_id=1, iface=cls.iface)
+        cls.tm2: Tinymovr = Tinymovr(node_id=2, iface=cls.iface)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.iface.shutdown()
+
+    def test_concurrent_requests(self):
+        '''
+        Test multiple requests to multiple nodes in flight
+        '''
+        ep = can_endpoints["device_info"]
+        futures = [
+            self.iface.request_async(node_id, ep["ep_id"])
+            for node_id in (1, 2, 1, 2)
+        ]
+        codec = MultibyteCodec()
+        for future in futures:
+            info = codec.deserialize(future.result(timeout=1), *ep["types"])
+            self.assertEqual(len(info), 5)
+
+    def test_stray_frame(self):
+        '''
+        Test that unexpected frames are ignored
+        '''
+        self.can_bus.buffer.put(create_frame(5, 0x09, False, bytearray(8)))
+        self.assertGreaterEqual(self.tm1.device_info.fw_minor, 7)
+        self.assertGreaterEqual(self.tm2.device_info.fw_minor, 7)
+
+    def test_send_receive(self):
+        '''
+        Test split send and receive calls in dispatch mode
+        '''
+        ep = can_endpoints["Vbus"]
+        self.iface.send(2, ep["ep_id"])
+        self.iface.send(1, ep["ep_id"])
+        self.assertEqual(len(self.iface.receive(1, ep["ep_id"])), 4)
+        self.assertEqual(len(self.iface.receive(2, ep["ep_id"])), 4)
+
+    def test_send_replaces(self):
+        '''
+        Test that a send without a receive is replaced by the next send
+        '''
+        ep_id = can_endpoints["Vbus"]["ep_id"]
+        self.iface.send(1, ep_id)
+        self.iface.send(1, ep_id)
+        self.assertEqual(len(self.iface.receive(1, ep_id)), 4)
+        self.assertFalse(self.iface._awaiting.get((1, ep_id)))
+        self.assertFalse(self.iface.dispatcher._pending.get((1, ep_id)))
+
+    def test_timeout(self):
+        '''
+        Test timeout of requests to absent endpoints
+        '''
+        with self.assertRaises(TimeoutError):
+            self.iface.receive(3, 0x09, timeout=0.05)
+        self.assertFalse(self.iface.dispatcher._pending.get((3, 0x09)))
+
+    def test_commands(self):
+        '''
+        Test that writes without payload are not awaited
+        '''
+        for _ in range(20):
+            self.tm1.save_config()
+        ep_id = can_endpoints["save_config"]["ep_id"]
+        self.assertFalse(self.iface.dispatcher._pending.get((1, ep_id)))
+        self.assertFalse(self.iface._awaiting.get((1, ep_id)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+'''
+This unit test suite tests pipelined reads from
+groups of simulated Tinymovr nodes.
+'''
+import time
+import can
+
+from tinymovr import Tinymovr, TinymovrGroup, VersionError
+from tinymovr.group import discover
+from tinymovr.iface.can_bus import CANBus
+
+import unittest
+
+bustype = "insilico"
+channel = "test"
+
+
+class TestGroup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        cls.iface: CANBus = CANBus(cls.can_bus, dispatch=True)
+        cls.group = TinymovrGroup(
+            [Tinymovr(node_id=i, iface=cls.iface) for i in range(1, 6)]
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.iface.shutdown()
+
+    def test_read(self):
+        '''
+        Test reading an endpoint of all nodes in the group
+        '''
+        results = self.group.read("device_info")
+        self.assertEqual(len(results), len(self.group))
+        for info in results:
+            self.assertGreaterEqual(info.fw_minor, 7)
+
+    def test_read_raw(self):
+        '''
+        Test reading an endpoint of all nodes without units
+        '''
+        for estimates in self.group.read("encoder_estimates", raw=True):
+            self.assertIsInstance(estimates.position, float)
+
+    def test_read_timeout(self):
+        '''
+        Test reading an endpoint that no node responds to
+        '''
+        with self.assertRaises(TimeoutError):
+            self.group.read("offset_dir", timeout=0.05)
+        results = self.group.read("offset_dir", timeout=0.05, return_exceptions=True)
+        for result in results:
+            self.assertIsInstance(result, TimeoutError)
+
+
+class TestDiscover(unittest.TestCase):
+
+    def setUp(self):
+        self.can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel, node_ids=(2, 5, 11))
+        self.iface: CANBus = CANBus(self.can_bus, dispatch=True)
+
+    def tearDown(self):
+        self.iface.shutdown()
+
+    def test_discover(self):
+        '''
+        Test discovering the nodes of a sparse bus within one timeout
+        '''
+        start = time.perf_counter()
+        tms = discover(self.iface, range(1, 17), timeout=0.2)
+        self.assertLess(time.perf_counter() - start, 0.4)
+        self.assertEqual(sorted(tms), [2, 5, 11])
+        for node_id, tm in tms.items():
+            self.assertIsInstance(tm, Tinymovr)
+            self.assertEqual(tm.node_id, node_id)
+
+    def test_discover_version_error(self):
+        '''
+        Test that nodes failing the version check are returned as errors
+        '''
+        self.can_bus.min_studio_version = ["0", "255", "255"]
+        tms = discover(self.iface, range(1, 17), timeout=0.2)
+        self.assertEqual(sorted(tms), [2, 5, 11])
+        for result in tms.values():
+            self.assertIsInstance(result, VersionError)
+        tms = discover(self.iface, [2], timeout=0.2, version_check=False)
+        self.assertIsInstance(tms[2], Tinymovr)
+
+    def test_discover_discards(self):
+        '''
+        Test that requests to absent nodes do not accumulate
+        over repeated scans
+        '''
+        for _ in range(5):
+            discover(self.iface, range(1, 17), timeout=0.05)
+        pending = self.iface.dispatcher._pending
+        self.assertFalse(any(pending.get(key) for key in list(pending)))
+
+    def test_read_absent(self):
+        '''
+        Test that requests to absent nodes are discarded on timeout,
+        and counted by the instances
+        '''
+        tm2 = Tinymovr(node_id=2, iface=self.iface)
+        tm3 = Tinymovr(
+            node_id=3, iface=self.iface, version_check=False, device_info=tm2.device_info
+        )
+        tm2.enable_stats()
+        group = TinymovrGroup([tm2, tm3])
+        for _ in range(10):
+            results = group.read("encoder_estimates", timeout=0.05, return_exceptions=True)
+            self.assertIsInstance(results[1], TimeoutError)
+        ep_id = tm3.endpoint("encoder_estimates").ep_id
+        self.assertFalse(self.iface.dispatcher._pending.get((3, ep_id)))
+        self.assertEqual(tm2.stats()["encoder_estimates"].calls, 10)
+        self.assertEqual(tm3.counters()["encoder_estimates"]["timeouts"], 10)
+
+    def test_create(self):
+        '''
+        Test creating a group, which fails if any node is absent
+        '''
+        group = TinymovrGroup.create(self.iface, [2, 5, 11], timeout=0.2)
+        self.assertEqual([tm.node_id for tm in group], [2, 5, 11])
+        with self.assertRaises(TimeoutError):
+            TinymovrGroup.create(self.iface, [2, 3], timeout=0.2)
+
+    def test_deferred_version_check(self):
+        '''
+        Test creating a group without checking versions,
+        and checking them later
+        '''
+        self.can_bus.min_studio_version = ["0", "255", "255"]
+        group = TinymovrGroup.create(self.iface, [2, 5], timeout=0.2, version_check=False)
+        results = group.check_versions(timeout=0.2, return_exceptions=True)
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertIsInstance(result, VersionError)
+        with self.assertRaises(VersionError):
+            group.check_versions(timeout=0.2)
+        with self.assertRaises(VersionError):
+            group.tinymovrs[0].check_versions()
+
+
+if __name__ == '__main__':
+    unittest.main()
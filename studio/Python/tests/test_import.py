@@ -0,0 +1,50 @@
+'''
+This unit test suite tests that importing Tinymovr defers
+slow imports until the modules are used.
+'''
+import sys
+import subprocess
+
+import unittest
+
+
+def imported_modules(code: str):
+    '''
+    Run code in a new interpreter and return
+    the names of the modules it imported
+    '''
+    output = subprocess.check_output(
+        [sys.executable, "-c", code + "\nimport sys\nprint(' '.join(sys.modules))"]
+    )
+    return output.decode().split()
+
+
+class TestImport(unittest.TestCase):
+
+    def test_import(self):
+        '''
+        Test that importing tinymovr imports no units, shell or plotting packages
+        '''
+        modules = imported_modules("import tinymovr")
+        for name in ("pint", "pkg_resources", "IPython", "matplotlib"):
+            self.assertNotIn(name, modules)
+
+    def test_raw_instance(self):
+        '''
+        Test that the unit registry is only created when units are used
+        '''
+        code = "\n".join([
+            "import can",
+            "from tinymovr import Tinymovr",
+            "from tinymovr.iface.can_bus import CANBus",
+            "bus = can.Bus(interface='insilico', channel='test')",
+            "tm = Tinymovr(node_id=1, iface=CANBus(bus), raw=True)",
+            "tm.set_pos_setpoint(1000)",
+            "tm.encoder_estimates",
+        ])
+        self.assertNotIn("pint", imported_modules(code))
+        self.assertIn("pint", imported_modules(code + "\ntm.raw = False\ntm.encoder_estimates"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+'''
+This unit test suite tests timeout, retry and deadline
+policies of endpoint calls to a simulated Tinymovr device.
+'''
+import time
+import can
+
+from tinymovr import Tinymovr, CallPolicy
+from tinymovr.bus import InSilico
+from tinymovr.iface.can_bus import CANBus
+
+import unittest
+
+
+class LossyInSilico(InSilico):
+    '''
+    A simulated device that drops a number of responses
+    '''
+
+    dropped = 0
+
+    def send(self, msg: can.Message):
+        if self.dropped > 0 and not msg.data:
+            self.dropped -= 1
+            return
+        super().send(msg)
+
+
+class TestPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.can_bus = LossyInSilico(channel="test")
+        self.tm = Tinymovr(node_id=1, iface=CANBus(self.can_bus))
+
+    def tearDown(self):
+        self.can_bus.shutdown()
+
+    def test_timeout_counted(self):
+        '''
+        Test that timeouts of an endpoint without retries are counted
+        '''
+        self.tm.policy = CallPolicy(timeout=0.01)
+        with self.assertRaises(TimeoutError):
+            self.tm.offset_dir
+        self.assertEqual(self.tm.counters(), {"offset_dir": {"timeouts": 1, "retries": 0}})
+        self.tm.reset_counters()
+        self.assertEqual(self.tm.counters(), {})
+
+    def test_retries(self):
+        '''
+        Test that lost responses are retried
+        '''
+        self.tm.policy = CallPolicy(timeout=0.01, retries=2)
+        self.can_bus.dropped = 2
+        self.assertGreater(self.tm.Vbus, 0)
+        self.assertEqual(self.tm.counters(), {"Vbus": {"timeouts": 2, "retries": 2}})
+        self.can_bus.dropped = 3
+        with self.assertRaises(TimeoutError):
+            self.tm.Vbus
+
+    def test_deadline(self):
+        '''
+        Test that the deadline bounds the duration of retried calls
+        '''
+        self.tm.policy = CallPolicy(timeout=0.02, retries=100, backoff=0.001, deadline=0.05)
+        start = time.perf_counter()
+        with self.assertRaises(TimeoutError):
+            self.tm.offset_dir
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertLess(self.tm.counters()["offset_dir"]["retries"], 5)
+
+    def test_endpoint_policies(self):
+        '''
+        Test endpoint policies, and that setpoints do not retry
+        '''
+        policy = CallPolicy(timeout=0.01, retries=3)
+        self.tm.policy = policy
+        self.assertIs(self.tm.endpoint("Vbus").policy, policy)
+        self.assertEqual(self.tm.endpoint("set_pos_setpoint").policy.retries, 0)
+        self.assertEqual(self.tm.endpoint("get_set_pos_vel").policy.retries, 0)
+        self.assertEqual(self.tm.endpoint("get_set_pos_vel").policy.timeout, 0.01)
+        fast = CallPolicy(timeout=0.001)
+        self.tm.set_policy("Vbus", fast)
+        self.assertIs(self.tm.endpoint("Vbus").policy, fast)
+        self.tm.policy = CallPolicy()
+        self.assertIs(self.tm.endpoint("Vbus").policy, fast)
+        self.tm.set_policy("Vbus")
+        self.assertIs(self.tm.endpoint("Vbus").policy, self.tm.policy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,12 +25,14 @@ class TestRates(TMTestCase):
         self.try_calibrate()
         self.tm.position_control()
         time.sleep(0.2)
+        self.tm.enable_stats()
         elapsed_time()
         sum = 0
         for _ in range(iterations):
             sum += self.tm.encoder_estimates.position
         res = elapsed_time()
         print("Round-trip time (2 packets): " + str(res/iterations) + " seconds")
+        print_latency(self.tm.stats()["encoder_estimates"])
 
     def test_round_trip_time_with_write(self):
         '''
@@ -39,6 +41,7 @@ class TestRates(TMTestCase):
         self.try_calibrate()
         self.tm.position_control()
         time.sleep(0.2)
+        self.tm.enable_stats()
         elapsed_time()
         sum = 0
         pos = self.tm.encoder_estimates.position
@@ -46,6 +49,7 @@ class TestRates(TMTestCase):
             sum += self.tm.get_set_pos_vel(pos, 0).position
         res = elapsed_time()
         print("Round-trip time (2 packets, rw): " + str(res/iterations) + " seconds")
+        print_latency(self.tm.stats()["get_set_pos_vel"])
 
 
 def elapsed_time(prefix=''):
@@ -55,4 +59,10 @@ def elapsed_time(prefix=''):
     else:
         res = e_time - elapsed_time.s_time
         elapsed_time.s_time = e_time
-        return res
\ No newline at end of file
+        return res
+
+
+def print_latency(stats):
+    latency = stats.latency
+    print("Latency: p50 {:.6f}, p99 {:.6f}, max {:.6f} seconds".format(
+        latency.percentile(50), latency.percentile(99), latency.max))
@@ -0,0 +1,88 @@
+'''
+This unit test suite tests replaying and decoding
+CAN log files.
+'''
+import os
+import time
+import tempfile
+import can
+
+from tinymovr.bus import Replay, decode_frames
+from tinymovr.codec import compile_codec
+from tinymovr.iface.can_bus import CANBus, can_endpoints, create_frame
+
+import unittest
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "capture.log")
+        codec = compile_codec(*can_endpoints["encoder_estimates"]["types"])
+        self.values = [(float(i), 2.0 * i) for i in range(20)]
+        writer = can.CanutilsLogWriter(self.path)
+        for i, values in enumerate(self.values):
+            request = create_frame(1, 0x09, True)
+            request.timestamp = 1000.0 + 0.01 * i
+            response = create_frame(1, 0x09, False, codec.serialize(values))
+            response.timestamp = 1000.0 + 0.01 * i + 0.001
+            writer.on_message_received(request)
+            writer.on_message_received(response)
+        writer.stop()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_replay_fast(self):
+        '''
+        Test replaying all frames as fast as possible
+        '''
+        bus = Replay(self.path)
+        frames = []
+        frame = bus.recv(0)
+        while frame is not None:
+            frames.append(frame)
+            frame = bus.recv(0)
+        bus.shutdown()
+        self.assertTrue(bus.finished)
+        self.assertEqual(len(frames), 40)
+        self.assertAlmostEqual(frames[-1].timestamp, 1000.191)
+
+    def test_replay_paced(self):
+        '''
+        Test that replay at ten times real time is paced
+        '''
+        bus = Replay(self.path, speed=10.0)
+        start = time.perf_counter()
+        count = sum(1 for _ in bus.frames())
+        bus.shutdown()
+        self.assertEqual(count, 40)
+        self.assertGreater(time.perf_counter() - start, 0.019)
+
+    def test_decode_frames(self):
+        '''
+        Test decoding replayed frames through the endpoint map
+        '''
+        bus = Replay(self.path)
+        decoded = list(decode_frames(bus.frames()))
+        bus.shutdown()
+        self.assertEqual(len(decoded), 20)
+        self.assertEqual(decoded[0].node_id, 1)
+        self.assertEqual(decoded[0].ep_name, "encoder_estimates")
+        self.assertEqual([d.values for d in decoded], self.values)
+
+    def test_iface(self):
+        '''
+        Test receiving replayed frames through a CAN interface
+        '''
+        bus = can.Bus(bustype="replay", channel=self.path)
+        iface = CANBus(bus)
+        # The captured request precedes its response
+        self.assertEqual(len(iface.receive(1, 0x09)), 0)
+        self.assertEqual(len(iface.receive(1, 0x09)), 8)
+        bus.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+'''
+This unit test suite tests sharing a fleet of simulated
+Tinymovr nodes among clients of a simulator server.
+'''
+import threading
+import can
+
+from tinymovr import Tinymovr
+from tinymovr.bus import SimServer
+from tinymovr.iface.can_bus import CANBus, create_frame
+from tinymovr.bus.sim_server import pack_frame, unpack_frames
+
+import unittest
+
+bustype = "simclient"
+
+
+class TestSimServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server: SimServer = SimServer(port=0, virtual_time=True).start()
+        self.channel: str = "{}:{}".format(*self.server.address)
+        self.buses = []
+
+    def tearDown(self):
+        for bus in self.buses:
+            bus.shutdown()
+        self.server.stop()
+
+    def connect(self, node_id: int = 1, **kwargs) -> Tinymovr:
+        bus: can.Bus = can.Bus(bustype=bustype, channel=self.channel)
+        self.buses.append(bus)
+        return Tinymovr(node_id=node_id, iface=CANBus(bus, **kwargs))
+
+    def test_frame_layout(self):
+        '''
+        Test packing frames in the SocketCAN layout
+        '''
+        frame = create_frame(3, 0x1A, False, bytearray([1, 2, 3]))
+        packed = pack_frame(frame)
+        self.assertEqual(len(packed), 16)
+        buffer = bytearray(packed + packed[:5])
+        (unpacked,) = unpack_frames(buffer)
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(unpacked.arbitration_id, frame.arbitration_id)
+        self.assertEqual(unpacked.is_extended_id, frame.is_extended_id)
+        self.assertEqual(bytes(unpacked.data), bytes([1, 2, 3]))
+
+    def test_shared_state(self):
+        '''
+        Test that clients see the same simulated nodes
+        '''
+        tm1 = self.connect()
+        tm2 = self.connect()
+        tm1.set_limits(1000, 5)
+        self.assertEqual(tuple(tm2.endpoint("limits").raw()), (1000, 5))
+        self.assertEqual(self.server.bus.states.node(1)["velocity_limit"], 1000)
+
+    def test_concurrent_clients(self):
+        '''
+        Test clients requesting concurrently, from several threads
+        '''
+        tms = [self.connect(node_id) for node_id in range(1, 9)]
+        errors = []
+
+        def run(index, tm):
+            try:
+                for i in range(20):
+                    tm.set_limits(1000 * index + i + 1, index + 1)
+                    self.assertEqual(
+                        tuple(tm.endpoint("limits").raw()), (1000 * index + i + 1, index + 1)
+                    )
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=item) for item in enumerate(tms)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.server.bus.states), 8)
+
+    def test_broadcast(self):
+        '''
+        Test that in broadcast mode, clients see each other's frames
+        '''
+        server: SimServer = SimServer(port=0, broadcast=True).start()
+        self.channel = "{}:{}".format(*server.address)
+        listener: can.Bus = can.Bus(bustype=bustype, channel=self.channel)
+        self.buses.append(listener)
+        tm = self.connect()
+        self.assertGreaterEqual(tm.device_info.fw_minor, 7)
+        request = listener.recv(1.0)
+        response = listener.recv(1.0)
+        self.assertTrue(request.is_remote_frame)
+        self.assertEqual(request.arbitration_id, response.arbitration_id)
+        self.assertFalse(response.is_remote_frame)
+        listener.shutdown()
+        self.buses = []
+        server.stop()
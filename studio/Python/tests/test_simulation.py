@@ -3,12 +3,13 @@ This unit test suite tests functionality of the
 Tinymovr Studio using a simulated Tinymovr
 device, which is suitable for unit testing.
 """
+import math
 import random
 import time
 import can
 
 import tinymovr
-from tinymovr import Tinymovr, VersionError
+from tinymovr import Tinymovr, VersionError, CallPolicy
 from tinymovr.constants import ErrorIDs
 from tinymovr.iface import IFace
 from tinymovr.iface.can_bus import CANBus
@@ -136,6 +137,243 @@ class TestSimulation(unittest.TestCase):
         vals = self.tm.get_set_pos_vel_Iq(0, 0, 0)
         self.assertLess(abs(vals.position.magnitude), 500)
 
+    def test_raw_per_call(self):
+        self.tm.calibrate()
+        self.tm.current_control()
+        self.tm.set_cur_setpoint.raw(0.5)
+        self.assertEqual(self.tm.endpoint("Iq").raw().estimate, 0.5)
+        estimates = self.tm.endpoint("encoder_estimates").raw()
+        self.assertIsInstance(estimates.position, float)
+        self.assertEqual(self.tm.Iq.estimate, 0.5 * A)
+
+    def test_raw_mode(self):
+        tm = Tinymovr(node_id=1, iface=self.tm.iface, raw=True)
+        tm.calibrate()
+        tm.current_control()
+        vals = tm.get_set_pos_vel_Iq(0, 0, 0)
+        self.assertIsInstance(vals.position, float)
+        tm.set_cur_setpoint(0.25)
+        self.assertEqual(tm.Iq.estimate, 0.25)
+        self.assertIsInstance(tm.Vbus, float)
+        tm.raw = False
+        self.assertEqual(tm.Iq.estimate, 0.25 * A)
+
+
+class TestVirtualTime(unittest.TestCase):
+    def setUp(self):
+        self.can_bus: can.Bus = can.Bus(
+            bustype=bustype, channel=channel, virtual_time=True
+        )
+        self.tm: Tinymovr = Tinymovr(node_id=9, iface=CANBus(self.can_bus))
+        self.tm.reset()
+
+    def tearDown(self):
+        self.can_bus.shutdown()
+
+    def test_advance(self):
+        """
+        Test that virtual time only advances on demand, and that
+        motion under constant current is deterministic
+        """
+        self.tm.calibrate()
+        self.tm.current_control()
+        self.tm.set_cur_setpoint(0.5)
+        self.assertEqual(self.can_bus.time, 0)
+        self.assertEqual(self.tm.encoder_estimates.position.magnitude, 0)
+        self.can_bus.advance(60)
+        self.assertEqual(self.can_bus.time, 60)
+        # Constant acceleration of (0.5 A / Kv) / I rad/s^2
+        acceleration = 40.0 * 8192 / (2 * math.pi)
+        estimates = self.tm.endpoint("encoder_estimates").raw()
+        self.assertAlmostEqual(estimates.velocity / (60 * acceleration), 1, places=5)
+        self.assertAlmostEqual(estimates.position / (1800 * acceleration), 1, places=5)
+
+    def test_set_vel_control(self):
+        """
+        Test the velocity control round trip of TestSimulation
+        in virtual time
+        """
+        self.tm.calibrate()
+        self.tm.current_control()
+        self.tm.set_vel_setpoint(1000 * ticks / s)
+        self.can_bus.advance(0.5)
+        self.tm.set_vel_setpoint(-1000 * ticks / s)
+        self.can_bus.advance(0.5)
+        self.assertLess(abs(self.tm.encoder_estimates.position), 500 * ticks)
+
+    def test_get_set_pos_vel(self):
+        """
+        Test the combined setpoint round trip of TestSimulation
+        in virtual time
+        """
+        self.tm.calibrate()
+        self.tm.current_control()
+        vals = self.tm.get_set_pos_vel_Iq(0, 500 * ticks / s, 0.001 * A)
+        self.assertAlmostEqual(vals.position, 0, delta=1 * ticks)
+        self.assertAlmostEqual(vals.velocity_ff, 0, delta=10 * ticks)
+        self.can_bus.advance(0.5)
+        vals = self.tm.get_set_pos_vel_Iq(0, 0, 0)
+        self.assertLess(abs(vals.position.magnitude), 500)
+
+    def test_time_step(self):
+        """
+        Test that time advances by a fixed step with each frame sent
+        """
+        self.can_bus.time_step = 0.001
+        for _ in range(100):
+            self.tm.set_cur_setpoint(0)
+        self.assertAlmostEqual(self.can_bus.time, 0.1)
+
+    def test_receive_does_not_wait(self):
+        """
+        Test that requests to endpoints that are not
+        simulated fail without waiting for the timeout
+        """
+        self.tm.set_policy("offset_dir", CallPolicy(timeout=1.0))
+        start = time.perf_counter()
+        with self.assertRaises(TimeoutError):
+            self.tm.offset_dir
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+
+class TestFleet(unittest.TestCase):
+    def setUp(self):
+        self.can_bus: can.Bus = can.Bus(
+            bustype=bustype, channel=channel, virtual_time=True
+        )
+        self.iface: IFace = CANBus(self.can_bus)
+
+    def tearDown(self):
+        self.can_bus.shutdown()
+
+    def test_many_nodes(self):
+        """
+        Test that nodes of a large fleet are simulated
+        independently, in a single vectorized step
+        """
+        tms = [
+            Tinymovr(node_id=i, iface=self.iface, version_check=False)
+            for i in range(1, 201)
+        ]
+        for i, tm in enumerate(tms):
+            tm.calibrate()
+            tm.velocity_control()
+            tm.set_vel_setpoint(100 * (i + 1))
+        self.can_bus.advance(1.0)
+        self.assertEqual(len(self.can_bus.states), 200)
+        for i, tm in enumerate(tms):
+            estimates = tm.endpoint("encoder_estimates").raw()
+            self.assertEqual(estimates.velocity, 100 * (i + 1))
+            self.assertAlmostEqual(estimates.position / (100 * (i + 1)), 1, places=2)
+
+    def test_buses_independent(self):
+        """
+        Test that each bus simulates its own nodes
+        """
+        other_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        other = Tinymovr(node_id=1, iface=CANBus(other_bus), version_check=False)
+        tm = Tinymovr(node_id=1, iface=self.iface, version_check=False)
+        tm.set_limits(1000, 5)
+        self.assertEqual(tuple(tm.endpoint("limits").raw()), (1000, 5))
+        self.assertEqual(tuple(other.endpoint("limits").raw()), (300000, 10))
+        other_bus.shutdown()
+
+
+class TestFirmwareController(unittest.TestCase):
+    def setUp(self):
+        self.can_bus: can.Bus = can.Bus(
+            bustype=bustype, channel=channel, virtual_time=True, controller="firmware"
+        )
+        self.tm: Tinymovr = Tinymovr(node_id=1, iface=CANBus(self.can_bus), raw=True)
+        self.tm.calibrate()
+
+    def tearDown(self):
+        self.can_bus.shutdown()
+
+    def test_position_step(self):
+        """
+        Test that position control settles at the setpoint,
+        with current within limits throughout
+        """
+        self.tm.set_limits(300000, 5)
+        self.tm.position_control()
+        self.tm.set_pos_setpoint(10000)
+        for _ in range(100):
+            self.can_bus.advance(0.02)
+            self.assertLessEqual(abs(self.tm.Iq.estimate), 5.0001)
+        estimates = self.tm.encoder_estimates
+        self.assertAlmostEqual(estimates.position, 10000, delta=50)
+        self.assertLess(abs(estimates.velocity), 500)
+
+    def test_velocity_limit(self):
+        """
+        Test that the velocity limit is enforced, and that the
+        integrator holds the velocity setpoint without error
+        """
+        self.tm.set_limits(20000, 10)
+        self.tm.velocity_control()
+        self.tm.set_vel_setpoint(50000)
+        self.can_bus.advance(2.0)
+        self.assertAlmostEqual(self.tm.encoder_estimates.velocity, 20000, delta=200)
+        self.tm.set_vel_setpoint(10000)
+        self.can_bus.advance(2.0)
+        self.assertAlmostEqual(self.tm.encoder_estimates.velocity, 10000, delta=10)
+
+    def test_plan_v_limit(self):
+        """
+        Test a velocity-limited planned move, which ends in position control
+        """
+        self.tm.position_control()
+        self.tm.set_max_plan_acc_dec(40000, 40000)
+        self.tm.plan_v_limit(20000, 10000)
+        self.assertEqual(self.tm.state.mode, 3)
+        max_velocity = 0
+        for _ in range(30):
+            self.can_bus.advance(0.1)
+            max_velocity = max(max_velocity, self.tm.setpoints.velocity)
+        self.assertEqual(self.tm.state.mode, 2)
+        self.assertAlmostEqual(max_velocity, 10000, delta=1)
+        self.assertAlmostEqual(self.tm.setpoints.position, 20000, delta=1)
+        self.assertAlmostEqual(self.tm.encoder_estimates.position, 20000, delta=50)
+
+    def test_plan_t_limit(self):
+        """
+        Test that a time-limited planned move ends in time, and that
+        an infeasible one raises an error
+        """
+        self.tm.position_control()
+        self.tm.plan_t_limit(10000, 1000, 64, 64)
+        self.can_bus.advance(0.99)
+        self.assertEqual(self.tm.state.mode, 3)
+        self.can_bus.advance(0.02)
+        self.assertEqual(self.tm.state.mode, 2)
+        self.assertAlmostEqual(self.tm.setpoints.position, 10000, delta=1)
+        self.tm.plan_t_limit(1e6, 100, 64, 64)
+        state = self.tm.state
+        self.assertIn(ErrorIDs.PlannerVCruiseOverLimit, state.errors)
+        self.assertEqual(state.state, 0)
+
+    def test_vectorized(self):
+        """
+        Test that nodes stepped together in arrays move as
+        nodes stepped one at a time
+        """
+        other_bus: can.Bus = can.Bus(
+            bustype=bustype, channel=channel, virtual_time=True, controller="firmware"
+        )
+        other_bus.controller.scalar_nodes = 0
+        other = Tinymovr(node_id=1, iface=CANBus(other_bus), raw=True)
+        other.calibrate()
+        for tm, can_bus in ((self.tm, self.can_bus), (other, other_bus)):
+            tm.position_control()
+            tm.plan_v_limit(5000, 10000)
+            can_bus.advance(0.5)
+        self.assertEqual(
+            self.can_bus.states["position_estimate"][0],
+            other_bus.states["position_estimate"][0],
+        )
+        other_bus.shutdown()
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+'''
+This unit test suite tests collection and export of
+endpoint call statistics.
+'''
+import json
+import can
+
+from tinymovr import Tinymovr, CallPolicy
+from tinymovr.iface.can_bus import CANBus
+from tinymovr.stats import LatencyHistogram
+
+import unittest
+
+bustype = "insilico"
+channel = "test"
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_percentiles(self):
+        '''
+        Test that percentiles are within the relative error bound
+        '''
+        histogram = LatencyHistogram()
+        for micros in range(1, 10001):
+            histogram.record(micros * 1e-6)
+        self.assertEqual(histogram.count, 10000)
+        for percent in (10, 50, 90, 99):
+            expected = percent * 1e-4
+            self.assertLess(abs(histogram.percentile(percent) - expected) / expected, 0.07)
+        self.assertEqual(histogram.percentile(100), 0.01)
+        below, total = histogram.cumulative((0.001, 1.0))
+        self.assertLess(abs(below - 1000), 1000 * 0.035)
+        self.assertEqual(total, 10000)
+
+    def test_large_values(self):
+        '''
+        Test that very long durations are clamped to the last bucket
+        '''
+        histogram = LatencyHistogram()
+        histogram.record(1e9)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertEqual(histogram.percentile(50), 1e9)
+
+
+class TestStats(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        cls.tm: Tinymovr = Tinymovr(node_id=1, iface=CANBus(cls.can_bus))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.can_bus.shutdown()
+
+    def test_stats(self):
+        '''
+        Test statistics of reads, writes and timeouts
+        '''
+        self.assertEqual(self.tm.stats(), {})
+        self.tm.enable_stats()
+        for _ in range(10):
+            self.tm.encoder_estimates
+        self.tm.set_cur_setpoint(0)
+        self.tm.set_policy("offset_dir", CallPolicy(timeout=0.001))
+        with self.assertRaises(TimeoutError):
+            self.tm.offset_dir
+        stats = self.tm.stats()
+        self.assertEqual(set(stats), {"encoder_estimates", "set_cur_setpoint", "offset_dir"})
+        self.assertEqual(stats["encoder_estimates"].calls, 10)
+        self.assertEqual(stats["encoder_estimates"].bytes_received, 80)
+        self.assertEqual(stats["encoder_estimates"].latency.count, 10)
+        self.assertEqual(stats["set_cur_setpoint"].bytes_sent, 4)
+        self.assertEqual(stats["offset_dir"].timeouts, 1)
+        self.assertEqual(stats["offset_dir"].latency.count, 0)
+
+        exported = json.loads(self.tm.export_stats())
+        self.assertGreater(exported["encoder_estimates"]["latency"]["p99"], 0)
+        text = self.tm.export_stats("prometheus")
+        self.assertIn(
+            'tinymovr_calls_total{node="1",endpoint="encoder_estimates"} 10', text
+        )
+        self.assertIn(
+            'tinymovr_latency_seconds_count{node="1",endpoint="encoder_estimates"} 10', text
+        )
+        # Disabling stops collection, keeping the statistics
+        self.tm.enable_stats(False)
+        self.tm.encoder_estimates
+        self.assertEqual(self.tm.stats()["encoder_estimates"].calls, 10)
+        self.tm.enable_stats()
+        self.tm.encoder_estimates
+        self.assertEqual(self.tm.stats()["encoder_estimates"].calls, 11)
+        self.tm.enable_stats(False)
+        self.tm.set_policy("offset_dir")
+        self.tm.reset_counters()
+
+
+if __name__ == '__main__':
+    unittest.main()
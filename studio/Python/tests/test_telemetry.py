@@ -0,0 +1,154 @@
+'''
+This unit test suite tests telemetry streaming from
+a simulated Tinymovr device into ring buffers.
+'''
+import os
+import time
+import tempfile
+import can
+import numpy as np
+
+from tinymovr import Tinymovr
+from tinymovr.codec import MultibyteCodec
+from tinymovr.iface.can_bus import CANBus, can_endpoints, create_frame
+from tinymovr.telemetry import RingBuffer, TelemetryRecorder, TelemetryLog
+
+import unittest
+
+bustype = "insilico"
+channel = "test"
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_wrap(self):
+        '''
+        Test that the latest rows are returned in order after wrapping
+        '''
+        buffer = RingBuffer(4, 2)
+        self.assertEqual(len(buffer.latest()), 0)
+        for i in range(10):
+            buffer.append((i, -i))
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.count, 10)
+        np.testing.assert_array_equal(buffer.latest()[:, 0], [6, 7, 8, 9])
+        np.testing.assert_array_equal(buffer.latest(2)[:, 1], [-8, -9])
+
+    def test_view(self):
+        '''
+        Test that latest rows are read-only views of the buffer
+        '''
+        buffer = RingBuffer(4, 1)
+        buffer.append((1,))
+        view = buffer.latest()
+        self.assertFalse(view.flags.owndata)
+        self.assertFalse(view.flags.writeable)
+
+
+class TestTelemetryStream(unittest.TestCase):
+
+    def test_stream(self):
+        '''
+        Test streaming endpoints of a simulated node
+        '''
+        can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        iface: CANBus = CANBus(can_bus, dispatch=True)
+        tm: Tinymovr = Tinymovr(node_id=1, iface=iface)
+        with tm.stream(["encoder_estimates", "Vbus"], rate_hz=200) as stream:
+            time.sleep(0.3)
+        self.assertFalse(stream.running)
+        self.assertGreater(len(stream["Vbus"]), 10)
+        samples = stream.latest("encoder_estimates", 5)
+        self.assertEqual(samples.shape, (5, 3))
+        self.assertTrue(np.all(np.diff(samples[:, 0]) > 0))
+        np.testing.assert_array_equal(stream.latest("Vbus")[:, 1], 12.0)
+        self.assertEqual(stream.columns("encoder_estimates"), ("time", "position", "velocity"))
+        self.assertEqual(stream.units("Vbus"), ("second", "volt"))
+        iface.shutdown()
+
+    def test_silent_node(self):
+        '''
+        Test that requests to a silent node are dropped and discarded
+        '''
+        can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel, node_ids=(1,))
+        iface: CANBus = CANBus(can_bus, dispatch=True)
+        tm1: Tinymovr = Tinymovr(node_id=1, iface=iface)
+        tm2: Tinymovr = Tinymovr(
+            node_id=2, iface=iface, version_check=False, device_info=tm1.device_info
+        )
+        with tm2.stream(["Vbus"], rate_hz=200) as stream:
+            time.sleep(0.2)
+        self.assertGreater(stream.dropped, 10)
+        self.assertEqual(len(stream["Vbus"]), 0)
+        self.assertFalse(iface.dispatcher._pending.get((2, can_endpoints["Vbus"]["ep_id"])))
+        iface.shutdown()
+
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "test.tmlog")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_record_and_decode(self):
+        '''
+        Test recording frames and decoding endpoint columns
+        '''
+        codec = MultibyteCodec()
+        types = can_endpoints["encoder_estimates"]["types"]
+        with TelemetryRecorder(self.path, chunk_size=16) as recorder:
+            for i in range(100):
+                for node_id in (1, 2):
+                    recorder.record(create_frame(node_id, 0x09, True))
+                    frame = create_frame(
+                        node_id, 0x09, False, codec.serialize((i * node_id, -i), *types)
+                    )
+                    frame.timestamp = float(i)
+                    recorder.record(frame)
+                vbus = create_frame(1, 0x17, False, codec.serialize((12.0,), *can_endpoints["Vbus"]["types"]))
+                recorder.record(vbus)
+        self.assertTrue(os.path.exists(self.path + ".idx.npz"))
+        log = TelemetryLog(self.path)
+        self.assertEqual(len(log), 500)
+        self.assertEqual(set(log.ids()), {(1, 0x09), (2, 0x09), (1, 0x17)})
+        estimates = log.endpoint("encoder_estimates", node_id=2)
+        np.testing.assert_array_equal(estimates["position"], np.arange(100) * 2)
+        np.testing.assert_array_equal(estimates["velocity"], -np.arange(100))
+        np.testing.assert_array_equal(estimates["timestamp"], np.arange(100))
+        np.testing.assert_array_equal(log.endpoint("Vbus", node_id=1)["value"], 12.0)
+        self.assertEqual(len(log.endpoint("encoder_estimates", 1, include_remote=True)["position"]), 200)
+
+    def test_unindexed_log(self):
+        '''
+        Test reading a log whose index is missing or outdated
+        '''
+        recorder = TelemetryRecorder(self.path)
+        recorder.record(create_frame(3, 0x17, False, bytearray(4)))
+        recorder.flush()
+        log = TelemetryLog(self.path)
+        self.assertEqual(log.ids(), ((3, 0x17),))
+        frames = list(log.frames())
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0].dlc, 4)
+        recorder.close()
+
+    def test_record_dispatcher(self):
+        '''
+        Test recording frames received by a dispatcher
+        '''
+        can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        iface: CANBus = CANBus(can_bus, dispatch=True)
+        tm: Tinymovr = Tinymovr(node_id=1, iface=iface)
+        with TelemetryRecorder(self.path, iface.dispatcher):
+            for _ in range(20):
+                tm.encoder_estimates
+        iface.shutdown()
+        log = TelemetryLog(self.path)
+        self.assertEqual(len(log.endpoint("encoder_estimates", 1)["position"]), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
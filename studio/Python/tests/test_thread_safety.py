@@ -0,0 +1,85 @@
+'''
+This unit test suite tests sharing a CAN interface between
+many threads communicating with simulated Tinymovr nodes.
+'''
+import threading
+import can
+
+from tinymovr import Tinymovr
+from tinymovr.iface.can_bus import CANBus, can_endpoints
+
+import unittest
+
+bustype = "insilico"
+channel = "test"
+
+thread_count = 8
+iterations = 200
+
+
+class TestThreadSafety(unittest.TestCase):
+
+    def hammer(self, iface: CANBus, split: bool):
+        '''
+        Have each thread write and read back limits of its own node,
+        while also reading a shared node, and collect any errors
+        '''
+        errors = []
+        limits = can_endpoints["limits"]
+
+        def worker(index: int):
+            node_id = 40 + index
+            try:
+                tm = Tinymovr(node_id=node_id, iface=iface, version_check=False)
+                shared = Tinymovr(node_id=39, iface=iface, version_check=False)
+                for i in range(iterations):
+                    tm.set_limits(1000 * index + i + 1, index + 1)
+                    if split and i % 2:
+                        # Split send and receive calls
+                        iface.send(node_id, limits["ep_id"])
+                        values = tm.codec.deserialize(
+                            iface.receive(node_id, limits["ep_id"]), *limits["types"]
+                        )
+                    else:
+                        values = tm.endpoint("limits").raw()
+                    if tuple(values) != (1000 * index + i + 1, index + 1):
+                        errors.append("Node {} got {}".format(node_id, values))
+                    self.assertEqual(shared.endpoint("device_info").raw()[2], 8)
+            except Exception as e:
+                errors.append("Node {}: {!r}".format(node_id, e))
+
+        threads = [
+            threading.Thread(target=worker, args=(i,)) for i in range(thread_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_dispatch(self):
+        '''
+        Test concurrent requests and split send and receive
+        calls from many threads, with a dispatcher
+        '''
+        can_bus = can.Bus(bustype=bustype, channel=channel)
+        iface = CANBus(can_bus, dispatch=True)
+        try:
+            self.hammer(iface, split=True)
+        finally:
+            iface.shutdown()
+
+    def test_no_dispatch(self):
+        '''
+        Test concurrent requests from many threads, without a dispatcher
+        '''
+        can_bus = can.Bus(bustype=bustype, channel=channel)
+        iface = CANBus(can_bus)
+        try:
+            self.hammer(iface, split=False)
+        finally:
+            can_bus.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
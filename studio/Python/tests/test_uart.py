@@ -0,0 +1,122 @@
+'''
+This unit test suite tests the UART interface against a
+device that follows the UART protocol of the firmware.
+'''
+import socket
+import time
+import threading
+
+from tinymovr import Tinymovr
+from tinymovr.iface.can_bus import can_endpoints
+from tinymovr.iface.uart import UARTIface
+
+import unittest
+
+
+class UARTDevice(threading.Thread):
+    '''
+    A device serving the UART protocol of the firmware over a
+    socket, which holds the value of each command
+    '''
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.listener = socket.socket()
+        self.listener.bind(("localhost", 0))
+        self.listener.listen(1)
+        self.url = "socket://localhost:{}".format(self.listener.getsockname()[1])
+        self.values = {"b": 12000, "Y": 20, "F": 80, "C": 1, "U": 1000}
+        self.messages = []
+        self.start()
+
+    def run(self):
+        conn, _ = self.listener.accept()
+        buffer = b""
+        while True:
+            data = conn.recv(1024)
+            if not data:
+                break
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                message = line.decode()
+                self.messages.append(message)
+                command, value = message[1], message[2:]
+                if value:
+                    self.values[command] = int(value)
+                    if command == "P":
+                        self.values["p"] = int(value)
+                elif command != "R":
+                    conn.sendall("{}\n".format(self.values.get(command, 0)).encode())
+        conn.close()
+        self.listener.close()
+
+
+class TestUART(unittest.TestCase):
+
+    def setUp(self):
+        self.device = UARTDevice()
+        self.iface = UARTIface(self.device.url)
+        self.tm = Tinymovr(node_id=1, iface=self.iface, raw=True)
+
+    def tearDown(self):
+        self.iface.close()
+
+    def test_endpoints(self):
+        '''
+        Test that only endpoints with UART commands are mapped
+        '''
+        self.assertIn("encoder_estimates", self.iface.get_ep_map())
+        self.assertNotIn("offset_dir", self.iface.get_ep_map())
+        with self.assertRaises(ValueError):
+            self.iface.request(1, can_endpoints["offset_dir"]["ep_id"])
+
+    def test_read_scaled(self):
+        '''
+        Test reading values, scaled as in the firmware
+        '''
+        self.assertAlmostEqual(self.tm.Vbus, 12.0)
+        gains = self.tm.gains
+        self.assertEqual(gains.position, 20)
+        self.assertAlmostEqual(gains.velocity, 8e-5)
+        self.assertEqual(tuple(self.tm.can_config), (1, 1000))
+        self.assertGreaterEqual(self.tm.device_info.fw_minor, 8)
+
+    def test_write(self):
+        '''
+        Test writing values, and unsupported fields
+        '''
+        self.tm.set_pos_setpoint(1000)
+        self.tm.set_cur_setpoint(0.5)
+        self.tm.set_can_config(3)
+        self.assertEqual(self.tm.encoder_estimates.position, 1000)
+        self.assertAlmostEqual(self.tm.Iq.setpoint, 0.5)
+        self.assertEqual(self.device.values["C"], 3)
+        self.assertEqual(self.device.values["U"], 1000)
+        with self.assertRaises(ValueError):
+            self.tm.set_pos_setpoint(1000, 100)
+
+    def test_set_state(self):
+        '''
+        Test entering closed loop, which sets the mode by
+        setting the setpoint of the mode again
+        '''
+        self.tm.set_pos_setpoint(500)
+        self.tm.idle()
+        self.tm.position_control()
+        # The last write has no response, thus wait for the device
+        deadline = time.perf_counter() + 1.0
+        while self.device.messages[-1] != ".P500" and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(self.device.messages[-4:], [".Z", ".A", ".P", ".P500"])
+
+    def test_pipelining(self):
+        '''
+        Test many requests in flight from several threads
+        '''
+        self.iface.max_in_flight = 4
+        futures = [
+            self.iface.request_async(1, can_endpoints["gains"]["ep_id"]) for _ in range(50)
+        ]
+        for future in futures:
+            self.assertEqual(len(future.result(timeout=1)), 8)
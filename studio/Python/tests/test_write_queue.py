@@ -0,0 +1,134 @@
+'''
+This unit test suite tests coalescing of queued
+writes to simulated Tinymovr nodes.
+'''
+import time
+import can
+
+from tinymovr import Tinymovr
+from tinymovr.iface.can_bus import CANBus, WriteQueue, extract_node_message_id
+
+import unittest
+
+bustype = "insilico"
+channel = "test"
+
+
+class RecordingBus:
+    '''
+    Minimal bus that records sent frames
+    '''
+    def __init__(self):
+        self.frames = []
+
+    def send(self, frame):
+        self.frames.append(frame)
+
+
+class FailingBus(RecordingBus):
+    '''
+    Bus that fails to send after a number of frames
+    '''
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+
+    def send(self, frame):
+        if len(self.frames) >= self.limit:
+            raise can.CanError("Transmit buffer full")
+        super().send(frame)
+
+
+class RaisingBus(RecordingBus):
+    '''
+    Bus that raises an error while it is set
+    '''
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+    def send(self, frame):
+        if self.error:
+            raise self.error
+        super().send(frame)
+
+
+class TestWriteQueue(unittest.TestCase):
+
+    def test_coalesce(self):
+        '''
+        Test that only the latest write per node and endpoint is sent
+        '''
+        bus = RecordingBus()
+        queue = WriteQueue(bus)
+        for i in range(100):
+            queue.put(1, 0x0E, bytearray([i]))
+            queue.put(2, 0x0E, bytearray([i]))
+        queue.put(1, 0x0D, bytearray([7]))
+        self.assertEqual(queue.flush(), 3)
+        self.assertEqual(queue.flush(), 0)
+        sent = {extract_node_message_id(f.arbitration_id): f.data for f in bus.frames}
+        self.assertEqual(sent[(1, 0x0E)], bytearray([99]))
+        self.assertEqual(sent[(2, 0x0E)], bytearray([99]))
+        self.assertEqual(sent[(1, 0x0D)], bytearray([7]))
+
+    def test_send_error(self):
+        '''
+        Test that writes not sent are queued again, unless replaced
+        '''
+        bus = FailingBus(1)
+        queue = WriteQueue(bus)
+        for node_id in (1, 2, 3):
+            queue.put(node_id, 0x0E, bytearray([node_id]))
+        with self.assertRaises(can.CanError):
+            queue.flush()
+        self.assertEqual(len(queue), 2)
+        queue.put(3, 0x0E, bytearray([30]))
+        bus.limit = 10
+        self.assertEqual(queue.flush(), 2)
+        sent = [(extract_node_message_id(f.arbitration_id)[0], f.data[0]) for f in bus.frames]
+        self.assertEqual(sorted(sent), [(1, 1), (2, 2), (3, 30)])
+
+    def test_thread_error(self):
+        '''
+        Test that the flushing thread keeps running after
+        errors other than CAN errors
+        '''
+        bus = RaisingBus(ValueError("Invalid frame"))
+        queue = WriteQueue(bus, rate_hz=1000)
+        queue.start()
+        try:
+            with self.assertLogs("tinymovr", level="ERROR"):
+                queue.put(1, 0x0E, bytearray([1]))
+                time.sleep(0.05)
+            self.assertTrue(queue._thread.is_alive())
+            bus.error = None
+            time.sleep(0.05)
+            self.assertEqual(len(bus.frames), 1)
+        finally:
+            queue.stop()
+
+    def test_enqueue_setpoint(self):
+        '''
+        Test enqueueing setpoints to a simulated node
+        '''
+        can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel)
+        iface: CANBus = CANBus(can_bus, write_rate_hz=500)
+        tm: Tinymovr = Tinymovr(node_id=1, iface=iface)
+        tm.reset()
+        tm.calibrate()
+        tm.current_control()
+        for i in range(1000):
+            tm.set_cur_setpoint.enqueue(i * 0.001)
+        time.sleep(0.05)
+        self.assertEqual(len(iface.write_queue), 0)
+        self.assertAlmostEqual(tm.Iq.estimate.magnitude, 0.999, delta=1e-6)
+        with self.assertRaises(TypeError):
+            tm.get_set_pos_vel.enqueue(0, 0)
+        tm.idle()
+        iface.shutdown()
+        self.assertFalse(iface.write_queue._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
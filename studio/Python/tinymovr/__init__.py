@@ -1,5 +1,8 @@
 from tinymovr.tinymovr import Tinymovr, VersionError
+from tinymovr.policy import CallPolicy
+from tinymovr.async_tinymovr import AsyncTinymovr
+from tinymovr.group import TinymovrGroup
 from tinymovr.user_wrapper import UserWrapper
 from tinymovr.shell import spawn_shell
 import tinymovr.units
-import tinymovr.constants
\ No newline at end of file
+import tinymovr.constants
@@ -0,0 +1,397 @@
+""" Tinymovr endpoint accessors module.
+
+This module includes accessor classes that bind a single endpoint to a
+single Tinymovr instance. Everything that is needed in order to issue a
+request (node and endpoint ids, compiled codec, presenter, labels,
+defaults and units) is resolved once, when the accessor is created, so
+that each call performs only the work that is specific to that call.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+from time import perf_counter
+from typing import Dict, Tuple
+from tinymovr.presenter import presenter_map, raw_presenter_map
+from tinymovr.policy import CallPolicy, endpoint_policy
+from tinymovr.stats import EndpointStats
+from tinymovr.cache import EndpointCache
+from tinymovr.units import get_quantity_type, get_unit
+
+
+_missing = object()
+
+
+class Accessor:
+    """
+    Base endpoint accessor
+    """
+
+    # The response cache of the instance, if enabled
+    cache: EndpointCache = None
+
+    def __init__(self, tinymovr, name: str, endpoint: Dict):
+        self.name: str = name
+        self.endpoint: Dict = endpoint
+        self.iface = tinymovr.iface
+        self.node_id: int = tinymovr.node_id
+        self.ep_id: int = endpoint["ep_id"]
+        self.codec = (
+            tinymovr.codec.compile(*endpoint["types"])
+            if "types" in endpoint
+            else None
+        )
+        self.default_presenter = presenter_map.get(name, presenter_map["default"])
+        self.raw_presenter = raw_presenter_map.get(name, raw_presenter_map["default"])
+        self.timeouts: int = 0
+        self.retries: int = 0
+        self.stats: EndpointStats = None
+        # The statistics calls are recorded in, or None if disabled
+        self._recording: EndpointStats = None
+        self.set_raw(tinymovr.raw)
+        self.set_policy(tinymovr.policy, tinymovr.policies)
+
+    def set_policy(self, policy: CallPolicy, policies: Dict[str, CallPolicy] = None):
+        """
+        Set the call policy of the accessor, given an instance
+        policy and a dictionary of endpoint policies
+        """
+        self.policy: CallPolicy = endpoint_policy(policy, policies, self.name, self.endpoint)
+
+    def enable_stats(self, enabled: bool = True):
+        """
+        Enable or disable collection of call statistics. Statistics
+        collected so far are kept when collection is disabled, and
+        when it is re-enabled.
+        """
+        if not enabled:
+            self._recording = None
+            return
+        if self.stats is None:
+            self.stats = EndpointStats()
+        self._recording = self.stats
+
+    def request(self, payload=None):
+        """
+        Issue a request according to the call policy and
+        return the response payload
+        """
+        stats: EndpointStats = self._recording
+        if stats is None:
+            return self._request(payload)
+        stats.calls += 1
+        start: float = perf_counter()
+        try:
+            response = self._request(payload)
+        except TimeoutError:
+            raise
+        except IOError:
+            stats.mismatches += 1
+            raise
+        stats.latency.record(perf_counter() - start)
+        stats.bytes_sent += len(payload) if payload else 0
+        stats.bytes_received += len(response)
+        return response
+
+    def record(self, latency: float, response=None):
+        """
+        Record a request issued outside of the accessor, e.g. by a
+        group read, in the timeout counter and the statistics. A
+        response of None records a timeout.
+        """
+        if response is None:
+            self.timeouts += 1
+        stats: EndpointStats = self._recording
+        if stats is not None:
+            stats.calls += 1
+            if response is not None:
+                stats.latency.record(latency)
+                stats.bytes_received += len(response)
+
+    def _request(self, payload):
+        policy: CallPolicy = self.policy
+        if policy.retries or policy.deadline is not None:
+            return policy.call(
+                lambda timeout: self.iface.request(self.node_id, self.ep_id, payload, timeout),
+                self,
+            )
+        try:
+            return self.iface.request(self.node_id, self.ep_id, payload, policy.timeout)
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def set_raw(self, raw: bool):
+        """
+        Enable or disable raw mode, in which values are presented
+        and accepted as plain numbers, without units
+        """
+        self.presenter = self.raw_presenter if raw else self.default_presenter
+
+    def present(self, response):
+        """
+        Deserialize and present a response payload
+        """
+        return self.presenter(self.name, self.codec.deserialize(response), self.endpoint)
+
+    def present_raw(self, response):
+        """
+        Deserialize and present a response payload without units
+        """
+        return self.raw_presenter(self.name, self.codec.deserialize(response), self.endpoint)
+
+    def __repr__(self):
+        return "<{} {} of node {}>".format(type(self).__name__, self.name, self.node_id)
+
+
+class Getter(Accessor):
+    """
+    Accessor for read endpoints
+    """
+
+    def __call__(self):
+        return self.present(self.request())
+
+    def raw(self):
+        """
+        Read the endpoint, returning values without units
+        """
+        return self.present_raw(self.request())
+
+    def request(self, payload=None):
+        cache: EndpointCache = self.cache
+        if cache is None:
+            return super().request(payload)
+        response = cache.get(self.name)
+        if response is None:
+            response = super().request(payload)
+            cache.put(self.name, response)
+        return response
+
+
+class Setter(Accessor):
+    """
+    Accessor for write endpoints
+    """
+
+    def __init__(self, tinymovr, name: str, endpoint: Dict):
+        self.labels: Tuple[str, ...] = tuple(endpoint.get("labels", ()))
+        defaults: Dict = endpoint.get("defaults", {})
+        self.defaults: Tuple = tuple(defaults.get(k, _missing) for k in self.labels)
+        self.unit_strings: Tuple[str, ...] = tuple(endpoint.get("units", ()))
+        self._units: Tuple = None
+        self._quantity_type: type = None
+        super().__init__(tinymovr, name, endpoint)
+
+    @property
+    def units(self) -> Tuple:
+        """
+        The units of the endpoint values, resolved on first use, so
+        that the unit registry is only created if units are used
+        """
+        if self._units is None and self.unit_strings:
+            self._quantity_type = get_quantity_type()
+            self._units = tuple(get_unit(u) for u in self.unit_strings)
+        return self._units
+
+    def set_raw(self, raw: bool):
+        super().set_raw(raw)
+        self.convert: bool = bool(self.unit_strings) and not raw
+
+    def __call__(self, *args, **kwargs):
+        self.send(self.serialize(args, kwargs, self.convert))
+
+    def raw(self, *args, **kwargs):
+        """
+        Write the endpoint, accepting plain values without units
+        """
+        self.send(self.serialize(args, kwargs, False))
+
+    def send(self, payload=None):
+        """
+        Send a payload to the endpoint. Writes have no response,
+        thus call policies do not apply to them.
+        """
+        stats: EndpointStats = self._recording
+        if stats is None:
+            return self._send(payload)
+        stats.calls += 1
+        start: float = perf_counter()
+        self._send(payload)
+        stats.latency.record(perf_counter() - start)
+        stats.bytes_sent += len(payload) if payload else 0
+
+    def _send(self, payload):
+        self.iface.send(self.node_id, self.ep_id, payload)
+        if self.cache is not None:
+            self.cache.written(self.name, payload)
+
+    def enqueue(self, *args, **kwargs):
+        """
+        Queue a write to the endpoint without blocking on the bus.
+        Pending writes to the same endpoint are replaced, so that
+        only the latest value is sent.
+        """
+        payload = self.serialize(args, kwargs, self.convert)
+        if self.cache is not None:
+            self.cache.written(self.name, payload)
+        self.iface.enqueue(self.node_id, self.ep_id, payload=payload)
+
+    def inputs(self, args: Tuple, kwargs: Dict) -> Tuple:
+        """
+        Generate the list of input values from positional or keyword
+        arguments, filling in defaults for the missing ones
+        """
+        assert (
+            len(args) == 0 or len(kwargs) == 0
+        ), "Either positional or keyword arguments are supported, not both"
+        if len(kwargs) > 0:
+            assert self.labels
+            inputs = tuple(kwargs.get(k, d) for k, d in zip(self.labels, self.defaults))
+        elif len(args) >= len(self.labels):
+            return args[: len(self.labels)]
+        else:
+            inputs = args + self.defaults[len(args):]
+        missing = [k for k, v in zip(self.labels, inputs) if v is _missing]
+        if missing:
+            raise KeyError(", ".join(missing))
+        return inputs
+
+    def serialize(self, args: Tuple, kwargs: Dict, convert: bool = True):
+        """
+        Serialize positional or keyword arguments to a payload,
+        optionally converting quantities to endpoint units
+        """
+        if self.codec is None or (not args and not kwargs):
+            return None
+        inputs = self.inputs(args, kwargs)
+        if convert and self.units:
+            inputs = [
+                v.m_as(u) if isinstance(v, self._quantity_type) else v
+                for v, u in zip(inputs, self.units)
+            ]
+        return self.codec.serialize(inputs)
+
+
+class GetterSetter(Setter):
+    """
+    Accessor for read-write endpoints
+    """
+
+    def __call__(self, *args, **kwargs):
+        return self.present(self.request(self.serialize(args, kwargs, self.convert)))
+
+    def raw(self, *args, **kwargs):
+        """
+        Write and read the endpoint, accepting and returning
+        plain values without units
+        """
+        return self.present_raw(self.request(self.serialize(args, kwargs, False)))
+
+    def enqueue(self, *args, **kwargs):
+        raise TypeError("Writes to read-write endpoints cannot be queued")
+
+
+def create_accessor(tinymovr, name: str, endpoint: Dict) -> Accessor:
+    """
+    Create the appropriate accessor for an endpoint
+    """
+    ep_type: str = endpoint["type"]
+    if "w" in ep_type and "r" in ep_type:
+        return GetterSetter(tinymovr, name, endpoint)
+    elif "w" in ep_type:
+        return Setter(tinymovr, name, endpoint)
+    return Getter(tinymovr, name, endpoint)
+
+
+class AsyncGetter(Getter):
+    """
+    Accessor for read endpoints, returning awaitables
+    """
+
+    async def __call__(self):
+        return self.present(await self.request())
+
+    async def raw(self):
+        return self.present_raw(await self.request())
+
+    async def request(self, payload=None):
+        """
+        Issue a request according to the call policy, without
+        blocking the event loop, and return the response payload
+        """
+        stats: EndpointStats = self._recording
+        if stats is None:
+            return await self.policy.call_async(
+                lambda timeout: self._request_once(payload, timeout), self
+            )
+        stats.calls += 1
+        start: float = perf_counter()
+        response = await self.policy.call_async(
+            lambda timeout: self._request_once(payload, timeout), self
+        )
+        stats.latency.record(perf_counter() - start)
+        stats.bytes_sent += len(payload) if payload else 0
+        stats.bytes_received += len(response)
+        return response
+
+    async def _request_once(self, payload, timeout: float):
+        future = self.iface.request_async(self.node_id, self.ep_id, payload)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # Remove the request, so that a late response
+            # is not matched to a retry
+            self.iface.cancel(self.node_id, self.ep_id, future)
+            raise TimeoutError() from None
+        except asyncio.CancelledError:
+            self.iface.cancel(self.node_id, self.ep_id, future)
+            raise
+
+
+class AsyncSetter(Setter):
+    """
+    Accessor for write endpoints, returning awaitables
+    """
+
+    async def __call__(self, *args, **kwargs):
+        super().__call__(*args, **kwargs)
+
+    async def raw(self, *args, **kwargs):
+        super().raw(*args, **kwargs)
+
+
+class AsyncGetterSetter(Setter):
+    """
+    Accessor for read-write endpoints, returning awaitables
+    """
+
+    async def __call__(self, *args, **kwargs):
+        return self.present(await self.request(self.serialize(args, kwargs, self.convert)))
+
+    async def raw(self, *args, **kwargs):
+        return self.present_raw(await self.request(self.serialize(args, kwargs, False)))
+
+    request = AsyncGetter.request
+    _request_once = AsyncGetter._request_once
+    enqueue = GetterSetter.enqueue
+
+
+def create_async_accessor(tinymovr, name: str, endpoint: Dict) -> Accessor:
+    """
+    Create the appropriate asynchronous accessor for an endpoint
+    """
+    ep_type: str = endpoint["type"]
+    if "w" in ep_type and "r" in ep_type:
+        return AsyncGetterSetter(tinymovr, name, endpoint)
+    elif "w" in ep_type:
+        return AsyncSetter(tinymovr, name, endpoint)
+    return AsyncGetter(tinymovr, name, endpoint)
@@ -0,0 +1,167 @@
+""" Tinymovr asyncio module.
+
+This module includes the AsyncTinymovr class, the asyncio counterpart
+of the Tinymovr class. All endpoints are exposed as awaitables, e.g.:
+
+    tm = await AsyncTinymovr.create(node_id=1, iface=iface)
+    estimates = await tm.encoder_estimates
+    await tm.set_pos_setpoint(1000)
+
+Requests do not block the event loop, provided the interface can have
+multiple requests in flight, such as CANBus(bus, dispatch=True).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+from typing import Dict
+from tinymovr.iface import IFace
+from tinymovr.accessors import Accessor, AsyncGetter, create_async_accessor
+from tinymovr.constants import ControlStates, ControlModes
+from tinymovr.policy import CallPolicy
+from tinymovr.tinymovr import (
+    Tinymovr,
+    version_string,
+    check_fw_version,
+    check_studio_version,
+)
+
+
+class AsyncTinymovr:
+    def __init__(
+        self,
+        node_id: int,
+        iface: IFace,
+        raw=False,
+        timeout: float = None,
+        policy: CallPolicy = None,
+        policies: Dict[str, CallPolicy] = None,
+    ):
+        self.node_id: int = node_id
+        self.iface: IFace = iface
+        self.eps = self.iface.get_ep_map()
+        self.codec = self.iface.get_codec()
+        if timeout is not None:
+            policy = (policy or CallPolicy()).replace(timeout=timeout)
+        self._policy: CallPolicy = policy or CallPolicy()
+        self._policies: Dict[str, CallPolicy] = dict(policies or {})
+        self.fw_version: str = None
+        self._raw: bool = raw
+        self._accessors: Dict[str, Accessor] = {}
+        self._getters: Dict[str, AsyncGetter] = {}
+        for name, ep in self.eps.items():
+            accessor = create_async_accessor(self, name, ep)
+            self._accessors[name] = accessor
+            if "w" in ep["type"]:
+                setattr(self, name, accessor)
+            else:
+                self._getters[name] = accessor
+
+    @classmethod
+    async def create(cls, node_id: int, iface: IFace, version_check=True, **kwargs):
+        """
+        Create an instance and check firmware and Studio
+        version compatibility
+        """
+        tm = cls(node_id, iface, **kwargs)
+        await tm.check_versions(version_check)
+        return tm
+
+    async def check_versions(self, version_check=True):
+        """
+        Read the firmware version, and optionally check firmware
+        and Studio version compatibility
+        """
+        if not version_check:
+            self.fw_version = version_string(await self.device_info)
+            return
+        # Both requests are in flight at once
+        info, studio_version = await asyncio.gather(self.device_info, self.min_studio_version)
+        self.fw_version = version_string(info)
+        check_fw_version(self.fw_version)
+        check_studio_version(version_string(studio_version))
+
+    def __getattr__(self, attr: str):
+        # Only reached when regular attribute lookup fails, i.e. for read
+        # endpoints, as write endpoint accessors are instance attributes
+        try:
+            getter = self.__dict__["_getters"][attr]
+        except KeyError:
+            raise AttributeError(
+                "'{}' object has no attribute '{}'".format(type(self).__name__, attr)
+            ) from None
+        return getter()
+
+    @property
+    def raw(self) -> bool:
+        """
+        Whether raw mode is enabled, see Tinymovr.raw
+        """
+        return self._raw
+
+    @raw.setter
+    def raw(self, raw: bool):
+        self._raw = raw
+        for accessor in self._accessors.values():
+            accessor.set_raw(raw)
+
+    @property
+    def policy(self) -> CallPolicy:
+        """
+        The call policy of endpoints without a
+        policy of their own, see Tinymovr.policy
+        """
+        return self._policy
+
+    @policy.setter
+    def policy(self, policy: CallPolicy):
+        self._policy = policy
+        for accessor in self._accessors.values():
+            accessor.set_policy(policy, self._policies)
+
+    policies = Tinymovr.policies
+    set_policy = Tinymovr.set_policy
+    counters = Tinymovr.counters
+    reset_counters = Tinymovr.reset_counters
+    enable_stats = Tinymovr.enable_stats
+    stats = Tinymovr.stats
+    export_stats = Tinymovr.export_stats
+
+    def endpoint(self, ep_name: str) -> Accessor:
+        """
+        Get the accessor of an endpoint
+        """
+        return self._accessors[ep_name]
+
+    async def calibrate(self):
+        await self.set_state(ControlStates.Calibration)
+
+    async def idle(self):
+        await self.set_state(ControlStates.Idle)
+
+    async def position_control(self):
+        await self.set_state(ControlStates.ClosedLoopControl, ControlModes.PositionControl)
+
+    async def velocity_control(self):
+        await self.set_state(ControlStates.ClosedLoopControl, ControlModes.VelocityControl)
+
+    async def current_control(self):
+        await self.set_state(ControlStates.ClosedLoopControl, ControlModes.CurrentControl)
+
+    def __dir__(self):
+        eps = list(self.eps.keys())
+        blacklist = ["iface", "node_id", "fw_version"]
+        self_attrs = [
+            k
+            for k in object.__dir__(self)
+            if not k.startswith("_") and k not in blacklist and k not in eps
+        ]
+        return eps + self_attrs
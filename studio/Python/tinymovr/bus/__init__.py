@@ -1 +1,4 @@
 from tinymovr.bus.insilico import InSilico
+from tinymovr.bus.replay import Replay, decode_frames
+from tinymovr.bus.sim_server import SimServer
+from tinymovr.bus.sim_client import SimClient
@@ -0,0 +1,271 @@
+""" Tinymovr simulated controller module.
+
+This module includes the FirmwareController class, which simulates the
+closed loop control step of the firmware controller
+(firmware/src/controller/controller.c) for all nodes of a bus at once:
+trajectory planning, cascaded position, velocity and current loops,
+velocity and current limiting, and the motion of the rotor.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import Callable, List, Sequence, Tuple
+import numpy as np
+from tinymovr.constants import ErrorIDs
+from tinymovr.bus.physics import NodeStates, rad_to_ticks
+from tinymovr.bus.planner import MotionPlan, evaluate_plan, evaluate_plans, plan_fields
+
+# Constants of firmware/src/config.h
+PWM_FREQ_HZ: float = 20000.0
+VEL_HARD_LIMIT: float = 600000.0
+I_HARD_LIMIT: float = 60.0
+I_TRIP_MARGIN: float = 1.5
+INTEGRATOR_DECAY_FACTOR: float = 0.995
+INTEGRATOR_DECAY: float = 1.0 - INTEGRATOR_DECAY_FACTOR
+
+
+class FirmwareController:
+    """
+    A simulation of the firmware controller, stepped at rate Hz
+    (by default, the firmware PWM frequency).
+
+    The position and velocity loops, limits and trajectory planning
+    follow the firmware. The current loop is simulated as a first-order
+    lag with the bandwidth of the firmware current controller, and the
+    encoder and observer as exact, so that the simulated plant is a
+    rigid rotor driven by the measured current.
+
+    The coefficients of the control law are computed once per call of
+    run(), since node configuration and setpoints only change between
+    calls (except by trajectory planning). Nodes are then stepped
+    together, in vectorized operations, or, for buses of up to
+    scalar_nodes nodes, one at a time, in Python floats, which is
+    faster than NumPy on small arrays.
+    """
+
+    def __init__(self, rate: float = PWM_FREQ_HZ, scalar_nodes: int = 10):
+        self.rate: float = rate
+        self.dt: float = 1.0 / rate
+        self.scalar_nodes: int = scalar_nodes
+        self._remainder: float = 0.0
+
+    def run(self, states: NodeStates, duration: float):
+        """
+        Advance all nodes by duration seconds, in whole control steps.
+        Any remainder of less than a step is carried to the next call.
+        """
+        total: float = duration + self._remainder
+        steps: int = int(total * self.rate + 1e-6)
+        self._remainder = max(0.0, total - steps * self.dt)
+        if steps > 0 and len(states):
+            self._run(states, steps)
+
+    def _run(self, states: NodeStates, steps: int):
+        dt: float = self.dt
+        state: np.ndarray = states["state"]
+        mode: np.ndarray = states["mode"]
+        error: np.ndarray = states["error"]
+        names: Tuple[str, ...] = (
+            "position_estimate",
+            "velocity_estimate",
+            "current_estimate",
+            "vel_integrator_Iq",
+        )
+        x: List[np.ndarray] = [states[name] for name in names]
+
+        I_limit: np.ndarray = np.minimum(states["current_limit"], I_HARD_LIMIT)
+        tripped: np.ndarray = (state != 0) & (np.abs(x[2]) > I_limit * I_TRIP_MARGIN)
+        if tripped.any():
+            error[tripped] = ErrorIDs.OverCurrent
+            state[tripped] = 0
+
+        closed_loop: np.ndarray = state == 2
+        trajectory: np.ndarray = closed_loop & (mode >= 3)
+        # Loop gains are zeroed for nodes whose mode bypasses the loop,
+        # and the gains of the cascaded position and velocity loops are
+        # combined, to save operations in each step
+        pos_gain: np.ndarray = states["position_gain"] * (closed_loop & (mode >= 2))
+        velocity_loop: np.ndarray = closed_loop & (mode >= 1)
+        vel_gain: np.ndarray = states["velocity_gain"]
+        vel_loop_gain: np.ndarray = vel_gain * velocity_loop
+        integrator_gain: np.ndarray = states["vel_integrator_gain"] * velocity_loop * dt
+        deadband: np.ndarray = states["vel_integrator_deadband"]
+        # Current limits of the velocity limit are offset by the velocity
+        Iq_vel_limit: np.ndarray = np.minimum(states["velocity_limit"], VEL_HARD_LIMIT) * vel_gain
+        # Exact discretization of a first-order current loop
+        current_alpha: np.ndarray = -np.expm1(-states["current_bandwidth"] * dt) * closed_loop
+        accel_dt: float = dt * rad_to_ticks / (states.Kv_SI * states.inertia)
+        k: List = [
+            pos_gain * vel_loop_gain,
+            vel_loop_gain,
+            pos_gain * integrator_gain,
+            integrator_gain,
+            deadband,
+            -deadband,
+            vel_gain,
+            Iq_vel_limit,
+            -Iq_vel_limit,
+            I_limit,
+            -I_limit,
+            current_alpha,
+        ]
+        setpoints: List[np.ndarray] = [
+            states["position_setpoint"],
+            states["velocity_setpoint"],
+            states["current_setpoint"],
+        ]
+        x[2] *= closed_loop
+        x[3] *= velocity_loop
+
+        if len(states) <= self.scalar_nodes:
+            x_lists: List[List[float]] = [values.tolist() for values in x]
+            setpoint_lists: List[List[float]] = [values.tolist() for values in setpoints]
+            k_lists: List[List[float]] = [values.tolist() for values in k]
+            for index in range(len(states)):
+                node_setpoints: List[float] = [values[index] for values in setpoint_lists]
+                plan: NodePlan = None
+                if trajectory[index]:
+                    plan = NodePlan(states, index, node_setpoints)
+                node_x = control_steps(
+                    steps,
+                    dt,
+                    accel_dt,
+                    [values[index] for values in x_lists],
+                    node_setpoints,
+                    [values[index] for values in k_lists],
+                    min,
+                    max,
+                    plan,
+                )
+                for values, value in zip(x, node_x):
+                    values[index] = value
+                if plan:
+                    plan.store()
+            return
+        plan: Callable = None
+        if trajectory.any():
+
+            def plan(dt: float):
+                completed: np.ndarray = evaluate_plans(states, trajectory, dt)
+                if completed.any():
+                    # Position control, which follows, has the same gains
+                    states.complete_plans(completed)
+                    trajectory[completed] = False
+                return setpoints[0], setpoints[1]
+
+        x = control_steps(steps, dt, accel_dt, x, setpoints, k, np.minimum, np.maximum, plan)
+        for name, values in zip(names, x):
+            states[name][:] = values
+
+
+class NodePlan:
+    """
+    The motion plan of a single node, evaluated in Python floats
+    """
+
+    def __init__(self, states: NodeStates, index: int, setpoints: List[float]):
+        self.states: NodeStates = states
+        self.index: int = index
+        self.plan: MotionPlan = MotionPlan(*(states[name][index].item() for name in plan_fields))
+        self.t: float = states["t_plan"][index].item()
+        self.setpoints: Tuple[float, float] = (setpoints[0], setpoints[1])
+        self.completed: bool = False
+
+    def __call__(self, dt: float) -> Tuple[float, float]:
+        if not self.completed:
+            self.t += dt
+            setpoints: Tuple[float, float] = evaluate_plan(self.plan, self.t)
+            if setpoints is None:
+                self.completed = True
+            else:
+                self.setpoints = setpoints
+        return self.setpoints
+
+    def store(self):
+        """
+        Store the setpoints and time of the plan in the node state
+        """
+        self.states["position_setpoint"][self.index] = self.setpoints[0]
+        self.states["velocity_setpoint"][self.index] = self.setpoints[1]
+        self.states["t_plan"][self.index] = self.t
+        if self.completed:
+            completed: np.ndarray = np.zeros(len(self.states), dtype=bool)
+            completed[self.index] = True
+            self.states.complete_plans(completed)
+
+
+def control_steps(
+    steps: int,
+    dt: float,
+    accel_dt: float,
+    x: Sequence,
+    setpoints: Sequence,
+    k: Sequence,
+    minimum: Callable,
+    maximum: Callable,
+    plan: Callable[[float], Tuple] = None,
+) -> Tuple:
+    """
+    Run a number of steps of the control law and the plant, of
+    either a single node, with values in floats, or many nodes, with
+    values in arrays, and return the resulting state values. Only
+    arithmetic and the given minimum and maximum functions are used,
+    so that both are supported.
+    """
+    pos, vel, Iq_meas, integrator = x
+    pos_setpoint, vel_setpoint, Iq_setpoint = setpoints
+    (
+        pos_loop_gain,
+        vel_loop_gain,
+        pos_integrator_gain,
+        integrator_gain,
+        deadband,
+        neg_deadband,
+        vel_gain,
+        Iq_vel_limit,
+        neg_Iq_vel_limit,
+        I_limit,
+        neg_I_limit,
+        current_alpha,
+    ) = k
+    half_accel_dt2: float = 0.5 * accel_dt * dt
+    for _ in range(steps):
+        if plan is not None:
+            pos_setpoint, vel_setpoint = plan(dt)
+        delta_pos = pos_setpoint - pos
+        delta_vel = vel_setpoint - vel
+        # The integrator sees no position error within the deadband
+        delta_pos_integrator = delta_pos - maximum(minimum(delta_pos, deadband), neg_deadband)
+
+        Iq = (
+            Iq_setpoint
+            + integrator
+            + delta_vel * vel_loop_gain
+            + delta_pos * pos_loop_gain
+        )
+        integrator = (
+            integrator
+            + delta_vel * integrator_gain
+            + delta_pos_integrator * pos_integrator_gain
+        )
+
+        # Velocity-dependent, then absolute current limiting,
+        # each decaying the integrator when limiting
+        Iq_vel = vel * vel_gain
+        limited_Iq = maximum(minimum(Iq, Iq_vel_limit - Iq_vel), neg_Iq_vel_limit - Iq_vel)
+        integrator = integrator * (1.0 - INTEGRATOR_DECAY * (limited_Iq != Iq))
+        Iq = maximum(minimum(limited_Iq, I_limit), neg_I_limit)
+        integrator = integrator * (1.0 - INTEGRATOR_DECAY * (limited_Iq != Iq))
+
+        Iq_meas = Iq_meas + (Iq - Iq_meas) * current_alpha
+        pos = pos + vel * dt + Iq_meas * half_accel_dt2
+        vel = vel + Iq_meas * accel_dt
+    return pos, vel, Iq_meas, integrator
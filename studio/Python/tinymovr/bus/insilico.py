@@ -1,39 +1,99 @@
 import math
 import can
-import pkg_resources
-from time import sleep
-from datetime import datetime
-from typing import Tuple, List, Dict, Union
+import queue
+import time
+import threading
+from functools import partial
+from typing import Dict, FrozenSet, Iterable, List, Tuple
 from tinymovr.constants import ErrorIDs
+from tinymovr.bus.physics import NodeStates, NodeState, ENC_TICKS
+from tinymovr.bus.controller import FirmwareController, PWM_FREQ_HZ
+from tinymovr.bus.planner import prepare_plan_t_limit, prepare_plan_v_limit, plan_fields
 from tinymovr.codec import MultibyteCodec
 from tinymovr.iface.can_bus import create_frame, extract_node_message_id
 from tinymovr.iface.can_bus import can_endpoints
+from tinymovr.tinymovr import get_studio_version
 
-ENC_TICKS: int = 8192
-rad_to_ticks: float = ENC_TICKS / (2 * math.pi)
+# Config endpoints that are simply stored when written and returned
+# when read: read endpoint name -> (write endpoint name, default values)
+config_endpoints: Dict[str, Tuple[str, Tuple]] = {
+    "can_config": ("set_can_config", (None, 1000)),
+    "motor_config": ("set_motor_config", (0, 7, 5.0)),
+    "motor_RL": ("set_motor_RL", (0.2, 0.0001)),
+}
 
 
 class InSilico(can.BusABC):
     """
     A Bus subclass that implements a Tinymovr
     controller in silico
-    """
 
-    states: Dict[str, Union[int, float]] = {}
+    By default, the simulation runs in wall-clock time. If virtual_time
+    is True, simulation time starts at zero and only advances when
+    advance() is called, or by time_step seconds with each frame sent
+    (e.g. 0.001 for a 1 kHz control loop), so that simulations are
+    deterministic and can run much faster than real time:
+
+        bus = can.Bus(bustype="insilico", channel="test", virtual_time=True)
+        ...
+        bus.advance(0.5)
+
+    In virtual time mode, responses are generated when requests are
+    sent, so a thread that sends frames never waits for a response:
+    receiving from an empty buffer returns at once.
+
+    Each bus simulates its own set of nodes, which are created when
+    first addressed. The state of all nodes is held in the arrays of
+    the states attribute, and is advanced in one vectorized step, so
+    that fleets of hundreds of nodes can be simulated. If node_ids is
+    given, only nodes with these ids are present, and frames addressed
+    to other nodes are not responded to, as on a sparse bus.
+
+    By default, nodes are controlled by an ideal controller, which
+    tracks setpoints perfectly. If controller is "firmware", nodes
+    are controlled by a simulation of the firmware controller, with
+    cascaded position, velocity and current loops, limits and
+    trajectory planning, stepped at control_rate Hz (by default,
+    the 20 kHz of the firmware), e.g. to tune gains offline:
+
+        bus = can.Bus(bustype="insilico", channel="test",
+                      virtual_time=True, controller="firmware")
+    """
 
-    def __init__(self, channel, can_filters=None, **kwargs):
+    def __init__(
+        self,
+        channel,
+        can_filters=None,
+        virtual_time: bool = False,
+        time_step: float = 0.0,
+        controller: str = "ideal",
+        control_rate: float = PWM_FREQ_HZ,
+        node_ids: Iterable[int] = None,
+        **kwargs
+    ):
         super().__init__(channel, can_filters, **kwargs)
+        if controller not in ("ideal", "firmware"):
+            raise ValueError("Unknown controller: {}".format(controller))
+        self.controller: FirmwareController = (
+            FirmwareController(control_rate) if controller == "firmware" else None
+        )
+        self.node_ids: FrozenSet[int] = None if node_ids is None else frozenset(node_ids)
+        self.virtual_time: bool = virtual_time
+        self.time_step: float = time_step
+        self._time: float = 0.0 if virtual_time else time.perf_counter()
+        self._senders: threading.local = threading.local()
         self.channel_info: str = "Tinymovr Test Channel"
         self.node_id: int = 0
-        self.buffer: can.Message = None
+        self.buffer: queue.Queue = queue.Queue()
+        self.lock: threading.Lock = threading.Lock()
         self.codec: MultibyteCodec = MultibyteCodec()
         self.Kv_SI: float = 10.0
         R: float = 0.05
         M: float = 0.5
         self.I: float = M * R * R  # thin hoop formula
         self.TICKS: int = ENC_TICKS
-        self.last_call_time = datetime.now()
-        self.min_studio_version = pkg_resources.require("tinymovr")[0].version.split(".")
+        self.states: NodeStates = NodeStates(Kv_SI=self.Kv_SI, inertia=self.I)
+        self.min_studio_version = get_studio_version().split(".")
         self.ep_func_map: Dict[int, callable] = {
             0x03: self._get_state,
             0x04: self._get_min_studio_version,
@@ -44,6 +104,8 @@ class InSilico(can.BusABC):
             0x0D: self._set_vel_setpoint,
             0x0E: self._set_cur_setpoint,
             0x0F: self._set_limits,
+            0x12: self._get_vel_integrator_params,
+            0x13: self._set_vel_integrator_params,
             0x14: self._get_Iq_estimates,
             0x15: self._get_limits,
             0x16: self._reset,
@@ -51,76 +113,103 @@ class InSilico(can.BusABC):
             0x18: self._get_gains,
             0x19: self._set_gains,
             0x1A: self._get_device_info,
+            0x20: self._plan_t_limit,
+            0x21: self._plan_v_limit,
+            0x22: self._set_max_plan_acc_dec,
+            0x23: self._get_max_plan_acc_dec,
             0x25: self._get_set_pos_vel,
             0x26: self._get_set_pos_vel_Iq,
         }
+        for get_name, (set_name, _) in config_endpoints.items():
+            self.ep_func_map[can_endpoints[get_name]["ep_id"]] = partial(
+                self._get_config, get_name
+            )
+            self.ep_func_map[can_endpoints[set_name]["ep_id"]] = partial(
+                self._set_config, get_name
+            )
         self.legacy_errors = False
-        self._state = None
+        self._state: NodeState = None
 
     def send(self, msg: can.Message):
         arbitration_id: int = msg.arbitration_id
         node_id, msg_id = extract_node_message_id(arbitration_id)
-        if not node_id in self.states:
-            self.states[node_id] = {
-                "error": 0,
-                "state": 0,
-                "mode": 0,
-                "position_estimate": 0,
-                "velocity_estimate": 0,
-                "current_estimate": 0,
-                "position_setpoint": 0,
-                "velocity_setpoint": 0,
-                "current_setpoint": 0,
-                "velocity_limit": 200000,
-                "current_limit": 10,
-                "position_gain": 20,
-                "velocity_gain": 1e-5,
-                "vbus": 12.0,
-                "calibrated": False,
-            }
-        self.node_id = node_id
-        self._state = self.states[node_id]
-        self._update_state()
-        self.ep_func_map[msg_id](msg.data)
+        self._senders.sent = True
+        with self.lock:
+            if self.time_step:
+                self._advance(self.time_step)
+            self._update_state()
+            if self.node_ids is not None and node_id not in self.node_ids:
+                return
+            self.node_id = node_id
+            self._state = self.states.node(node_id)
+            # Endpoints that are not simulated do not respond
+            if msg_id in self.ep_func_map:
+                self.ep_func_map[msg_id](msg.data)
+                if not self.controller:
+                    # The ideal controller tracks new setpoints at once
+                    self.states.integrate(0.0)
+
+    def recv(self, timeout: float = None) -> can.Message:
+        if self.virtual_time and getattr(self._senders, "sent", False):
+            # Responses to this thread's requests, if any,
+            # are already in the buffer
+            timeout = 0
+        return super().recv(timeout)
 
     def _recv_internal(self, timeout: float) -> can.Message:
-        self._update_state()
-        if self.buffer:
-            msg: can.Message = self.buffer
-            self.buffer = None
-            return msg, True
-        if timeout > 0:
-            sleep(timeout)
-        return None, True
+        with self.lock:
+            self._update_state()
+        try:
+            # Wait for a response, if any, instead of sleeping
+            # for the whole timeout
+            if timeout is None or timeout > 0:
+                return self.buffer.get(timeout=timeout), True
+            return self.buffer.get_nowait(), True
+        except queue.Empty:
+            return None, True
+
+    @property
+    def time(self) -> float:
+        """
+        The simulation time, in seconds. In virtual time mode, this
+        starts at zero and only advances with advance() and time steps.
+        """
+        return self._time
+
+    def advance(self, duration: float, max_step: float = 0.001):
+        """
+        Advance virtual time by duration seconds, integrating the
+        state of all nodes in steps of at most max_step seconds, or
+        in control steps if simulating the firmware controller
+        """
+        if not self.virtual_time:
+            raise RuntimeError("Time can only be advanced in virtual time mode")
+        with self.lock:
+            self._advance(duration, max_step)
+
+    def _advance(self, duration: float, max_step: float = 0.001):
+        if self.controller:
+            self.controller.run(self.states, duration)
+        else:
+            steps: int = max(1, int(math.ceil(duration / max_step - 1e-9)))
+            dt: float = duration / steps
+            for _ in range(steps):
+                self.states.integrate(dt)
+        self._time += duration
 
     def _update_state(self):
-        time_now = datetime.now()
-        dt = (time_now - self.last_call_time).total_seconds()
-        self.last_call_time = time_now
-
-        if self._state["state"] == 2:
-            self._state["current_estimate"] = self._state["current_setpoint"]
-            if self._state["mode"] == 0:
-                torque = self._state["current_estimate"] / self.Kv_SI
-                v: float = self._state["velocity_estimate"]
-                a: float = torque / self.I
-                self._state["velocity_estimate"] += a * rad_to_ticks * dt
-                self._state["position_estimate"] += (
-                    v + 0.5 * a * rad_to_ticks * dt
-                ) * dt
-            elif self._state["mode"] == 1:
-                self._state["current_estimate"] = 0
-                v: float = self._state["velocity_estimate"]
-                self._state["velocity_estimate"] = self._state["velocity_setpoint"]
-                self._state["position_estimate"] += v * dt
-            elif self._state["mode"] == 2:
-                self._state["current_estimate"] = 0
-                self._state["velocity_estimate"] = 0
-                self._state["position_estimate"] = self._state["position_setpoint"]
-        if self._state["state"] == 0:
-            self._state["current_estimate"] = 0
-            v: float = self._state["velocity_estimate"]
-            self._state["position_estimate"] += v * dt
+        """
+        Integrate the state of all nodes up to the
+        current time, in wall-clock time mode
+        """
+        if self.virtual_time:
+            return
+        time_now: float = time.perf_counter()
+        if self.controller:
+            self.controller.run(self.states, time_now - self._time)
+        else:
+            self.states.integrate(time_now - self._time)
+        self._time = time_now
 
     # ---- Endpoint methods -----------------------------------------
 
@@ -148,11 +237,11 @@ class InSilico(can.BusABC):
                 0,
             )
         gen_payload = self.codec.serialize(vals, *can_endpoints["state"]["types"])
-        self.buffer = create_frame(self.node_id, 0x03, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x03, False, gen_payload))
 
     def _get_min_studio_version(self, payload):
         gen_payload = self.codec.serialize(self.min_studio_version, *can_endpoints["min_studio_version"]["types"])
-        self.buffer = create_frame(self.node_id, 0x04, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x04, False, gen_payload))
 
     def _set_state(self, payload):
         vals = self.codec.deserialize(payload, *can_endpoints["set_state"]["types"])
@@ -163,6 +252,8 @@ class InSilico(can.BusABC):
                     self._state["calibrated"] = True
                 elif new_state == 2 and self._state["calibrated"]:
                     self._state["state"] = 2
+                    # Hold the current position
+                    self._state["position_setpoint"] = self._state["position_estimate"]
                 elif new_state == 2:
                     self._state["error"] = ErrorIDs.InvalidState
             elif self._state["state"] == 2:
@@ -173,15 +264,39 @@ class InSilico(can.BusABC):
                     self._state["state"] = 0
         self._state["mode"] = vals[1]
 
+    def _get_config(self, ep_name, payload):
+        defaults: Tuple = config_endpoints[ep_name][1]
+        if ep_name == "can_config":
+            defaults = (self.node_id,) + defaults[1:]
+        vals: Tuple = self._state["config"].get(ep_name, defaults)
+        if ep_name == "motor_config":
+            # As in the firmware, flags are read as calibrated | is_gimbal << 1
+            vals = (int(bool(self._state["calibrated"])) | (vals[0] << 1),) + vals[1:]
+        gen_payload = self.codec.serialize(vals, *can_endpoints[ep_name]["types"])
+        self.buffer.put(
+            create_frame(self.node_id, can_endpoints[ep_name]["ep_id"], False, gen_payload)
+        )
+
+    def _set_config(self, ep_name, payload):
+        vals = tuple(self.codec.deserialize(payload, *can_endpoints[ep_name]["types"]))
+        if ep_name == "can_config" and vals[1] == 0:
+            # Zero baud rate leaves the baud rate unchanged
+            previous = self._state["config"].get(ep_name, config_endpoints[ep_name][1])
+            vals = (vals[0], previous[1])
+        elif ep_name == "motor_config":
+            # As in the firmware, bit 0 of written flags is is_gimbal
+            vals = (vals[0] & 1,) + vals[1:]
+        self._state["config"][ep_name] = vals
+
     def _get_vbus(self, payload):
         vals: Tuple = (self._state["vbus"],)
         gen_payload = self.codec.serialize(vals, *can_endpoints["Vbus"]["types"])
-        self.buffer = create_frame(self.node_id, 0x17, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x17, False, gen_payload))
 
     def _get_device_info(self, payload):
         vals: Tuple = (0, 0, 8, 15, 25)
         gen_payload = self.codec.serialize(vals, *can_endpoints["device_info"]["types"])
-        self.buffer = create_frame(self.node_id, 0x1A, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x1A, False, gen_payload))
 
     def _get_encoder_estimates(self, payload):
         vals: Tuple = (
@@ -191,7 +306,7 @@ class InSilico(can.BusABC):
         gen_payload = self.codec.serialize(
             vals, *can_endpoints["encoder_estimates"]["types"]
         )
-        self.buffer = create_frame(self.node_id, 0x09, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x09, False, gen_payload))
 
     def _get_setpoints(self, payload):
         vals: Tuple = (
@@ -199,12 +314,12 @@ class InSilico(can.BusABC):
             self._state["velocity_setpoint"],
         )
         gen_payload = self.codec.serialize(vals, *can_endpoints["setpoints"]["types"])
-        self.buffer = create_frame(self.node_id, 0x0A, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x0A, False, gen_payload))
 
     def _get_Iq_estimates(self, payload):
-        vals: Tuple = (self._state["current_estimate"], self._state["current_setpoint"])
+        vals: Tuple = (self._state["current_setpoint"], self._state["current_estimate"])
         gen_payload = self.codec.serialize(vals, *can_endpoints["Iq"]["types"])
-        self.buffer = create_frame(self.node_id, 0x14, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x14, False, gen_payload))
 
     def _set_pos_setpoint(self, payload):
         vals: List = self.codec.deserialize(
@@ -231,41 +346,131 @@ class InSilico(can.BusABC):
         vals: List = self.codec.deserialize(
             payload, *can_endpoints["set_limits"]["types"]
         )
-        self._state["velocity_limit"] = vals[0]
-        self._state["current_limit"] = vals[1]
+        # Limits that are not positive are ignored
+        if vals[0] > 0:
+            self._state["velocity_limit"] = vals[0]
+        if vals[1] > 0:
+            self._state["current_limit"] = vals[1]
 
     def _get_limits(self, payload):
         vals: Tuple = (self._state["velocity_limit"], self._state["current_limit"])
         gen_payload = self.codec.serialize(vals, *can_endpoints["limits"]["types"])
-        self.buffer = create_frame(self.node_id, 0x15, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x15, False, gen_payload))
 
     def _set_gains(self, payload):
         vals: List = self.codec.deserialize(
             payload, *can_endpoints["set_gains"]["types"]
         )
-        self._state["position_gain"] = vals[0]
-        self._state["velocity_gain"] = vals[1]
+        # Gains that are not positive are ignored
+        if vals[0] > 0:
+            self._state["position_gain"] = vals[0]
+        if vals[1] > 0:
+            self._state["velocity_gain"] = vals[1]
 
     def _get_gains(self, payload):
         vals: Tuple = (self._state["position_gain"], self._state["velocity_gain"])
         gen_payload = self.codec.serialize(vals, *can_endpoints["gains"]["types"])
-        self.buffer = create_frame(self.node_id, 0x18, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x18, False, gen_payload))
+
+    def _get_vel_integrator_params(self, payload):
+        vals: Tuple = (
+            self._state["vel_integrator_gain"],
+            self._state["vel_integrator_deadband"],
+        )
+        gen_payload = self.codec.serialize(
+            vals, *can_endpoints["vel_integrator_params"]["types"]
+        )
+        self.buffer.put(create_frame(self.node_id, 0x12, False, gen_payload))
+
+    def _set_vel_integrator_params(self, payload):
+        vals: List = self.codec.deserialize(
+            payload, *can_endpoints["set_vel_integrator_params"]["types"]
+        )
+        if vals[0] >= 0 and vals[1] >= 0:
+            self._state["vel_integrator_gain"] = vals[0]
+            self._state["vel_integrator_deadband"] = vals[1]
+
+    def _plan_t_limit(self, payload):
+        vals: List = self.codec.deserialize(
+            payload, *can_endpoints["plan_t_limit"]["types"]
+        )
+        if self._state["error"]:
+            return
+        t_tot: float = vals[1] * 1e-3
+        plan, error = prepare_plan_t_limit(
+            self._state["position_setpoint"],
+            self._state["velocity_setpoint"],
+            vals[0],
+            t_tot,
+            t_tot * vals[2] / 256.0,
+            t_tot * vals[3] / 256.0,
+            self._state["velocity_limit"],
+        )
+        if error:
+            self._state["error"] = error
+            self._state["state"] = 0
+        elif plan:
+            self._start_plan(plan)
+
+    def _plan_v_limit(self, payload):
+        vals: List = self.codec.deserialize(
+            payload, *can_endpoints["plan_v_limit"]["types"]
+        )
+        if vals[1] <= 0:
+            return
+        self._state["max_vel"] = vals[1]
+        if self._state["error"]:
+            return
+        plan = prepare_plan_v_limit(
+            self._state["position_setpoint"],
+            self._state["velocity_setpoint"],
+            vals[0],
+            vals[1],
+            self._state["max_accel"],
+            self._state["max_decel"],
+        )
+        self._start_plan(plan)
+
+    def _start_plan(self, plan):
+        for name, value in zip(plan_fields, plan):
+            self._state[name] = value
+        self._state["t_plan"] = 0.0
+        self._state["mode"] = 3
+
+    def _set_max_plan_acc_dec(self, payload):
+        vals: List = self.codec.deserialize(
+            payload, *can_endpoints["set_max_plan_acc_dec"]["types"]
+        )
+        if vals[0] > 0 and vals[1] > 0:
+            self._state["max_accel"] = vals[0]
+            self._state["max_decel"] = vals[1]
+
+    def _get_max_plan_acc_dec(self, payload):
+        vals: Tuple = (self._state["max_accel"], self._state["max_decel"])
+        gen_payload = self.codec.serialize(
+            vals, *can_endpoints["get_max_plan_acc_dec"]["types"]
+        )
+        self.buffer.put(create_frame(self.node_id, 0x23, False, gen_payload))
 
     def _reset(self, payload):
-        vals = {
-            "error": 0,
-            "state": 0,
-            "mode": 0,
-            "position_estimate": 0,
-            "current_estimate": 0,
-            "position_setpoint": 0,
-            "velocity_setpoint": 0,
-            "current_setpoint": 0,
-            "velocity_limit": 200000,
-            "current_limit": 10,
-            "calibrated": False,
-        }
-        self._state.update(vals)
+        self.states.reset(
+            self._state.index,
+            (
+                "error",
+                "state",
+                "mode",
+                "position_estimate",
+                "current_estimate",
+                "position_setpoint",
+                "velocity_setpoint",
+                "current_setpoint",
+                "velocity_limit",
+                "current_limit",
+                "vel_integrator_Iq",
+                "t_plan",
+                "calibrated",
+            ),
+        )
 
     def _get_set_pos_vel(self, payload):
         set_vals: List = self.codec.deserialize(
@@ -281,7 +486,7 @@ class InSilico(can.BusABC):
         gen_payload = self.codec.serialize(
             ret_vals, *can_endpoints["get_set_pos_vel"]["types"]
         )
-        self.buffer = create_frame(self.node_id, 0x025, False, gen_payload)
+        self.buffer.put(create_frame(self.node_id, 0x025, False, gen_payload))
 
     def _get_set_pos_vel_Iq(self, payload):
         set_vals: List = self.codec.deserialize(
@@ -299,4 +504,4 @@ class InSilico(can.BusABC):
         gen_payload = self.codec.serialize(
             ret_vals, *can_endpoints["get_set_pos_vel_Iq"]["types"]
         )
-        self.buffer = create_frame(self.node_id, 0x026, False, gen_payload)
\ No newline at end of file
+        self.buffer.put(create_frame(self.node_id, 0x026, False, gen_payload))
\ No newline at end of file
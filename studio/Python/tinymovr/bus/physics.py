@@ -0,0 +1,202 @@
+""" Tinymovr simulation physics module.
+
+This module includes the NodeStates class, which holds the state of
+all simulated nodes of a bus in NumPy arrays, one element per node,
+and advances all nodes in a single vectorized step of an ideal
+controller, and the NodeState class, a dictionary-like view of a
+single node's state.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+from tinymovr.bus.planner import evaluate_plans, plan_fields
+
+ENC_TICKS: int = 8192
+rad_to_ticks: float = ENC_TICKS / (2 * math.pi)
+
+# State fields of each node: name -> (dtype, initial value).
+# Initial values of configuration follow the firmware defaults.
+fields: Dict[str, Tuple[type, Any]] = {
+    "error": (np.int64, 0),
+    "state": (np.int64, 0),
+    "mode": (np.int64, 0),
+    "position_estimate": (np.float64, 0.0),
+    "velocity_estimate": (np.float64, 0.0),
+    "current_estimate": (np.float64, 0.0),
+    "position_setpoint": (np.float64, 0.0),
+    "velocity_setpoint": (np.float64, 0.0),
+    "current_setpoint": (np.float64, 0.0),
+    "velocity_limit": (np.float64, 300000.0),
+    "current_limit": (np.float64, 10.0),
+    "position_gain": (np.float64, 20.0),
+    "velocity_gain": (np.float64, 8e-5),
+    "vel_integrator_gain": (np.float64, 0.0002),
+    "vel_integrator_deadband": (np.float64, 200.0),
+    "vel_integrator_Iq": (np.float64, 0.0),
+    "current_bandwidth": (np.float64, 1000.0),
+    "max_accel": (np.float64, float(ENC_TICKS)),
+    "max_decel": (np.float64, float(ENC_TICKS)),
+    "max_vel": (np.float64, 50000.0),
+    "t_plan": (np.float64, 0.0),
+    "vbus": (np.float64, 12.0),
+    "calibrated": (np.bool_, False),
+}
+fields.update({name: (np.float64, 0.0) for name in plan_fields})
+
+
+class NodeStates:
+    """
+    The state of a set of simulated nodes, held in one array per
+    field, which grow as nodes are added. All nodes are integrated
+    together by integrate(), so that the cost of a simulation step
+    grows slowly with the number of nodes.
+
+    integrate() simulates an ideal controller, which tracks setpoints
+    perfectly. See tinymovr.bus.controller for a simulation of the
+    firmware controller.
+    """
+
+    def __init__(self, capacity: int = 16, Kv_SI: float = 10.0, inertia: float = 0.5 * 0.05 * 0.05):
+        self.Kv_SI: float = Kv_SI
+        self.inertia: float = inertia
+        self.index: Dict[int, int] = {}
+        self.size: int = 0
+        self.configs: List[Dict] = []
+        self._arrays: Dict[str, np.ndarray] = {
+            name: np.full(capacity, initial, dtype=dtype)
+            for name, (dtype, initial) in fields.items()
+        }
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self.index
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.index)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        Return the values of a field for all nodes, in
+        the order the nodes were added, as a writable view
+        """
+        return self._arrays[name][: self.size]
+
+    def add(self, node_id: int) -> int:
+        """
+        Add a node in its initial state, if not already
+        present, and return the index of its values
+        """
+        if node_id in self.index:
+            return self.index[node_id]
+        capacity: int = len(self._arrays["state"])
+        if self.size == capacity:
+            for name, (dtype, initial) in fields.items():
+                array: np.ndarray = np.full(2 * capacity, initial, dtype=dtype)
+                array[:capacity] = self._arrays[name]
+                self._arrays[name] = array
+        index: int = self.size
+        self.index[node_id] = index
+        self.configs.append({})
+        self.size += 1
+        return index
+
+    def node(self, node_id: int) -> "NodeState":
+        """
+        Return a view of the state of a node, adding it if not present
+        """
+        return NodeState(self, self.add(node_id))
+
+    def reset(self, index: int, names: Tuple[str, ...]):
+        """
+        Reset some fields of a node to their initial values
+        """
+        for name in names:
+            self._arrays[name][index] = fields[name][1]
+
+    def integrate(self, dt: float):
+        """
+        Advance the state of all nodes by dt seconds
+        """
+        n: int = self.size
+        if not n:
+            return
+        state: np.ndarray = self._arrays["state"][:n]
+        mode: np.ndarray = self._arrays["mode"][:n]
+        pos: np.ndarray = self._arrays["position_estimate"][:n]
+        vel: np.ndarray = self._arrays["velocity_estimate"][:n]
+        cur: np.ndarray = self._arrays["current_estimate"][:n]
+
+        closed_loop: np.ndarray = state == 2
+        trajectory_mode: np.ndarray = closed_loop & (mode == 3)
+        if trajectory_mode.any():
+            self.complete_plans(evaluate_plans(self, trajectory_mode, dt))
+        current_mode: np.ndarray = closed_loop & (mode == 0)
+        velocity_mode: np.ndarray = closed_loop & (mode == 1)
+        # Trajectories are tracked as position setpoints
+        position_mode: np.ndarray = closed_loop & (mode >= 2)
+        coasting: np.ndarray = (state == 0) | velocity_mode
+
+        # Current control accelerates the rotor, as a rigid body
+        np.copyto(cur, self._arrays["current_setpoint"][:n], where=closed_loop)
+        accel: np.ndarray = cur / self.Kv_SI / self.inertia * rad_to_ticks
+        pos += np.where(current_mode, (vel + 0.5 * accel * dt) * dt, 0.0)
+        pos += np.where(coasting, vel * dt, 0.0)
+        vel += np.where(current_mode, accel * dt, 0.0)
+        # Velocity and position control track their setpoints perfectly
+        np.copyto(vel, self._arrays["velocity_setpoint"][:n], where=velocity_mode)
+        np.copyto(pos, self._arrays["position_setpoint"][:n], where=position_mode)
+        vel[position_mode] = 0.0
+        np.copyto(vel, self._arrays["velocity_setpoint"][:n], where=trajectory_mode)
+        cur[coasting | position_mode] = 0.0
+
+    def complete_plans(self, completed: np.ndarray):
+        """
+        Drop nodes whose motion plans have completed to position control
+        """
+        if completed.any():
+            self["mode"][completed] = 2
+            self["t_plan"][completed] = 0.0
+
+
+class NodeState:
+    """
+    A dictionary-like view of the state of a single node, whose
+    values are read from, and written to, the arrays of NodeStates
+    """
+
+    __slots__ = ("states", "index")
+
+    def __init__(self, states: NodeStates, index: int):
+        self.states: NodeStates = states
+        self.index: int = index
+
+    def __getitem__(self, name: str):
+        if name == "config":
+            return self.states.configs[self.index]
+        return self.states._arrays[name][self.index].item()
+
+    def __setitem__(self, name: str, value):
+        self.states._arrays[name][self.index] = value
+
+    def get(self, name: str, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def update(self, values: Dict):
+        for name, value in values.items():
+            self[name] = value
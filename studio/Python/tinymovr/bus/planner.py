@@ -0,0 +1,195 @@
+""" Tinymovr simulated trajectory planner module.
+
+This module includes functions that prepare and evaluate trapezoidal
+motion plans for simulated nodes, following the firmware trajectory
+planner (firmware/src/controller/trajectory_planner.c). Plans are
+prepared one node at a time, as requested, and evaluated either for
+a single node, or for all nodes at once.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+from collections import namedtuple
+from typing import Tuple
+import numpy as np
+from tinymovr.constants import ErrorIDs
+
+MotionPlan = namedtuple(
+    "MotionPlan",
+    [
+        "p_0",
+        "v_0",
+        "acc",
+        "dec",
+        "v_cruise",
+        "t_acc_cruise",
+        "t_cruise_dec",
+        "t_end",
+        "p_acc_cruise",
+        "p_cruise_dec",
+    ],
+)
+MotionPlan.__new__.__defaults__ = (0.0,) * len(MotionPlan._fields)
+
+# Names of the node state fields holding the motion plan
+plan_fields: Tuple[str, ...] = tuple("plan_" + name for name in MotionPlan._fields)
+
+
+def prepare_plan_t_limit(
+    p_0: float,
+    v_0: float,
+    p_target: float,
+    deltat_tot: float,
+    deltat_acc: float,
+    deltat_dec: float,
+    vel_limit: float,
+) -> Tuple[MotionPlan, int]:
+    """
+    Prepare a plan reaching p_target in deltat_tot seconds, accelerating
+    for deltat_acc and decelerating for deltat_dec seconds, and return
+    the plan, or None and the error it raised, if any
+    """
+    S: float = p_target - p_0
+    deltat_cruise: float = deltat_tot - deltat_acc - deltat_dec
+    if deltat_tot < 0 or deltat_acc < 0 or deltat_dec < 0 or deltat_cruise < 0:
+        return None, ErrorIDs.InvalidPlannerInput
+    if S == 0:
+        return None, 0
+    duration: float = 0.5 * deltat_acc + deltat_cruise + 0.5 * deltat_dec
+    if duration == 0:
+        return None, ErrorIDs.PlannerVCruiseOverLimit
+    v_cruise: float = (S - 0.5 * deltat_acc * v_0) / duration
+    if abs(v_cruise) > vel_limit:
+        return None, ErrorIDs.PlannerVCruiseOverLimit
+    # Zero-duration phases have no acceleration, rather
+    # than an infinite one as in the firmware
+    acc: float = (v_cruise - v_0) / deltat_acc if deltat_acc else 0.0
+    dec: float = v_cruise / deltat_dec if deltat_dec else 0.0
+    p_acc_cruise: float = p_0 + v_0 * deltat_acc + 0.5 * acc * deltat_acc * deltat_acc
+    plan = MotionPlan(
+        p_0=p_0,
+        v_0=v_0,
+        acc=acc,
+        dec=dec,
+        v_cruise=v_cruise,
+        t_acc_cruise=deltat_acc,
+        t_cruise_dec=deltat_acc + deltat_cruise,
+        t_end=deltat_tot,
+        p_acc_cruise=p_acc_cruise,
+        p_cruise_dec=p_acc_cruise + v_cruise * deltat_cruise,
+    )
+    return plan, 0
+
+
+def prepare_plan_v_limit(
+    p_0: float, v_0: float, p_target: float, v_max: float, a_max: float, d_max: float
+) -> MotionPlan:
+    """
+    Prepare a plan reaching p_target with velocity limited to v_max,
+    and acceleration and deceleration limited to a_max and d_max
+    """
+    S: float = p_target - p_0
+    sign: float = 1.0 if S >= 0 else -1.0
+    if v_0 * v_0 > abs(2 * d_max * S):
+        # Full stop, overshooting the target
+        sign_fs: float = 1.0 if v_0 >= 0 else -1.0
+        deltat_dec: float = sign_fs * v_0 / d_max
+        return MotionPlan(
+            p_0=p_0,
+            v_0=v_0,
+            dec=sign_fs * d_max,
+            v_cruise=v_0,
+            t_end=deltat_dec,
+            p_acc_cruise=p_0,
+            p_cruise_dec=p_0,
+        )
+    acc: float = sign * a_max
+    dec: float = sign * d_max
+    S_vmax: float = (v_max * v_max - v_0 * v_0) / (2 * a_max) + (v_max * v_max) / (2 * d_max)
+    if abs(S) < S_vmax:
+        # Triangular profile
+        v_cruise: float = sign * math.sqrt(
+            (2 * a_max * d_max * abs(S) + d_max * v_0 * v_0) / (a_max + d_max)
+        )
+        deltat_cruise: float = 0.0
+    else:
+        # Trapezoidal profile
+        v_cruise = sign * v_max
+        deltat_cruise = (S - sign * S_vmax) / v_cruise
+    deltat_acc: float = (v_cruise - v_0) / acc
+    p_acc_cruise: float = p_0 + v_0 * deltat_acc + 0.5 * acc * deltat_acc * deltat_acc
+    return MotionPlan(
+        p_0=p_0,
+        v_0=v_0,
+        acc=acc,
+        dec=dec,
+        v_cruise=v_cruise,
+        t_acc_cruise=deltat_acc,
+        t_cruise_dec=deltat_acc + deltat_cruise,
+        t_end=deltat_acc + deltat_cruise + v_cruise / dec,
+        p_acc_cruise=p_acc_cruise,
+        p_cruise_dec=p_acc_cruise + v_cruise * deltat_cruise,
+    )
+
+
+def evaluate_plan(plan: MotionPlan, t: float) -> Tuple[float, float]:
+    """
+    Return the position and velocity setpoints of a plan at
+    time t, or None if t is past the end of the plan
+    """
+    if t < plan.t_acc_cruise:
+        return plan.p_0 + plan.v_0 * t + 0.5 * plan.acc * t * t, plan.v_0 + plan.acc * t
+    if t < plan.t_cruise_dec:
+        return plan.p_acc_cruise + plan.v_cruise * (t - plan.t_acc_cruise), plan.v_cruise
+    if t <= plan.t_end:
+        tr: float = t - plan.t_cruise_dec
+        return (
+            plan.p_cruise_dec + plan.v_cruise * tr - 0.5 * plan.dec * tr * tr,
+            plan.v_cruise - plan.dec * tr,
+        )
+    return None
+
+
+def evaluate_plans(states, active: np.ndarray, dt: float) -> np.ndarray:
+    """
+    Advance the plan time of nodes in the active mask by dt seconds and
+    set their position and velocity setpoints from their plans, as
+    evaluate_plan() does for a single node. Return
+    the mask of nodes whose plans have completed, whose setpoints are
+    left unchanged.
+    """
+    t: np.ndarray = states["t_plan"]
+    t += dt * active
+    p_0, v_0, acc, dec, v_cruise, t_acc_cruise, t_cruise_dec, t_end, p_acc_cruise, p_cruise_dec = (
+        states[name] for name in plan_fields
+    )
+    accelerating: np.ndarray = t < t_acc_cruise
+    cruising: np.ndarray = t < t_cruise_dec
+    tr_cruise: np.ndarray = t - t_acc_cruise
+    tr_dec: np.ndarray = t - t_cruise_dec
+    position: np.ndarray = np.where(
+        accelerating,
+        p_0 + v_0 * t + 0.5 * acc * t * t,
+        np.where(
+            cruising,
+            p_acc_cruise + v_cruise * tr_cruise,
+            p_cruise_dec + v_cruise * tr_dec - 0.5 * dec * tr_dec * tr_dec,
+        ),
+    )
+    velocity: np.ndarray = np.where(
+        accelerating, v_0 + acc * t, np.where(cruising, v_cruise, v_cruise - dec * tr_dec)
+    )
+    completed: np.ndarray = active & (t > t_end)
+    running: np.ndarray = active & ~completed
+    np.copyto(states["position_setpoint"], position, where=running)
+    np.copyto(states["velocity_setpoint"], velocity, where=running)
+    return completed
@@ -0,0 +1,150 @@
+""" Tinymovr replay bus module.
+
+This module includes a Bus subclass that replays frames from CAN log
+files in any format python-can can read (candump .log, .asc, .blf,
+.csv, .trc...), and a generator that decodes frames through the
+endpoint map. Frames are read lazily, so that arbitrarily large
+captures can be replayed without loading them into memory.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+import threading
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, Tuple
+import can
+
+from tinymovr.codec import compile_codec
+from tinymovr.iface.can_bus import can_endpoints, extract_node_message_id
+
+
+DecodedFrame = namedtuple("DecodedFrame", ["timestamp", "node_id", "ep_name", "values"])
+
+
+class Replay(can.BusABC):
+    """
+    A Bus subclass that replays frames from a CAN log file. The
+    channel is the path of the log file, e.g.:
+
+        bus = can.Bus(bustype="replay", channel="capture.log", speed=10.0)
+
+    Frames are received at the pace they were captured, scaled by
+    speed (1.0 is real time, 10.0 is ten times faster). If speed is
+    None, frames are received as fast as possible. Received frames
+    keep their original timestamps. Frames sent to the bus are
+    discarded. Once the log is exhausted, the bus receives nothing,
+    and the finished property becomes True.
+    """
+
+    def __init__(self, channel, can_filters=None, speed: float = None, **kwargs):
+        super().__init__(channel, can_filters, **kwargs)
+        self.channel_info: str = "Tinymovr Replay: {}".format(channel)
+        self.path: str = str(channel)
+        self.speed: float = speed
+        self.finished: bool = False
+        self._reader = can.LogReader(self.path)
+        self._frames: Iterator[can.Message] = iter(self._reader)
+        self._pending: can.Message = None
+        self._start: Tuple[float, float] = None
+        self._shutdown: threading.Event = threading.Event()
+
+    def send(self, msg: can.Message, timeout: float = None):
+        pass
+
+    def _recv_internal(self, timeout: float) -> can.Message:
+        frame: can.Message = self._next()
+        if frame is None:
+            # Nothing left to replay, wait like an idle bus
+            self._shutdown.wait(timeout)
+            return None, False
+        delay: float = self._delay(frame)
+        if timeout is not None and delay > timeout:
+            self._shutdown.wait(timeout)
+            return None, False
+        if delay > 0:
+            self._shutdown.wait(delay)
+        self._pending = None
+        return frame, False
+
+    def frames(self) -> Iterator[can.Message]:
+        """
+        Iterate over the remaining frames at the replay pace,
+        stopping at the end of the log
+        """
+        while not self._shutdown.is_set():
+            frame: can.Message = self._next()
+            if frame is None:
+                return
+            delay: float = self._delay(frame)
+            if delay > 0:
+                self._shutdown.wait(delay)
+            self._pending = None
+            if self._matches_filters(frame):
+                yield frame
+
+    def shutdown(self):
+        self._shutdown.set()
+        self._reader.stop()
+        super().shutdown()
+
+    def _next(self) -> can.Message:
+        if self._pending is None and not self.finished:
+            try:
+                self._pending = next(self._frames)
+            except StopIteration:
+                self.finished = True
+        return self._pending
+
+    def _delay(self, frame: can.Message) -> float:
+        if not self.speed:
+            return 0
+        if self._start is None:
+            self._start = (frame.timestamp, time.perf_counter())
+        log_start, wall_start = self._start
+        return (
+            wall_start + (frame.timestamp - log_start) / self.speed - time.perf_counter()
+        )
+
+
+def decode_frames(
+    frames: Iterable[can.Message], ep_map: Dict = can_endpoints, include_remote: bool = False
+) -> Iterator[DecodedFrame]:
+    """
+    Decode frames through an endpoint map, yielding timestamp, node id,
+    endpoint name and values (without units) of each frame. Frames of
+    unknown endpoints, or with too little data for their endpoint (e.g.
+    remote frames, unless include_remote is True), are skipped.
+    """
+    ep_names: Dict[int, str] = {}
+    for name, ep in ep_map.items():
+        ep_names.setdefault(ep["ep_id"], name)
+    codecs = {
+        ep_id: compile_codec(*ep_map[name]["types"]) if "types" in ep_map[name] else None
+        for ep_id, name in ep_names.items()
+    }
+    for frame in frames:
+        if frame.is_error_frame:
+            continue
+        node_id, ep_id = extract_node_message_id(frame.arbitration_id)
+        try:
+            codec = codecs[ep_id]
+        except KeyError:
+            continue
+        if frame.is_remote_frame:
+            if include_remote:
+                yield DecodedFrame(frame.timestamp, node_id, ep_names[ep_id], None)
+            continue
+        if codec is None or len(frame.data) < codec.size:
+            continue
+        yield DecodedFrame(
+            frame.timestamp, node_id, ep_names[ep_id], codec.unpack_from(frame.data)
+        )
@@ -0,0 +1,69 @@
+""" Tinymovr simulator client bus module.
+
+This module includes a Bus subclass that connects to a Tinymovr
+simulator server (tinymovr-sim), so that several processes can
+share the same simulated nodes.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import socket
+import select
+import threading
+from typing import Tuple
+import can
+
+from tinymovr.bus.sim_server import DEFAULT_PORT, FRAME_SIZE, pack_frame, unpack_frames
+
+
+class SimClient(can.BusABC):
+    """
+    A Bus subclass that exchanges frames with a simulator server. The
+    channel is the address of the server, as host:port, e.g.:
+
+        bus = can.Bus(bustype="simclient", channel="localhost:7776")
+
+    If the port is omitted, the default port of the server is used.
+    """
+
+    def __init__(self, channel, can_filters=None, **kwargs):
+        super().__init__(channel, can_filters, **kwargs)
+        host, _, port = str(channel or "localhost").partition(":")
+        self.address: Tuple[str, int] = (host or "localhost", int(port or DEFAULT_PORT))
+        self.channel_info: str = "Tinymovr simulator at {}:{}".format(*self.address)
+        self._sock: socket.socket = socket.create_connection(self.address)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._send_lock: threading.Lock = threading.Lock()
+        self._buffer: bytearray = bytearray()
+        self._received = iter(())
+
+    def send(self, msg: can.Message, timeout: float = None):
+        with self._send_lock:
+            self._sock.sendall(pack_frame(msg))
+
+    def _recv_internal(self, timeout: float):
+        frame: can.Message = next(self._received, None)
+        if frame is None:
+            if len(self._buffer) < FRAME_SIZE:
+                readable, _, _ = select.select([self._sock], [], [], timeout)
+                if not readable:
+                    return None, False
+                data: bytes = self._sock.recv(65536)
+                if not data:
+                    raise can.CanError("Simulator server closed the connection")
+                self._buffer += data
+            self._received = iter(list(unpack_frames(self._buffer)))
+            frame = next(self._received, None)
+        return frame, False
+
+    def shutdown(self):
+        self._sock.close()
+        super().shutdown()
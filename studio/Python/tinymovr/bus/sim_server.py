@@ -0,0 +1,292 @@
+"""Tinymovr Simulator Server
+
+Usage:
+    tinymovr-sim [--host=<host>] [--port=<port>] [--broadcast] [--controller=<controller>] [--time-step=<s>]
+    tinymovr-sim -h | --help
+
+Options:
+    --host=<host>              Address to listen on [default: localhost].
+    --port=<port>              TCP port to listen on [default: 7776].
+    --broadcast                Deliver all frames to all clients, as on a CAN bus.
+    --controller=<controller>  Simulated controller, ideal or firmware [default: ideal].
+    --time-step=<s>            Run in virtual time, advancing by s seconds per frame.
+"""
+
+'''
+This module includes a server that simulates a fleet of Tinymovr nodes
+with an InSilico bus, and serves them over TCP to any number of clients,
+e.g. the processes of a test rig, so that they share the simulated
+nodes. Clients connect with the SimClient bus:
+
+    bus = can.Bus(bustype="simclient", channel="localhost:7776")
+
+Frames are exchanged in the 16-byte layout of SocketCAN frames
+(struct can_frame), in little-endian byte order: a 32-bit CAN id with
+the extended, remote and error flags in its top bits, the data length,
+three padding bytes and eight data bytes.
+
+The server runs a single-threaded, event-driven loop over non-blocking
+sockets. By default, the responses of nodes are delivered to the client
+that sent the request only, so that clients can use the legacy,
+non-dispatching interface without seeing each other's frames. In
+broadcast mode, every frame, requests included, is delivered to every
+other client too, as on a real CAN bus.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import socket
+import struct
+import logging
+import selectors
+import threading
+from typing import Dict, Iterator, List, Tuple
+import can
+from docopt import docopt
+
+from tinymovr.bus.insilico import InSilico
+
+DEFAULT_PORT: int = 7776
+
+CAN_EFF_FLAG: int = 0x80000000
+CAN_RTR_FLAG: int = 0x40000000
+CAN_ERR_FLAG: int = 0x20000000
+CAN_EFF_MASK: int = 0x1FFFFFFF
+
+frame_struct: struct.Struct = struct.Struct("<IB3x8s")
+FRAME_SIZE: int = frame_struct.size
+
+
+def pack_frame(frame: can.Message) -> bytes:
+    """
+    Pack a frame in the SocketCAN layout
+    """
+    can_id: int = frame.arbitration_id & CAN_EFF_MASK
+    if frame.is_extended_id:
+        can_id |= CAN_EFF_FLAG
+    if frame.is_remote_frame:
+        can_id |= CAN_RTR_FLAG
+    if frame.is_error_frame:
+        can_id |= CAN_ERR_FLAG
+    return frame_struct.pack(can_id, frame.dlc, bytes(frame.data))
+
+
+def unpack_frames(buffer: bytearray) -> Iterator[can.Message]:
+    """
+    Unpack and remove the complete frames at the
+    start of a buffer, leaving any partial frame
+    """
+    end: int = len(buffer) - len(buffer) % FRAME_SIZE
+    for can_id, dlc, data in frame_struct.iter_unpack(memoryview(buffer)[:end]):
+        remote: bool = bool(can_id & CAN_RTR_FLAG)
+        yield can.Message(
+            arbitration_id=can_id & CAN_EFF_MASK,
+            is_extended_id=bool(can_id & CAN_EFF_FLAG),
+            is_remote_frame=remote,
+            is_error_frame=bool(can_id & CAN_ERR_FLAG),
+            dlc=dlc,
+            data=None if remote else data[:dlc],
+        )
+    del buffer[:end]
+
+
+class _Client:
+    """
+    The connection of a client and its pending input and output
+    """
+
+    def __init__(self, sock: socket.socket, address):
+        self.sock: socket.socket = sock
+        self.address = address
+        self.inbox: bytearray = bytearray()
+        self.outbox: bytearray = bytearray()
+
+
+class SimServer:
+    """
+    A server of a simulated fleet of Tinymovr nodes. Keyword arguments
+    are passed to the InSilico bus, e.g. controller or virtual_time.
+    Use port 0 to listen on any free port, and the address attribute
+    to find it.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = DEFAULT_PORT,
+        broadcast: bool = False,
+        **bus_kwargs
+    ):
+        self.bus: InSilico = InSilico("tinymovr-sim", **bus_kwargs)
+        self.broadcast: bool = broadcast
+        self.frames_received: int = 0
+        self.frames_sent: int = 0
+        self.clients: Dict[socket.socket, _Client] = {}
+        self._selector: selectors.BaseSelector = selectors.DefaultSelector()
+        self._listener: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((host, port))
+        self._listener.listen()
+        self._listener.setblocking(False)
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        # Written to in order to wake up the loop when stopping
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._running: bool = False
+        self._thread: threading.Thread = None
+        self.address: Tuple[str, int] = self._listener.getsockname()[:2]
+
+    def serve_forever(self):
+        """
+        Serve clients until stop() is called
+        """
+        self._running = True
+        try:
+            while self._running:
+                for key, events in self._selector.select():
+                    sock: socket.socket = key.fileobj
+                    if sock is self._listener:
+                        self._accept()
+                    elif sock is self._wakeup_r:
+                        self._wakeup_r.recv(64)
+                    else:
+                        client: _Client = self.clients.get(sock)
+                        if client is None:
+                            continue
+                        if events & selectors.EVENT_READ:
+                            self._read(client)
+                        if events & selectors.EVENT_WRITE and sock in self.clients:
+                            self._write(client)
+        finally:
+            self._close()
+
+    def start(self) -> "SimServer":
+        """
+        Serve clients in a background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close all connections
+        """
+        self._running = False
+        self._wakeup_w.send(b"\0")
+        if self._thread:
+            self._thread.join()
+
+    def _accept(self):
+        sock, address = self._listener.accept()
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.clients[sock] = _Client(sock, address)
+        self._selector.register(sock, selectors.EVENT_READ)
+        logging.getLogger(__name__).info("Client connected from {}".format(address))
+
+    def _read(self, client: _Client):
+        try:
+            data: bytes = client.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._disconnect(client)
+            return
+        client.inbox += data
+        for frame in unpack_frames(client.inbox):
+            self.frames_received += 1
+            self._handle(client, frame)
+        self._flush()
+
+    def _handle(self, sender: _Client, frame: can.Message):
+        """
+        Pass a frame to the simulated nodes, and queue
+        it and the responses of nodes for delivery
+        """
+        recipients: List[_Client] = list(self.clients.values()) if self.broadcast else [sender]
+        if self.broadcast:
+            packed: bytes = pack_frame(frame)
+            for client in recipients:
+                if client is not sender:
+                    client.outbox += packed
+        self.bus.send(frame)
+        # Nodes respond while the frame is sent
+        response: can.Message = self.bus.recv(0)
+        while response is not None:
+            packed = pack_frame(response)
+            for client in recipients:
+                client.outbox += packed
+            response = self.bus.recv(0)
+
+    def _flush(self):
+        """
+        Write pending output, waiting for clients
+        that cannot accept it all at once
+        """
+        for client in list(self.clients.values()):
+            if client.outbox:
+                self._write(client)
+
+    def _write(self, client: _Client):
+        try:
+            sent: int = client.sock.send(client.outbox)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._disconnect(client)
+            return
+        self.frames_sent += sent // FRAME_SIZE
+        del client.outbox[:sent]
+        events: int = selectors.EVENT_READ
+        if client.outbox:
+            events |= selectors.EVENT_WRITE
+        self._selector.modify(client.sock, events)
+
+    def _disconnect(self, client: _Client):
+        self._selector.unregister(client.sock)
+        del self.clients[client.sock]
+        client.sock.close()
+        logging.getLogger(__name__).info("Client {} disconnected".format(client.address))
+
+    def _close(self):
+        for client in list(self.clients.values()):
+            self._disconnect(client)
+        self._selector.close()
+        self._listener.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+        self.bus.shutdown()
+
+
+def main():
+    arguments: Dict = docopt(__doc__)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    bus_kwargs: Dict = {"controller": arguments["--controller"]}
+    if arguments["--time-step"]:
+        bus_kwargs["virtual_time"] = True
+        bus_kwargs["time_step"] = float(arguments["--time-step"])
+    server = SimServer(
+        arguments["--host"],
+        int(arguments["--port"]),
+        broadcast=arguments["--broadcast"],
+        **bus_kwargs
+    )
+    logging.getLogger(__name__).info(
+        "Serving simulated Tinymovr nodes on {}:{}".format(*server.address)
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,149 @@
+""" Tinymovr endpoint cache module.
+
+This module includes the EndpointCache class, which keeps the responses
+of slow-changing endpoints, such as configuration endpoints, for a
+time-to-live, so that repeated reads do not generate bus traffic.
+Cached responses are invalidated by writes to the matching setters.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+from typing import Dict, Iterable, Set, Tuple
+from tinymovr.codec import MultibyteCodec
+from tinymovr.constants import ControlStates
+
+# Time-to-live of cached endpoints, in seconds. Device info and
+# versions only change with a firmware update, after a reset.
+DEFAULT_TTLS: Dict[str, float] = {
+    "device_info": None,
+    "min_studio_version": None,
+    "can_config": 5.0,
+    "motor_config": 5.0,
+    "motor_RL": 5.0,
+    "limits": 5.0,
+    "gains": 5.0,
+    "vel_integrator_params": 5.0,
+}
+
+# Writes to these endpoints may change any configuration, e.g.
+# by calibrating the motor, or erasing the configuration
+INVALIDATE_ALL: Tuple[str, ...] = ("set_state", "reset", "erase_config")
+
+# Endpoints changed when calibration completes, some time after the
+# state was set, which are thus not cached while calibrating
+CALIBRATED: Tuple[str, ...] = ("motor_config", "motor_RL")
+
+
+class EndpointCache:
+    """
+    Cache of endpoint response payloads, e.g.:
+
+        cache = EndpointCache(iface.get_ep_map(), {"gains": 1.0})
+
+    Only endpoints with a time-to-live are cached, and a time-to-live
+    of None never expires. Writes to a setter invalidate the readers
+    sharing a ser_map key with it, as a setter and its getter serialize
+    to the same configuration keys.
+
+    Calibrated endpoints are not cached from the time calibration is
+    started (by setting the state) until the state is set again, or
+    read back as not calibrating.
+    """
+
+    def __init__(self, eps: Dict[str, Dict], ttls: Dict[str, float] = None):
+        if ttls is None:
+            ttls = DEFAULT_TTLS
+        self.ttls: Dict[str, float] = {
+            name: ttl for name, ttl in ttls.items() if name in eps
+        }
+        self._entries: Dict[str, Tuple[float, bytes]] = {}
+        self._eps: Dict[str, Dict] = eps
+        self._codec: MultibyteCodec = MultibyteCodec()
+        self.calibrating: bool = False
+        self._invalidates: Dict[str, Tuple[str, ...]] = {}
+        readers: Dict[str, Set[str]] = {}
+        for name, ep in eps.items():
+            if ep["type"] == "r" and name in self.ttls:
+                for key in ep.get("ser_map", ()):
+                    readers.setdefault(key, set()).add(name)
+        for name, ep in eps.items():
+            if name in INVALIDATE_ALL:
+                self._invalidates[name] = tuple(self.ttls)
+            elif "w" in ep["type"] and "ser_map" in ep:
+                names: Set[str] = set()
+                for key in ep["ser_map"]:
+                    names |= readers.get(key, set())
+                if names:
+                    self._invalidates[name] = tuple(sorted(names))
+
+    def get(self, name: str) -> bytes:
+        """
+        Return the cached response of an endpoint, or
+        None if it is not cached, or has expired
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        expiry, payload = entry
+        if expiry is not None and time.monotonic() > expiry:
+            self._entries.pop(name, None)
+            return None
+        return payload
+
+    def put(self, name: str, payload: bytes):
+        """
+        Cache the response of an endpoint, if it has a time-to-live
+        """
+        if name == "state":
+            self._set_calibrating(self._value(name, payload, "state"))
+            return
+        if self.calibrating and name in CALIBRATED:
+            return
+        try:
+            ttl: float = self.ttls[name]
+        except KeyError:
+            return
+        expiry: float = None if ttl is None else time.monotonic() + ttl
+        self._entries[name] = (expiry, payload)
+
+    def invalidate(self, names: Iterable[str] = None):
+        """
+        Drop the cached responses of a list of
+        endpoints, or of all endpoints if None
+        """
+        if names is None:
+            self._entries.clear()
+            return
+        for name in names:
+            self._entries.pop(name, None)
+
+    def written(self, name: str, payload: bytes = None):
+        """
+        Invalidate the responses changed by a write of
+        a payload to an endpoint
+        """
+        if name == "set_state" and payload:
+            self._set_calibrating(self._value(name, payload, "state"))
+        names: Tuple[str, ...] = self._invalidates.get(name)
+        if names:
+            self.invalidate(names)
+
+    def _set_calibrating(self, state: int):
+        calibrating: bool = state == ControlStates.Calibration
+        if self.calibrating and not calibrating:
+            self.invalidate(CALIBRATED)
+        self.calibrating = calibrating
+
+    def _value(self, name: str, payload: bytes, label: str):
+        ep: Dict = self._eps[name]
+        values = self._codec.deserialize(payload, *ep["types"])
+        return values[list(ep["labels"]).index(label)]
@@ -1 +1,7 @@
-from tinymovr.codec.codec import Codec, MultibyteCodec, DataType
+from tinymovr.codec.codec import (
+    Codec,
+    CompiledCodec,
+    MultibyteCodec,
+    DataType,
+    compile_codec,
+)
@@ -1,5 +1,5 @@
 
-from typing import Dict, List
+from typing import Dict, Tuple
 import struct
 from enum import Enum
 
@@ -58,25 +58,82 @@ codecs: Dict[DataType, StructCodec] = {
 }
 
 
+class CompiledCodec(Codec):
+    """
+    Serializer/deserializer for a fixed sequence of data types,
+    compiled into a single struct.Struct, so that a complete
+    payload costs one pack or one unpack.
+    """
+    def __init__(self, *args):
+        self.types: Tuple[DataType, ...] = args
+        self._struct = struct.Struct(
+            "<" + "".join([codecs[dtype]._struct_format[1:] for dtype in args]))
+        self.size: int = self._struct.size
+        # struct rejects floats for integer formats, so values are only
+        # cast to their target types if at least one integer field exists
+        target_types = [codecs[dtype]._target_type for dtype in args]
+        self._casts = target_types if int in target_types else None
+
+    def get_length(self) -> int:
+        return self.size
+
+    def serialize(self, values) -> bytearray:
+        buffer = bytearray(self.size)
+        self.pack_into(buffer, 0, values)
+        return buffer
+
+    def deserialize(self, buffer: bytes) -> Tuple:
+        return self._struct.unpack_from(buffer, 0)
+
+    def pack_into(self, buffer, offset: int, values):
+        '''
+        Pack values into a writable buffer (bytearray, memoryview),
+        starting at offset
+        '''
+        if self._casts:
+            values = [cast(value) for cast, value in zip(self._casts, values)]
+        self._struct.pack_into(buffer, offset, *values)
+
+    def unpack_from(self, buffer, offset: int = 0) -> Tuple:
+        '''
+        Unpack values from a buffer (bytes, bytearray, memoryview),
+        starting at offset, without copying
+        '''
+        return self._struct.unpack_from(buffer, offset)
+
+
+_compiled_codecs: Dict[Tuple[DataType, ...], CompiledCodec] = {}
+
+
+def compile_codec(*args) -> CompiledCodec:
+    '''
+    Return the compiled codec for a sequence of data types,
+    creating and caching it on first use
+    '''
+    try:
+        return _compiled_codecs[args]
+    except KeyError:
+        codec = _compiled_codecs[args] = CompiledCodec(*args)
+        return codec
+
+
 class MultibyteCodec(Codec):
 
+    def compile(self, *args) -> CompiledCodec:
+        '''
+        Get the compiled codec for a series of data types
+        '''
+        return compile_codec(*args)
+
     def serialize(self, values, *args) -> bytearray:
         '''
         Serialize a series of variables to a bytes array
         '''
-        buffer = bytearray()
         assert(len(values) == len(args))
-        for value, dtype in zip(values, args):
-            buffer.extend(codecs[dtype].serialize(value))
-        return buffer
+        return compile_codec(*args).serialize(values)
 
-    def deserialize(self, data, *args) -> List:
+    def deserialize(self, data, *args) -> Tuple:
         '''
         Deserialize a bytes array to a tuple of values
         '''
-        index: int = 0
-        values = []
-        for dtype in args:
-            values.append(codecs[dtype].deserialize(data[index:]))
-            index += codecs[dtype].get_length()
-        return values
+        return compile_codec(*args).deserialize(data)
@@ -0,0 +1,153 @@
+""" Tinymovr vectorized codec module.
+
+This module includes utilities that decode batches of endpoint payloads
+at once, using NumPy structured dtypes that mirror the endpoint types,
+instead of calling a codec once per payload.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import Dict, Sequence, Tuple, Union
+import numpy as np
+
+from tinymovr.codec.codec import DataType
+from tinymovr.units import get_registry, get_unit
+
+
+numpy_formats: Dict[DataType, str] = {
+    DataType.INT8: "i1",
+    DataType.UINT8: "u1",
+    DataType.INT16: "<i2",
+    DataType.UINT16: "<u2",
+    DataType.INT32: "<i4",
+    DataType.UINT32: "<u4",
+    DataType.FLOAT: "<f4",
+}
+
+
+def field_names(types: Sequence[DataType], labels: Sequence[str] = None) -> Tuple[str, ...]:
+    """
+    Return the names of the fields of a payload. Labels are used if
+    available, otherwise fields are named value (or value0, value1...).
+    """
+    if labels:
+        return tuple(labels[: len(types)])
+    if len(types) == 1:
+        return ("value",)
+    return tuple("value{}".format(i) for i in range(len(types)))
+
+
+def structured_dtype(
+    types: Sequence[DataType], labels: Sequence[str] = None, itemsize: int = None
+) -> np.dtype:
+    """
+    Build a packed, little-endian NumPy structured dtype from a sequence of
+    endpoint data types. If itemsize is given (e.g. 8 for CAN frame data),
+    the dtype is padded to that size.
+    """
+    formats = [numpy_formats[dtype] for dtype in types]
+    offsets = []
+    offset = 0
+    for fmt in formats:
+        offsets.append(offset)
+        offset += np.dtype(fmt).itemsize
+    return np.dtype(
+        {
+            "names": field_names(types, labels),
+            "formats": formats,
+            "offsets": offsets,
+            "itemsize": itemsize or offset,
+        }
+    )
+
+
+def payload_array(payloads, dtype: np.dtype) -> np.ndarray:
+    """
+    Return a structured array of dtype over a batch of payloads, given as
+    a bytes-like object of concatenated payloads, a 2D uint8 array with
+    one payload per row, an array of void (raw bytes) items, or a
+    sequence of bytes-like payloads. Payloads longer than the dtype
+    (e.g. zero-padded CAN frame data) are allowed.
+    """
+    size: int = dtype.itemsize
+    if isinstance(payloads, np.ndarray):
+        if payloads.dtype.kind == "V":
+            itemsize = payloads.dtype.itemsize
+        else:
+            payloads = np.ascontiguousarray(payloads, dtype=np.uint8)
+            itemsize = payloads.shape[-1] if payloads.ndim > 1 else size
+    elif isinstance(payloads, (bytes, bytearray, memoryview)):
+        payloads = np.frombuffer(payloads, dtype=np.uint8)
+        itemsize = size
+    else:
+        itemsize = max((len(p) for p in payloads), default=size)
+        payloads = np.frombuffer(
+            b"".join([bytes(p).ljust(itemsize, b"\0") for p in payloads]), dtype=np.uint8
+        )
+    if itemsize < size:
+        raise ValueError(
+            "Payloads of {} bytes are too short for {} bytes of data".format(itemsize, size)
+        )
+    padded: np.dtype = np.dtype(
+        {
+            "names": dtype.names,
+            "formats": [dtype.fields[n][0] for n in dtype.names],
+            "offsets": [dtype.fields[n][1] for n in dtype.names],
+            "itemsize": itemsize,
+        }
+    )
+    if payloads.dtype.kind == "V":
+        return payloads.view(padded)
+    return payloads.reshape(-1).view(padded)
+
+
+def decode_payloads(
+    payloads,
+    endpoint: Dict,
+    units: Dict[str, str] = None,
+    as_quantity: bool = False,
+    as_records: bool = False,
+) -> Union[Dict[str, np.ndarray], np.recarray]:
+    """
+    Decode a batch of payloads of an endpoint at once, returning a
+    dictionary of columns, keyed by endpoint label (or a record array,
+    if as_records is True).
+
+    Columns can be converted to other units by passing a dictionary of
+    target unit strings, keyed by label, e.g. {"position": "turn"};
+    the conversion factor is computed once and applied as a vector
+    multiplication. If as_quantity is True, columns with units are
+    returned as pint quantities wrapping the arrays.
+    """
+    dtype: np.dtype = structured_dtype(endpoint["types"], endpoint.get("labels"))
+    values: np.ndarray = payload_array(payloads, dtype)
+    ep_units: Tuple = tuple(endpoint.get("units", (None,) * len(dtype.names)))
+    columns: Dict[str, np.ndarray] = {}
+    for name, unit_string in zip(dtype.names, ep_units):
+        column: np.ndarray = values[name]
+        convert: bool = bool(units) and name in units
+        # Units are only resolved for columns that are converted or
+        # returned as quantities
+        if convert or (as_quantity and unit_string):
+            unit = get_unit(unit_string)
+            if convert:
+                target = get_unit(units[name])
+                column = column * get_registry().Quantity(1.0, unit).m_as(target)
+                unit = target
+            if as_quantity:
+                column = get_registry().Quantity(column, unit)
+        columns[name] = column
+    if as_records:
+        return np.rec.fromarrays(
+            [np.asarray(getattr(c, "magnitude", c)) for c in columns.values()],
+            names=list(columns.keys()),
+        )
+    return columns
@@ -0,0 +1,223 @@
+""" Tinymovr configuration module.
+
+This module includes functions to read and write the configuration of
+Tinymovr instances, i.e. the values of endpoints that have a ser_map,
+as nested dictionaries following the ser_map of each endpoint, e.g.:
+
+    {"can": {"id": 1, "baud_rate": 1000}, "motor": {"R": 0.2, ...}, ...}
+
+Reads of all endpoints of all instances are in flight at once, and
+writes are limited to endpoints whose values differ from the ones
+read, so that configuring many nodes costs about one round trip.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# The CAN config is written last, as a new node id takes effect at once
+WRITE_LAST: Tuple[str, ...] = ("set_can_config",)
+
+# Fields that setters encode differently from their getters, by setter:
+# label -> function converting a read value to the value to write.
+# Motor config flags are read as calibrated | is_gimbal << 1, and
+# written as is_gimbal.
+WRITE_ENCODINGS: Dict[str, Dict[str, Callable]] = {
+    "set_motor_config": {"flags": lambda flags: (flags >> 1) & 1},
+}
+
+
+def config_endpoints(eps: Dict[str, Dict]) -> List[Tuple[str, str]]:
+    """
+    Return the (getter, setter) endpoint name pairs of the
+    configuration, i.e. read and write endpoints with identical
+    ser_map, in the order setters are written
+    """
+    getters: Dict[str, str] = {
+        repr(ep["ser_map"]): name
+        for name, ep in eps.items()
+        if ep["type"] == "r" and "ser_map" in ep
+    }
+    pairs: List[Tuple[str, str]] = [
+        (getters[repr(ep["ser_map"])], name)
+        for name, ep in eps.items()
+        if ep["type"] == "w" and repr(ep.get("ser_map")) in getters
+    ]
+    return sorted(pairs, key=lambda pair: pair[1] in WRITE_LAST)
+
+
+def read_config(tinymovrs: Sequence, timeout: float = 1.0) -> List[Dict]:
+    """
+    Read the configuration of a list of instances, with all
+    requests in flight at once, sharing a single timeout window
+    """
+    names: List[List[str]] = [
+        [getter for getter, _ in config_endpoints(tm.eps)] for tm in tinymovrs
+    ]
+    configs: List[Dict] = []
+    for tm, values in zip(tinymovrs, _read_all(tinymovrs, names, timeout)):
+        config: Dict = {}
+        for name, ep_values in values.items():
+            _merge(config, _to_config(ep_values, tm.eps[name]["ser_map"]))
+        configs.append(config)
+    return configs
+
+
+def write_config(
+    tinymovrs: Sequence, configs: Sequence[Dict], timeout: float = 1.0
+) -> List[List[str]]:
+    """
+    Write a configuration to each of a list of instances, and return
+    the names of the setters written to each. The current values are
+    read first, and only setters whose values differ are written.
+    Values missing from a configuration are left unchanged. Written
+    values are then read back, raising an IOError if a node did not
+    apply them. The CAN config is not read back if the node id changes,
+    as the node no longer responds to the id of the instance.
+    """
+    pairs: List[List[Tuple[str, str]]] = [config_endpoints(tm.eps) for tm in tinymovrs]
+    current: List[Dict] = _read_all(
+        tinymovrs, [[getter for getter, _ in p] for p in pairs], timeout
+    )
+    written: List[List[str]] = []
+    expected: List[Dict[str, Tuple[str, Dict]]] = []
+    for tm, config, tm_pairs, values in zip(tinymovrs, configs, pairs, current):
+        tm_written: List[str] = []
+        tm_expected: Dict[str, Tuple[str, Dict]] = {}
+        for getter, setter in tm_pairs:
+            accessor = tm.endpoint(setter)
+            current_values: Dict = _encode(setter, values[getter])
+            target: Dict = dict(current_values)
+            target.update(_from_config(accessor.endpoint["ser_map"], config))
+            # Round trip values through the codec, so that values that
+            # only differ in precision from the ones read are not written
+            inputs: List = list(
+                accessor.codec.deserialize(
+                    accessor.codec.serialize([target[label] for label in accessor.labels])
+                )
+            )
+            if inputs == [current_values[label] for label in accessor.labels]:
+                continue
+            accessor.raw(*inputs)
+            tm_written.append(setter)
+            if setter != "set_can_config" or target["id"] == tm.node_id:
+                tm_expected[getter] = (setter, dict(zip(accessor.labels, inputs)))
+        written.append(tm_written)
+        expected.append(tm_expected)
+    applied: List[Dict] = _read_all(tinymovrs, [list(e) for e in expected], timeout)
+    for tm, tm_expected, values in zip(tinymovrs, expected, applied):
+        for getter, (setter, inputs) in tm_expected.items():
+            applied_values: Dict = _encode(setter, values[getter])
+            if any(applied_values[label] != value for label, value in inputs.items()):
+                raise IOError("Node {} did not apply {}".format(tm.node_id, getter))
+    return written
+
+
+def _read_all(
+    tinymovrs: Sequence, names: Sequence[List[str]], timeout: float
+) -> List[Dict[str, Dict]]:
+    """
+    Read a list of endpoints of each instance, with all requests in
+    flight at once, and return dictionaries of endpoint names to
+    dictionaries of labels to values, without units
+    """
+    requests: List[List[Tuple]] = []
+    for tm, tm_names in zip(tinymovrs, names):
+        tm_requests: List[Tuple] = []
+        for name in tm_names:
+            accessor = tm.endpoint(name)
+            future: Future = accessor.iface.request_async(accessor.node_id, accessor.ep_id)
+            tm_requests.append((name, accessor, future))
+        requests.append(tm_requests)
+    deadline: float = time.perf_counter() + timeout
+    results: List[Dict[str, Dict]] = []
+    try:
+        for tm_requests in requests:
+            values: Dict[str, Dict] = {}
+            for name, accessor, future in tm_requests:
+                try:
+                    payload = future.result(timeout=max(0, deadline - time.perf_counter()))
+                except FutureTimeoutError:
+                    raise TimeoutError(
+                        "Node {} timed out reading {}".format(accessor.node_id, name)
+                    ) from None
+                values[name] = dict(
+                    zip(accessor.endpoint["labels"], accessor.codec.deserialize(payload))
+                )
+            results.append(values)
+    except Exception:
+        for tm_requests in requests:
+            for _, accessor, future in tm_requests:
+                accessor.iface.cancel(accessor.node_id, accessor.ep_id, future)
+        raise
+    return results
+
+
+def _encode(setter: str, values: Dict) -> Dict:
+    """
+    Convert values read from a getter to the encoding of its setter
+    """
+    encodings: Dict[str, Callable] = WRITE_ENCODINGS.get(setter)
+    if not encodings:
+        return values
+    return {
+        label: encodings[label](value) if label in encodings else value
+        for label, value in values.items()
+    }
+
+
+def _to_config(values: Dict, ser_map: Dict) -> Dict:
+    """
+    Generate a nested dictionary from a dictionary of values,
+    following the template in ser_map
+    """
+    config: Dict = {}
+    for key, value in ser_map.items():
+        if isinstance(value, dict):
+            config[key] = _to_config(values, value)
+        elif isinstance(value, tuple):
+            config[key] = {label: values[label] for label in value}
+        else:
+            raise TypeError("Map is not a dictionary or tuple")
+    return config
+
+
+def _from_config(ser_map, config) -> Dict:
+    """
+    Generate a flat dictionary of labels to values from a
+    nested dictionary, following the template in ser_map
+    """
+    values: Dict = {}
+    if isinstance(ser_map, dict) and isinstance(config, dict):
+        for key, value in ser_map.items():
+            if key in config:
+                values.update(_from_config(value, config[key]))
+    elif isinstance(ser_map, tuple) and isinstance(config, dict):
+        for label in ser_map:
+            if label in config:
+                values[label] = config[label]
+    else:
+        raise TypeError("Mismatch in passed arguments")
+    return values
+
+
+def _merge(config: Dict, data: Dict):
+    """
+    Merge a nested dictionary into a configuration, as
+    endpoints may share top-level keys (e.g. "motor")
+    """
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            _merge(config[key], value)
+        else:
+            config[key] = value
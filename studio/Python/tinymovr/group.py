@@ -0,0 +1,252 @@
+""" Tinymovr group module.
+
+This module includes the TinymovrGroup class, which issues requests to
+a group of Tinymovr instances at once, and the discover function, which
+discovers the nodes present on an interface. All requests are sent back-to-back
+and responses are collected as they arrive, so that reading N nodes costs
+roughly one round-trip plus N frame times, instead of N round-trips.
+Requests are only pipelined if the interface can have multiple requests
+in flight, such as CANBus(bus, dispatch=True).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Iterable, List
+from tinymovr.tinymovr import Tinymovr, check_fw_version, check_studio_version, version_string
+from tinymovr.presenter import present_raw
+from tinymovr.config import read_config, write_config
+
+
+class TinymovrGroup:
+    """
+    A group of Tinymovr instances, e.g.:
+
+        group = TinymovrGroup([tm1, tm2, tm3])
+        est_1, est_2, est_3 = group.read("encoder_estimates")
+    """
+
+    def __init__(self, tinymovrs: Iterable[Tinymovr]):
+        self.tinymovrs: List[Tinymovr] = list(tinymovrs)
+
+    def read(
+        self,
+        ep_name: str,
+        raw: bool = False,
+        timeout: float = 0.1,
+        return_exceptions: bool = False,
+    ) -> List:
+        """
+        Read an endpoint of all instances in the group. Results are
+        returned in the order of the instances. All responses share
+        a single timeout window.
+
+        If raw is True, values are returned without units,
+        otherwise each instance's raw mode is respected.
+        If return_exceptions is True, errors (e.g. timeouts) are
+        returned in place of the results of the nodes that caused
+        them, instead of being raised.
+
+        Reads are issued once, with the timeout given, regardless of
+        the call policies of the instances, and are not answered from
+        their caches. They are counted in the statistics and timeout
+        counters of the instances.
+        """
+        accessors = [tm.endpoint(ep_name) for tm in self.tinymovrs]
+        start: float = time.perf_counter()
+        futures: List[Future] = [
+            a.iface.request_async(a.node_id, a.ep_id) for a in accessors
+        ]
+        deadline: float = start + timeout
+        results: List = []
+        for accessor, future in zip(accessors, futures):
+            try:
+                try:
+                    payload = future.result(
+                        timeout=max(0, deadline - time.perf_counter())
+                    )
+                except FutureTimeoutError:
+                    accessor.iface.cancel(accessor.node_id, accessor.ep_id, future)
+                    accessor.record(None)
+                    raise TimeoutError(
+                        "Node {} timed out".format(accessor.node_id)
+                    ) from None
+                accessor.record(time.perf_counter() - start, payload)
+                if raw:
+                    results.append(accessor.present_raw(payload))
+                else:
+                    results.append(accessor.present(payload))
+            except Exception as e:
+                if not return_exceptions:
+                    for a, f in zip(accessors, futures):
+                        a.iface.cancel(a.node_id, a.ep_id, f)
+                    raise
+                results.append(e)
+        return results
+
+    @classmethod
+    def create(
+        cls,
+        iface,
+        node_ids: Iterable[int],
+        timeout: float = 0.1,
+        version_check: bool = True,
+        factory: Callable = Tinymovr,
+    ) -> "TinymovrGroup":
+        """
+        Create a group of instances of node_ids, reading the device
+        info and versions of all nodes at once (see discover()). Raise
+        the error of the first node that did not respond, or failed
+        the version check. If version_check is False, the firmware
+        version of each node is still read, and versions can be
+        checked later, with check_versions().
+        """
+        node_ids = list(node_ids)
+        results: Dict = discover(iface, node_ids, timeout, version_check, factory)
+        for node_id in node_ids:
+            result = results.get(node_id)
+            if result is None:
+                raise TimeoutError("Node {} timed out".format(node_id))
+            if isinstance(result, Exception):
+                raise result
+        return cls(results[node_id] for node_id in node_ids)
+
+    def check_versions(self, timeout: float = 0.1, return_exceptions: bool = False) -> List:
+        """
+        Check firmware and Studio version compatibility of all
+        instances, reading their minimum Studio versions at once.
+        Return a list with None for each compatible instance, and, if
+        return_exceptions is True, the error of each incompatible one,
+        which is otherwise raised.
+        """
+        studio_versions: List = self.read(
+            "min_studio_version", raw=True, timeout=timeout, return_exceptions=True
+        )
+        results: List = []
+        for tm, studio_version in zip(self.tinymovrs, studio_versions):
+            try:
+                if isinstance(studio_version, Exception):
+                    raise studio_version
+                check_fw_version(tm.fw_version)
+                check_studio_version(version_string(studio_version))
+                results.append(None)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def read_config(self, timeout: float = 1.0) -> List[Dict]:
+        """
+        Read the configuration of all instances at once, in
+        the order of the instances (see tinymovr.config)
+        """
+        return read_config(self.tinymovrs, timeout)
+
+    def write_config(self, configs: Iterable[Dict], timeout: float = 1.0) -> List[List[str]]:
+        """
+        Write a configuration to each instance, in the order of the
+        instances, writing only the endpoints whose values differ from
+        the current ones, and return the names of the endpoints
+        written to each instance (see tinymovr.config)
+        """
+        return write_config(self.tinymovrs, list(configs), timeout)
+
+    def __iter__(self):
+        return iter(self.tinymovrs)
+
+    def __len__(self) -> int:
+        return len(self.tinymovrs)
+
+    def __getitem__(self, index: int) -> Tinymovr:
+        return self.tinymovrs[index]
+
+
+def discover(
+    iface,
+    node_ids: Iterable[int],
+    timeout: float = 0.1,
+    version_check: bool = True,
+    factory: Callable = Tinymovr,
+) -> Dict:
+    """
+    Discover which of node_ids are present on an interface, and create
+    an instance for each, by calling factory (e.g. Tinymovr).
+
+    Device info, and the minimum Studio version if version_check is
+    True, are requested from all nodes at once, and nodes that respond
+    within a single, shared timeout window are present. Versions are
+    then checked locally, and instances are created with the device
+    info that was read, without further requests, so that discovery
+    lasts about one timeout, however many nodes are searched, if the
+    interface can have multiple requests in flight.
+
+    Return a dictionary of present node ids to their instances, or to
+    the errors (e.g. VersionError) that prevented creating them.
+    """
+    ep_names: List[str] = ["device_info"]
+    if version_check:
+        ep_names.append("min_studio_version")
+    values: Dict[str, Dict] = _request_all(iface, node_ids, ep_names, timeout)
+    results: Dict = {}
+    for node_id, info in values["device_info"].items():
+        try:
+            if isinstance(info, Exception):
+                raise info
+            if version_check:
+                check_fw_version(version_string(info))
+                studio_version = values["min_studio_version"].get(node_id)
+                if studio_version is None:
+                    raise TimeoutError("Node {} timed out".format(node_id))
+                if isinstance(studio_version, Exception):
+                    raise studio_version
+                check_studio_version(version_string(studio_version))
+            results[node_id] = factory(
+                node_id=node_id, iface=iface, version_check=False, device_info=info
+            )
+        except Exception as e:
+            results[node_id] = e
+    return results
+
+
+def _request_all(
+    iface, node_ids: Iterable[int], ep_names: List[str], timeout: float
+) -> Dict[str, Dict]:
+    """
+    Request a list of endpoints of all nodes at once, and return, by
+    endpoint name, dictionaries of node ids to values, without units,
+    or to errors, for the nodes that responded within timeout
+    """
+    eps: Dict = iface.get_ep_map()
+    codec = iface.get_codec()
+    futures: Dict[str, Dict[int, Future]] = {name: {} for name in ep_names}
+    results: Dict[str, Dict] = {name: {} for name in ep_names}
+    for node_id in node_ids:
+        for name in ep_names:
+            try:
+                futures[name][node_id] = iface.request_async(node_id, eps[name]["ep_id"])
+            except Exception as e:
+                results[name][node_id] = e
+    deadline: float = time.perf_counter() + timeout
+    for name in ep_names:
+        ep: Dict = eps[name]
+        for node_id, future in futures[name].items():
+            try:
+                payload = future.result(timeout=max(0, deadline - time.perf_counter()))
+                results[name][node_id] = present_raw(
+                    name, codec.deserialize(payload, *ep["types"]), ep
+                )
+            except (FutureTimeoutError, TimeoutError):
+                iface.cancel(node_id, ep["ep_id"], future)
+            except Exception as e:
+                results[name][node_id] = e
+    return results
@@ -5,3 +5,5 @@ from tinymovr.iface.can_bus.can_bus import (
     create_frame,
     extract_node_message_id,
 )
+from tinymovr.iface.can_bus.dispatcher import CANDispatcher
+from tinymovr.iface.can_bus.write_queue import WriteQueue
@@ -1,4 +1,6 @@
 import math
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import can
 from typing import Tuple, Dict, List
 import serial
@@ -6,6 +8,7 @@ from serial.tools import list_ports
 import logging
 
 from tinymovr.iface import IFace
+from tinymovr.iface.iface import DEFAULT_TIMEOUT
 from tinymovr.iface.can_bus import can_endpoints
 from tinymovr.codec import MultibyteCodec
 
@@ -13,6 +16,11 @@ from tinymovr.codec import MultibyteCodec
 CAN_EP_SIZE: int = 6
 CAN_EP_MASK: int = int(math.pow(2, CAN_EP_SIZE) - 1)
 
+# Ids of endpoints that respond to requests
+readable_ep_ids = frozenset(
+    ep["ep_id"] for ep in can_endpoints.values() if "r" in ep["type"]
+)
+
 can_devices: Dict[str, tuple] = {
     "slcan": ("canable", "cantact"),
     "robotell": ("CP210",),
@@ -21,11 +29,45 @@ can_devices: Dict[str, tuple] = {
 
 class CANBus(IFace):
     """
-    Class implementing a CAN bus interface
+    Class implementing a CAN bus interface.
+
+    If dispatch is True, frames are received by a CANDispatcher in a
+    background thread and routed to requests by node and endpoint id,
+    so that requests to multiple nodes can be in flight concurrently
+    and unexpected frames are ignored instead of raising errors. In
+    this mode the interface can be shared by multiple threads: each
+    request is correlated with its own response, and requests sent
+    with send() are only received by receive() calls of the thread
+    that sent them.
+
+    Without dispatch, request() is serialized across threads, but
+    separate send() and receive() calls are not synchronized.
+
+    If write_rate_hz is given, writes passed to enqueue() are coalesced
+    per node and endpoint (latest wins) and sent by a WriteQueue at
+    that rate.
     """
 
-    def __init__(self, bus):
+    def __init__(self, bus, dispatch: bool = False, write_rate_hz: float = None):
         self.bus = bus
+        self.dispatcher = None
+        self.write_queue = None
+        self._local: threading.local = threading.local()
+        self._send_lock: threading.Lock = threading.Lock()
+        self._request_lock: threading.Lock = threading.Lock()
+        # Number of received frames that did not match a request
+        self.mismatches: int = 0
+        if dispatch:
+            # Imported here to avoid circular imports
+            from tinymovr.iface.can_bus.dispatcher import CANDispatcher
+
+            self.dispatcher = CANDispatcher(bus)
+            self.dispatcher.start()
+        if write_rate_hz:
+            from tinymovr.iface.can_bus.write_queue import WriteQueue
+
+            self.write_queue = WriteQueue(bus, write_rate_hz, lock=self._send_lock)
+            self.write_queue.start()
 
     def get_codec(self):
         return MultibyteCodec()
@@ -36,16 +78,42 @@ class CANBus(IFace):
     def send(self, node_id: int, endpoint_id: int, payload: bytearray = None):
         #print("send {}:{}".format(node_id, endpoint_id))
         rtr: bool = False if payload and len(payload) else True
-        self.bus.send(create_frame(node_id, endpoint_id, rtr, payload))
+        if self.dispatcher and endpoint_id in readable_ep_ids:
+            # Register the request before sending, so that the
+            # response is routed to the subsequent receive call.
+            # Writes without payload (e.g. reset) have no response.
+            # A request that was never received is replaced, so that
+            # receive does not return a stale response.
+            previous: Future = self._awaiting.pop((node_id, endpoint_id), None)
+            if previous is not None:
+                self.cancel(node_id, endpoint_id, previous)
+            future: Future = self.request_async(node_id, endpoint_id, payload)
+            self._awaiting[(node_id, endpoint_id)] = future
+        else:
+            frame: can.Message = create_frame(node_id, endpoint_id, rtr, payload)
+            with self._send_lock:
+                self.bus.send(frame)
+
+    def enqueue(self, node_id: int, endpoint_id: int, payload: bytearray = None):
+        if self.write_queue is not None:
+            self.write_queue.put(node_id, endpoint_id, payload)
+        else:
+            self.send(node_id, endpoint_id, payload)
 
-    def receive(self, node_id: int, endpoint_id: int, timeout: float = 0.1):
+    def receive(self, node_id: int, endpoint_id: int, timeout: float = DEFAULT_TIMEOUT):
         #print("recv {}:{}".format(node_id, endpoint_id))
+        if self.dispatcher:
+            future: Future = self._awaiting.pop((node_id, endpoint_id), None)
+            if future is None:
+                future = self.dispatcher.expect(node_id, endpoint_id)
+            return self._wait(node_id, endpoint_id, future, timeout)
         frame_id: int = create_node_id(node_id, endpoint_id)
         frame: can.Message = self.bus.recv(timeout=timeout)
         if frame:
             if frame.arbitration_id == frame_id:
                 return frame.data
             else:
+                self.mismatches += 1
                 error_data = extract_node_message_id(frame_id)
                 error_data += extract_node_message_id(frame.arbitration_id)
                 raise IOError("Received id mismatch. Expected: Node: {}, Endpoint:{}; Got: Node: {}, Endpoint:{}".format(
@@ -53,6 +121,71 @@ class CANBus(IFace):
         else:
             raise TimeoutError()
 
+    def request(
+        self, node_id: int, endpoint_id: int, payload: bytearray = None, timeout: float = DEFAULT_TIMEOUT
+    ):
+        if self.dispatcher:
+            future: Future = self.request_async(node_id, endpoint_id, payload)
+            return self._wait(node_id, endpoint_id, future, timeout)
+        with self._request_lock:
+            return super().request(node_id, endpoint_id, payload, timeout)
+
+    def request_async(
+        self, node_id: int, endpoint_id: int, payload: bytearray = None
+    ) -> Future:
+        if not self.dispatcher:
+            return super().request_async(node_id, endpoint_id, payload)
+        rtr: bool = False if payload and len(payload) else True
+        frame: can.Message = create_frame(node_id, endpoint_id, rtr, payload)
+        # Expecting and sending under the same lock keeps the order of
+        # futures of each endpoint the same as the order of requests
+        with self._send_lock:
+            future: Future = self.dispatcher.expect(node_id, endpoint_id)
+            try:
+                self.bus.send(frame)
+            except Exception:
+                self.dispatcher.discard(node_id, endpoint_id, future)
+                raise
+        return future
+
+    def cancel(self, node_id: int, endpoint_id: int, future: Future):
+        if self.dispatcher:
+            self.dispatcher.discard(node_id, endpoint_id, future)
+        else:
+            future.cancel()
+
+    def shutdown(self):
+        """
+        Send pending writes, stop the write queue and dispatcher
+        threads, cancelling pending requests, and shut down the bus
+        """
+        try:
+            if self.write_queue is not None:
+                self.write_queue.stop()
+        finally:
+            if self.dispatcher is not None:
+                self.dispatcher.stop()
+            self.bus.shutdown()
+
+    @property
+    def _awaiting(self) -> Dict[Tuple[int, int], Future]:
+        """
+        Futures of the latest requests sent by send() in the current
+        thread, awaiting a receive() call
+        """
+        try:
+            return self._local.awaiting
+        except AttributeError:
+            self._local.awaiting = {}
+            return self._local.awaiting
+
+    def _wait(self, node_id: int, endpoint_id: int, future: Future, timeout: float):
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.cancel(node_id, endpoint_id, future)
+            raise TimeoutError()
+
 
 def create_frame(
     node_id: int, endpoint_id: int, rtr: bool = False, payload: bytearray = None
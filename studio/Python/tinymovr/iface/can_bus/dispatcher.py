@@ -0,0 +1,157 @@
+""" Tinymovr CAN dispatcher module.
+
+This module includes a dispatcher that owns the reading end of a
+python-can bus. Frames are received in a background thread and routed
+to pending requests by (node id, endpoint id), so that requests to
+several nodes can be in flight at the same time, and unexpected frames
+do not disrupt communication.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Tuple
+import can
+
+from tinymovr.iface.can_bus.can_bus import extract_node_message_id
+
+
+logger = logging.getLogger("tinymovr")
+
+
+class CANDispatcher:
+    """
+    Receives frames from a bus in a background thread and completes
+    the futures of pending requests with the frame payloads
+    """
+
+    def __init__(self, bus: can.BusABC, poll_timeout: float = 0.01):
+        self.bus: can.BusABC = bus
+        self.poll_timeout: float = poll_timeout
+        self._pending: Dict[Tuple[int, int], Deque[Future]] = {}
+        self._listeners: List[Callable[[can.Message], None]] = []
+        self._lock: threading.Lock = threading.Lock()
+        self._running: bool = False
+        self._thread: threading.Thread = None
+        # Number of received frames that did not match a request
+        self.unexpected: int = 0
+
+    def start(self):
+        """
+        Start the receiving thread
+        """
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="tinymovr-can-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the receiving thread and cancel all pending requests
+        """
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+        for futures in pending.values():
+            for future in futures:
+                future.cancel()
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def expect(self, node_id: int, endpoint_id: int) -> Future:
+        """
+        Register a pending request and return a future that will be
+        completed with the payload of the matching response. Requests
+        to the same node and endpoint are completed in order.
+        """
+        future: Future = Future()
+        with self._lock:
+            try:
+                self._pending[(node_id, endpoint_id)].append(future)
+            except KeyError:
+                self._pending[(node_id, endpoint_id)] = deque((future,))
+        return future
+
+    def discard(self, node_id: int, endpoint_id: int, future: Future):
+        """
+        Remove a pending request, e.g. after it has timed out
+        """
+        future.cancel()
+        with self._lock:
+            futures = self._pending.get((node_id, endpoint_id))
+            if futures and future in futures:
+                futures.remove(future)
+
+    def add_listener(self, listener: Callable[[can.Message], None]):
+        """
+        Add a callable that will be called from the receiving
+        thread with every frame received
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[can.Message], None]):
+        self._listeners.remove(listener)
+
+    def dispatch(self, frame: can.Message):
+        """
+        Route a received frame to the oldest matching pending request
+        """
+        for listener in self._listeners:
+            try:
+                listener(frame)
+            except Exception:
+                logger.exception("Error in CAN frame listener")
+        if frame.is_remote_frame or frame.is_error_frame:
+            return
+        key: Tuple[int, int] = extract_node_message_id(frame.arbitration_id)
+        with self._lock:
+            futures = self._pending.get(key)
+            future = None
+            while futures:
+                candidate = futures.popleft()
+                if candidate.set_running_or_notify_cancel():
+                    future = candidate
+                    break
+        if future:
+            future.set_result(frame.data)
+        else:
+            self.unexpected += 1
+            logger.debug(
+                "Ignoring unexpected frame from Node: {}, Endpoint: {}".format(
+                    *[hex(v) for v in key]
+                )
+            )
+
+    def _run(self):
+        while self._running:
+            try:
+                frame: can.Message = self.bus.recv(timeout=self.poll_timeout)
+            except can.CanError as e:
+                logger.error(str(e))
+                continue
+            except Exception:
+                # The bus has most likely been shut down
+                logger.exception("CAN dispatcher stopped")
+                self._running = False
+                break
+            if frame:
+                self.dispatch(frame)
@@ -15,7 +15,6 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 '''
 from typing import Dict
 from tinymovr.codec import DataType
-from tinymovr.units import get_registry
 
 can_endpoints: Dict[str, Dict] = {
     "offset_dir":
@@ -113,7 +112,8 @@ can_endpoints: Dict[str, Dict] = {
         "types": (DataType.FLOAT, DataType.INT16, DataType.INT16),
         "units": ("tick", "decatick/second", "centiampere"),
         "defaults": {"velocity_ff": 0, "current_ff": 0},
-        "labels": ("position", "velocity_ff", "current_ff")
+        "labels": ("position", "velocity_ff", "current_ff"),
+        "fail_fast": True
     },
     "set_vel_setpoint":
     {
@@ -123,7 +123,8 @@ can_endpoints: Dict[str, Dict] = {
         "types": (DataType.FLOAT, DataType.FLOAT),
         "units": ("tick/second", "ampere"),
         "defaults": {"current_ff": 0},
-        "labels": ("velocity", "current_ff")
+        "labels": ("velocity", "current_ff"),
+        "fail_fast": True
     },
     "set_cur_setpoint":
     {
@@ -132,7 +133,8 @@ can_endpoints: Dict[str, Dict] = {
         "ep_id": 0x00E,
         "types": (DataType.FLOAT,),
         "units": ("ampere",),
-        "labels": ("current",)
+        "labels": ("current",),
+        "fail_fast": True
     },
     "set_limits":
     {
@@ -333,7 +335,8 @@ for velocity-limited plan moves",
         "types": (DataType.FLOAT, DataType.FLOAT),
         "units": ("tick", "tick/second"),
         "defaults": {"velocity_ff": 0},
-        "labels": ("position", "velocity_ff")
+        "labels": ("position", "velocity_ff"),
+        "fail_fast": True
     },
     "get_set_pos_vel_Iq":
     {
@@ -343,7 +346,8 @@ for velocity-limited plan moves",
         "types": (DataType.FLOAT, DataType.INT16, DataType.INT16),
         "units": ("tick", "decatick/second", "centiampere"),
         "defaults": {"velocity_ff": 0, "current_ff": 0},
-        "labels": ("position", "velocity_ff", "current_ff")
+        "labels": ("position", "velocity_ff", "current_ff"),
+        "fail_fast": True
     },
     "motor_RL":
     {
@@ -377,3 +381,4 @@ for velocity-limited plan moves",
         "labels": ("s0", "s1", "s2", "s3", "s4", "s5", "s6", "s7", "current")
     },
 }
+
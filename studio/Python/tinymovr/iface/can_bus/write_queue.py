@@ -0,0 +1,119 @@
+""" Tinymovr CAN write queue module.
+
+This module includes a queue that coalesces pending writes per
+(node id, endpoint id), keeping only the latest payload, and flushes
+them to the bus at a fixed rate from a background thread. High-rate
+control code can thus enqueue setpoints without blocking on the bus,
+and stale setpoints are never sent.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Tuple
+import can
+
+from tinymovr.iface.can_bus.can_bus import create_frame
+
+
+logger = logging.getLogger("tinymovr")
+
+
+class WriteQueue:
+    """
+    Coalesces writes per node and endpoint and flushes
+    them to the bus at a fixed rate. If lock is given, it
+    is held while sending each frame.
+    """
+
+    def __init__(
+        self, bus: can.BusABC, rate_hz: float = 1000.0, lock: threading.Lock = None
+    ):
+        self.bus: can.BusABC = bus
+        self.send_lock: threading.Lock = lock or threading.Lock()
+        self.period: float = 1.0 / rate_hz
+        self._pending: Dict[Tuple[int, int], bytearray] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._running: bool = False
+        self._thread: threading.Thread = None
+
+    def start(self):
+        """
+        Start the flushing thread
+        """
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="tinymovr-write-queue", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the flushing thread, sending any pending writes
+        """
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def put(self, node_id: int, endpoint_id: int, payload: bytearray):
+        """
+        Queue a write, replacing any pending write to
+        the same node and endpoint
+        """
+        with self._lock:
+            self._pending[(node_id, endpoint_id)] = payload
+
+    def flush(self) -> int:
+        """
+        Send all pending writes and return their number. If sending
+        fails, the writes not sent are queued again, unless replaced
+        by newer writes in the meantime, and the error is raised.
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+        items = list(pending.items())
+        for index, ((node_id, endpoint_id), payload) in enumerate(items):
+            rtr: bool = False if payload and len(payload) else True
+            frame: can.Message = create_frame(node_id, endpoint_id, rtr, payload)
+            try:
+                with self.send_lock:
+                    self.bus.send(frame)
+            except Exception:
+                with self._lock:
+                    for key, unsent in items[index:]:
+                        self._pending.setdefault(key, unsent)
+                raise
+        return len(items)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _run(self):
+        next_time: float = time.perf_counter()
+        while self._running:
+            try:
+                self.flush()
+            except Exception as e:
+                # Writes not sent are queued again, so keep running
+                logger.error("Write queue failed to send: {}".format(e))
+            next_time += self.period
+            delay: float = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind, do not try to catch up
+                next_time = time.perf_counter()
@@ -1,8 +1,13 @@
 
+from concurrent.futures import Future
 from tinymovr.codec import Codec
 from typing import Dict
 
 
+# Default time to wait for a response, in seconds
+DEFAULT_TIMEOUT: float = 0.1
+
+
 class IFace:
 
     def get_codec(self) -> Codec:
@@ -14,5 +19,40 @@ class IFace:
     def send(self, node_id: int, endpoint_id: int, payload: bytearray):
         raise NotImplementedError()
 
-    def receive(self, node_id: int, endpoint_id: int, timeout: float=0.05):
+    def enqueue(self, node_id: int, endpoint_id: int, payload: bytearray=None):
+        '''
+        Queue a write, if supported by the interface,
+        otherwise send it immediately
+        '''
+        self.send(node_id, endpoint_id, payload)
+
+    def receive(self, node_id: int, endpoint_id: int, timeout: float=DEFAULT_TIMEOUT):
         raise NotImplementedError()
+
+    def request(self, node_id: int, endpoint_id: int, payload: bytearray=None, timeout: float=DEFAULT_TIMEOUT):
+        '''
+        Send a request and return the response payload
+        '''
+        self.send(node_id, endpoint_id, payload)
+        return self.receive(node_id, endpoint_id, timeout)
+
+    def request_async(self, node_id: int, endpoint_id: int, payload: bytearray=None) -> Future:
+        '''
+        Send a request and return a future of the response payload.
+        Interfaces that cannot have multiple requests in flight
+        complete the request before returning.
+        '''
+        future: Future = Future()
+        try:
+            future.set_result(self.request(node_id, endpoint_id, payload))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def cancel(self, node_id: int, endpoint_id: int, future: Future):
+        '''
+        Cancel a request issued with request_async(), e.g. after it
+        has timed out, so that a late response is not matched to
+        a later request
+        '''
+        future.cancel()
@@ -0,0 +1,2 @@
+from tinymovr.iface.uart.endpoints import uart_endpoints
+from tinymovr.iface.uart.uart import UARTIface
@@ -0,0 +1,87 @@
+''' Tinymovr UART endpoints definitions module.
+
+This module maps Tinymovr endpoints to the commands of the firmware
+UART protocol (firmware/src/uart/uart_interface.c). Each command is a
+single character, sent as ".<command>\\n" to read a value, or as
+".<command><value>\\n" to write one. Values are integers, scaled by
+the factors of the firmware configuration (firmware/src/config.h).
+
+Endpoints that have no UART equivalent are not mapped, and endpoint
+fields without a UART command must be left at their default (zero).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+'''
+from typing import Dict
+from tinymovr.constants import ControlStates, ControlModes
+
+UART_BAUD_RATE: int = 115200
+
+# Scaling factors of firmware/src/config.h
+UART_I_SCALING_FACTOR: float = 1000.0
+UART_R_SCALING_FACTOR: float = 1000.0
+UART_L_SCALING_FACTOR: float = 1000.0
+UART_VEL_GAIN_SCALING_FACTOR: float = 1000000.0
+UART_V_SCALING_FACTOR: float = 1000.0
+
+# Commands changing the controller state. These are sent
+# as reads, i.e. without a value, and respond with zero.
+state_commands: Dict[int, str] = {
+    ControlStates.Idle: "Z",
+    ControlStates.Calibration: "Q",
+    ControlStates.ClosedLoopControl: "A",
+}
+
+# Setpoint commands, which also set the control mode
+mode_commands: Dict[int, str] = {
+    ControlModes.CurrentControl: "I",
+    ControlModes.VelocityControl: "V",
+    ControlModes.PositionControl: "P",
+}
+
+# Endpoint name -> UART commands. "read" maps each endpoint field,
+# in order, to a command and the factor of its value. "write" maps
+# endpoint fields to commands and factors, in the order commands are
+# sent; fields that are omitted must be zero. "command" maps an
+# endpoint to a command without a value, and "respond" tells whether
+# the firmware responds to it.
+uart_endpoints: Dict[str, Dict] = {
+    "encoder_estimates": {"read": (("p", 1.0), ("v", 1.0))},
+    "setpoints": {"read": (("P", 1.0), ("V", 1.0))},
+    "Iq": {"read": (("I", UART_I_SCALING_FACTOR), ("i", UART_I_SCALING_FACTOR))},
+    "Vbus": {"read": (("b", UART_V_SCALING_FACTOR),)},
+    "gains": {"read": (("Y", 1.0), ("F", UART_VEL_GAIN_SCALING_FACTOR))},
+    "motor_RL": {"read": (("H", UART_R_SCALING_FACTOR), ("L", UART_L_SCALING_FACTOR))},
+    "can_config": {"read": (("C", 1.0), ("U", 1.0))},
+    "set_pos_setpoint": {"write": (("position", "P", 1.0),)},
+    "set_vel_setpoint": {"write": (("velocity", "V", 1.0),)},
+    "set_cur_setpoint": {"write": (("current", "I", UART_I_SCALING_FACTOR),)},
+    "set_gains": {
+        "write": (("position", "Y", 1.0), ("velocity", "F", UART_VEL_GAIN_SCALING_FACTOR))
+    },
+    "set_motor_RL": {
+        "write": (("R", "H", UART_R_SCALING_FACTOR), ("L", "L", UART_L_SCALING_FACTOR))
+    },
+    # A zero baud rate leaves the baud rate unchanged, as over CAN
+    "set_can_config": {"write": (("id", "C", 1.0), ("baud_rate", "U", 1.0))},
+    "set_max_plan_acc_dec": {"write": (("max_accel", ">", 1.0), ("max_decel", "<", 1.0))},
+    # The velocity limit of the plan is set before the plan is started
+    "plan_v_limit": {"write": (("max_vel", "^", 1.0), ("target_position", "T", 1.0))},
+    # The state endpoint is handled by the interface, using
+    # state_commands and mode_commands
+    "set_state": {},
+    "reset": {"command": "R", "respond": False},
+    "save_config": {"command": "S", "respond": True},
+    "erase_config": {"command": "X", "respond": True},
+    # The UART protocol cannot read device info, which
+    # is therefore answered by the interface itself
+    "device_info": {},
+    "min_studio_version": {},
+}
@@ -0,0 +1,325 @@
+""" Tinymovr UART interface module.
+
+This module includes the UARTIface class, which implements the
+interface over a serial port, using the UART protocol of the firmware.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Deque, Dict, List, Sequence, Tuple
+import serial
+
+from tinymovr.iface import IFace
+from tinymovr.iface.iface import DEFAULT_TIMEOUT
+from tinymovr.iface.can_bus import can_endpoints
+from tinymovr.iface.uart.endpoints import (
+    UART_BAUD_RATE,
+    mode_commands,
+    state_commands,
+    uart_endpoints,
+)
+from tinymovr.codec import MultibyteCodec, compile_codec
+
+
+logger = logging.getLogger("tinymovr")
+
+
+class UARTIface(IFace):
+    """
+    Class implementing an interface over the UART port of a single
+    Tinymovr, e.g. for bench setups without a CAN adapter. The port is
+    the name or URL of a serial port, e.g. "/dev/ttyUSB0", or an open
+    serial.Serial instance. Node ids are ignored.
+
+    Endpoints are translated to UART commands, as mapped in
+    tinymovr.iface.uart.endpoints, so that the interface can be used
+    with the Tinymovr class:
+
+        tm = Tinymovr(node_id=1, iface=UARTIface("/dev/ttyUSB0"))
+
+    Responses are read by a background thread and matched to requests
+    in order, so that commands are sent without waiting for previous
+    responses, as long as no more than max_in_flight responses are
+    pending. The firmware has a single transmit buffer, which is
+    overwritten by each response, thus max_in_flight should only be
+    raised for firmware that queues responses. Writes, which have no
+    response, are never held back. Requests that time out discard all
+    pending responses, so that later responses are not mismatched.
+
+    The UART protocol has no device information command, thus device
+    info is answered by the interface, with the firmware version
+    given (by default, the minimum version supported).
+    """
+
+    def __init__(
+        self,
+        port,
+        baudrate: int = UART_BAUD_RATE,
+        max_in_flight: int = 1,
+        fw_version: str = None,
+    ):
+        if isinstance(port, str):
+            port = serial.serial_for_url(port, baudrate=baudrate, timeout=0.05)
+        self.serial = port
+        self.max_in_flight: int = max_in_flight
+        if fw_version is None:
+            # Imported here to avoid circular imports
+            from tinymovr.tinymovr import min_fw_version
+
+            fw_version = min_fw_version
+        major, minor, patch = (int(v) for v in fw_version.split("."))
+        self._local_responses: Dict[str, Tuple] = {
+            "device_info": (0, major, minor, patch, 0),
+            "min_studio_version": (0, 0, 0),
+        }
+        self._ep_map: Dict[str, Dict] = {
+            name: can_endpoints[name] for name in uart_endpoints
+        }
+        self._names: Dict[int, str] = {
+            ep["ep_id"]: name for name, ep in self._ep_map.items()
+        }
+        self._codec: MultibyteCodec = MultibyteCodec()
+        self._local: threading.local = threading.local()
+        # Guards the pending futures and writes to the port, so
+        # that futures are in the order of their commands
+        self._condition: threading.Condition = threading.Condition()
+        self._pending: Deque[Future] = deque()
+        self._running: bool = True
+        self._thread: threading.Thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def get_codec(self):
+        return self._codec
+
+    def get_ep_map(self) -> Dict:
+        return self._ep_map
+
+    def send(self, node_id: int, endpoint_id: int, payload: bytearray = None):
+        name: str = self._name(endpoint_id)
+        if "w" in self._ep_map[name]["type"]:
+            self._write(name, payload)
+        else:
+            future: Future = self.request_async(node_id, endpoint_id, payload)
+            try:
+                self._awaiting[endpoint_id].append(future)
+            except KeyError:
+                self._awaiting[endpoint_id] = deque((future,))
+
+    def receive(self, node_id: int, endpoint_id: int, timeout: float = DEFAULT_TIMEOUT):
+        futures: Deque[Future] = self._awaiting.get(endpoint_id)
+        if not futures:
+            # Nothing is received without a request
+            raise TimeoutError()
+        return self._wait(futures.popleft(), timeout)
+
+    def request(
+        self, node_id: int, endpoint_id: int, payload: bytearray = None, timeout: float = DEFAULT_TIMEOUT
+    ):
+        return self._wait(self.request_async(node_id, endpoint_id, payload), timeout)
+
+    def request_async(
+        self, node_id: int, endpoint_id: int, payload: bytearray = None
+    ) -> Future:
+        name: str = self._name(endpoint_id)
+        ep: Dict = self._ep_map[name]
+        future: Future = Future()
+        if name in self._local_responses:
+            future.set_result(self._codec.serialize(self._local_responses[name], *ep["types"]))
+        elif "w" in ep["type"]:
+            self._write(name, payload)
+            future.set_result(None)
+        else:
+            commands: Sequence[Tuple[str, float]] = uart_endpoints[name]["read"]
+            codec = compile_codec(*ep["types"])
+            scales: List[float] = [scale for _, scale in commands]
+            _gather(
+                [self._command(command) for command, _ in commands],
+                future,
+                lambda values: codec.serialize([v / s for v, s in zip(values, scales)]),
+            )
+        return future
+
+    def cancel(self, node_id: int, endpoint_id: int, future: Future):
+        # Responses are matched in order, thus pending
+        # responses are discarded, as on timeout
+        if future.cancel():
+            with self._condition:
+                self._discard()
+
+    def close(self):
+        """
+        Stop the reader thread and close the port
+        """
+        self._running = False
+        # Closing the port interrupts a pending read
+        self.serial.close()
+        self._thread.join()
+
+    def _name(self, endpoint_id: int) -> str:
+        try:
+            return self._names[endpoint_id]
+        except KeyError:
+            raise ValueError(
+                "Endpoint {} is not supported over UART".format(hex(endpoint_id))
+            ) from None
+
+    def _write(self, name: str, payload: bytearray):
+        ep: Dict = self._ep_map[name]
+        values: Dict = {}
+        if "types" in ep:
+            values = dict(zip(ep["labels"], self._codec.deserialize(payload, *ep["types"])))
+        mapping: Dict = uart_endpoints[name]
+        if name == "set_state":
+            self._set_state(values["state"], values["mode"])
+        elif "command" in mapping:
+            self._command(mapping["command"], respond=mapping["respond"])
+        else:
+            written: List[str] = [label for label, _, _ in mapping["write"]]
+            unsupported: List[str] = [
+                label for label, value in values.items() if value and label not in written
+            ]
+            if unsupported:
+                raise ValueError(
+                    "{} of {} cannot be set over UART".format(", ".join(unsupported), name)
+                )
+            for label, command, scale in mapping["write"]:
+                if name == "set_can_config" and label == "baud_rate" and not values[label]:
+                    continue
+                self._command(command, int(round(values[label] * scale)))
+
+    def _set_state(self, state: int, mode: int):
+        """
+        Set the controller state and, in closed loop, the control
+        mode, by setting the current setpoint of the mode again
+        """
+        try:
+            self._command(state_commands[state])
+            if state == 2:
+                command: str = mode_commands[mode]
+        except KeyError:
+            raise ValueError(
+                "State {} and mode {} cannot be set over UART".format(state, mode)
+            ) from None
+        if state == 2:
+            self._command(command, self._wait(self._command(command), DEFAULT_TIMEOUT))
+
+    def _command(self, command: str, value: int = None, respond: bool = None) -> Future:
+        """
+        Send a command, and return a future of its response, if any.
+        Commands without a value respond, unless respond is False.
+        """
+        if respond is None:
+            respond = value is None
+        message: bytes = ".{}{}\n".format(command, "" if value is None else value).encode("ascii")
+        with self._condition:
+            future: Future = None
+            if respond:
+                if not self._condition.wait_for(
+                    lambda: len(self._pending) < self.max_in_flight, DEFAULT_TIMEOUT
+                ):
+                    self._discard()
+                future = Future()
+                self._pending.append(future)
+            self.serial.write(message)
+        return future
+
+    def _read_loop(self):
+        buffer: bytearray = bytearray()
+        while self._running:
+            try:
+                data: bytes = self.serial.read(self.serial.in_waiting or 1)
+            except (serial.SerialException, OSError, TypeError) as e:
+                if not self._running:
+                    return
+                logger.error("UART read failed: {}".format(e))
+                with self._condition:
+                    while self._pending:
+                        self._pending.popleft().set_exception(e)
+                    self._condition.notify_all()
+                return
+            if not data:
+                continue
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            buffer = bytearray(buffer)
+            for line in lines:
+                self._respond(line)
+
+    def _respond(self, line: bytes):
+        with self._condition:
+            if not self._pending:
+                logger.warning(
+                    "Unexpected UART response: {!r}".format(line)
+                )
+                return
+            future: Future = self._pending.popleft()
+            self._condition.notify_all()
+        try:
+            future.set_result(int(line))
+        except ValueError:
+            future.set_exception(IOError("Invalid UART response: {!r}".format(line)))
+
+    def _discard(self):
+        """
+        Fail all pending requests and drop any received data,
+        so that late responses are not matched to new requests
+        """
+        while self._pending:
+            self._pending.popleft().set_exception(TimeoutError())
+        self.serial.reset_input_buffer()
+        self._condition.notify_all()
+
+    def _wait(self, future: Future, timeout: float):
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._condition:
+                self._discard()
+            raise TimeoutError()
+
+    @property
+    def _awaiting(self) -> Dict[int, Deque[Future]]:
+        """
+        Futures of requests sent by send() in the current thread,
+        awaiting a receive() call
+        """
+        try:
+            return self._local.awaiting
+        except AttributeError:
+            self._local.awaiting = {}
+            return self._local.awaiting
+
+
+def _gather(futures: List[Future], result: Future, convert: Callable):
+    """
+    Complete the result future with the converted values
+    of a list of futures, once all have completed
+    """
+    remaining: List[int] = [len(futures)]
+    lock: threading.Lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] or result.cancelled():
+                return
+        for future in futures:
+            if future.exception():
+                result.set_exception(future.exception())
+                return
+        result.set_result(convert([future.result() for future in futures]))
+
+    for future in futures:
+        future.add_done_callback(done)
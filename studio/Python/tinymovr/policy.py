@@ -0,0 +1,147 @@
+""" Tinymovr call policy module.
+
+This module includes the CallPolicy class, which defines how endpoint
+calls wait for responses and recover from failures: the timeout of each
+attempt, the number of retries and the backoff between them, and an
+overall deadline. Policies are set per Tinymovr instance and optionally
+per endpoint.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+import asyncio
+from typing import Any, Callable, Dict, Tuple, Type
+from tinymovr.iface.iface import DEFAULT_TIMEOUT
+
+
+class CallPolicy:
+    """
+    Timeout and retry policy of endpoint calls, e.g.:
+
+        policy = CallPolicy(timeout=0.01, retries=2, backoff=0.001, deadline=0.05)
+
+    Each attempt waits up to timeout seconds for a response. Failed
+    attempts raising one of the retry_on exceptions are retried up to
+    retries times, sleeping backoff seconds before the first retry,
+    multiplied by backoff_factor before each subsequent one. If a
+    deadline is given, the call fails once deadline seconds have
+    passed since the first attempt, regardless of retries left.
+
+    Policies apply to reads (and read-write endpoints) only, as writes
+    have no response to wait for, and are thus never retried.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = 0,
+        backoff: float = 0.0,
+        backoff_factor: float = 2.0,
+        deadline: float = None,
+        retry_on: Tuple[Type[Exception], ...] = (TimeoutError,),
+    ):
+        self.timeout: float = timeout
+        self.retries: int = retries
+        self.backoff: float = backoff
+        self.backoff_factor: float = backoff_factor
+        self.deadline: float = deadline
+        self.retry_on: Tuple[Type[Exception], ...] = retry_on
+
+    def replace(self, **kwargs) -> "CallPolicy":
+        """
+        Return a copy of the policy with some values replaced
+        """
+        values: Dict = dict(self.__dict__)
+        values.update(kwargs)
+        return CallPolicy(**values)
+
+    def call(self, function: Callable[[float], Any], counters=None):
+        """
+        Call function with the timeout of each attempt as argument,
+        retrying according to the policy. Timeouts and retries are
+        counted in the timeouts and retries attributes of counters,
+        if given.
+        """
+        start: float = time.perf_counter()
+        delay: float = self.backoff
+        attempt: int = 0
+        while True:
+            timeout: float = self._attempt_timeout(start)
+            try:
+                return function(timeout)
+            except self.retry_on as e:
+                if counters is not None and isinstance(e, TimeoutError):
+                    counters.timeouts += 1
+                if attempt >= self.retries:
+                    raise
+            attempt += 1
+            if counters is not None:
+                counters.retries += 1
+            if delay > 0:
+                time.sleep(max(0, min(delay, self._remaining(start))))
+                delay *= self.backoff_factor
+
+    async def call_async(self, function: Callable[[float], Any], counters=None):
+        """
+        Await the result of function with the timeout of each
+        attempt as argument, retrying according to the policy
+        """
+        start: float = time.perf_counter()
+        delay: float = self.backoff
+        attempt: int = 0
+        while True:
+            timeout: float = self._attempt_timeout(start)
+            try:
+                return await function(timeout)
+            except self.retry_on as e:
+                if counters is not None and isinstance(e, TimeoutError):
+                    counters.timeouts += 1
+                if attempt >= self.retries:
+                    raise
+            attempt += 1
+            if counters is not None:
+                counters.retries += 1
+            if delay > 0:
+                await asyncio.sleep(max(0, min(delay, self._remaining(start))))
+                delay *= self.backoff_factor
+
+    def _remaining(self, start: float) -> float:
+        if self.deadline is None:
+            return float("inf")
+        return start + self.deadline - time.perf_counter()
+
+    def _attempt_timeout(self, start: float) -> float:
+        remaining: float = self._remaining(start)
+        if remaining <= 0:
+            raise TimeoutError("Call deadline exceeded")
+        return min(self.timeout, remaining)
+
+    def __repr__(self):
+        return "CallPolicy(timeout={}, retries={}, backoff={}, deadline={})".format(
+            self.timeout, self.retries, self.backoff, self.deadline
+        )
+
+
+def endpoint_policy(
+    policy: CallPolicy, policies: Dict[str, CallPolicy], name: str, endpoint: Dict
+) -> CallPolicy:
+    """
+    Resolve the policy of an endpoint: an endpoint-specific policy if
+    given, otherwise the instance policy, without retries if the
+    endpoint is marked as fail_fast (e.g. setpoints, which are better
+    dropped than delivered late)
+    """
+    if policies and name in policies:
+        return policies[name]
+    if endpoint.get("fail_fast") and policy.retries:
+        return policy.replace(retries=0)
+    return policy
@@ -1,8 +1,13 @@
 from tinymovr.presenter.dict_obj import DictObj
 from tinymovr.presenter.state_obj import StateObj
-from tinymovr.presenter.presenters import present_default, present_state, strip_end
+from tinymovr.presenter.presenters import present_default, present_raw, present_state, strip_end
 
 presenter_map = {
     "default": present_default,
     "state": present_state
-}
\ No newline at end of file
+}
+
+raw_presenter_map = {
+    "default": present_raw,
+    "state": present_state
+}
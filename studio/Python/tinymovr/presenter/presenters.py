@@ -1,19 +1,31 @@
-
-from tinymovr.units import get_registry
+from collections import namedtuple
+from tinymovr.units import get_registry, get_unit
 from tinymovr.presenter import DictObj, StateObj
 
-ureg = get_registry()
+_raw_types = {}
 
 
 def present_default(attr, data, endpoint):
     if "units" in endpoint:
-        data  = [v * ureg(u) for v, u in zip (data, endpoint["units"])]
+        Quantity = get_registry().Quantity
+        data  = [Quantity(v, get_unit(u)) for v, u in zip (data, endpoint["units"])]
     if len(data) == 1:    
         return data[0]
     else:
         return DictObj(zip(endpoint["labels"], data))
 
 
+def present_raw(attr, data, endpoint):
+    if len(data) == 1:
+        return data[0]
+    try:
+        raw_type = _raw_types[attr]
+    except KeyError:
+        labels = endpoint["labels"][:len(data)]
+        raw_type = _raw_types[attr] = namedtuple(attr, labels, rename=True)
+    return raw_type(*data)
+
+
 def present_state(attr, data, endpoint):
     return StateObj(data)
 
@@ -21,4 +33,4 @@ def present_state(attr, data, endpoint):
 def strip_end(text, suffix):
     if not text.endswith(suffix):
         return text
-    return text[:len(text)-len(suffix)]
\ No newline at end of file
+    return text[:len(text)-len(suffix)]
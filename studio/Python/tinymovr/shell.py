@@ -14,21 +14,16 @@ Options:
 """
 
 from typing import Dict
+from functools import partial
 import logging
-import pkg_resources
 import can
-import IPython
-from traitlets.config import Config
 from docopt import docopt
 import pynumparser
 from tinymovr import UserWrapper, VersionError
+from tinymovr.tinymovr import get_studio_version
+from tinymovr.group import discover
 from tinymovr.iface import IFace
 from tinymovr.iface.can_bus import CANBus, guess_channel
-try:
-    from tinymovr.plotter import plot
-except ImportError:
-    import warnings
-    warnings.warn('matplotlib not found, please install to enable plotting')
 from tinymovr.units import get_registry
 
 """
@@ -51,7 +46,7 @@ def spawn_shell():
     """
     Spawns the Tinymovr Studio IPython shell.
     """
-    version: str = pkg_resources.require("tinymovr")[0].version
+    version: str = get_studio_version()
     arguments: Dict[str, str] = docopt(__doc__, version=shell_name + " " + str(version))
 
     logger = configure_logging()
@@ -66,21 +61,30 @@ def spawn_shell():
     if channel == "auto":
         channel = guess_channel(bustype_hint=bustype)
     can_bus: can.Bus = can.Bus(bustype=bustype, channel=channel, bitrate=bitrate)
-    iface: IFace = CANBus(can_bus)
+    # Dispatching allows requests to all nodes to be in flight at once
+    iface: IFace = CANBus(can_bus, dispatch=True)
 
     tms: Dict = {}
+    discovered: Dict = discover(
+        iface,
+        node_ids,
+        version_check=do_version_check,
+        # Caching configuration spares the bus from repeated reads,
+        # e.g. by tab completion
+        factory=partial(UserWrapper, cache=True),
+    )
     for node_id in node_ids:
-        try:
-            tm: UserWrapper = UserWrapper(node_id=node_id, iface=iface, version_check=do_version_check)
+        result = discovered.get(node_id)
+        if result is None or isinstance(result, TimeoutError):
+            logger.info("Node {} timed out".format(node_id))
+        elif isinstance(result, VersionError):
+            logger.warning(str(result))
+        elif isinstance(result, Exception):
+            logger.error(str(result))
+        else:
             tm_name: str = base_name + str(node_id)
             logger.info("Connected to {}".format(tm_name))
-            tms[tm_name] = tm
-        except TimeoutError:
-            logger.info("Node {} timed out".format(node_id))
-        except IOError as e:
-            logger.error(str(e))
-        except VersionError as e:
-            logger.warning(str(e))
+            tms[tm_name] = result
 
     if len(tms) == 0:
         logger.error("No Tinymovr instances detected. Exiting shell...")
@@ -90,9 +94,13 @@ def spawn_shell():
         user_ns.update(tms)
         user_ns["tms"] = list(tms.values())
         try:
+            from tinymovr.plotter import plot
+
             user_ns["plot"] = plot
-        except NameError:
-            pass
+        except ImportError:
+            import warnings
+
+            warnings.warn('matplotlib not found, please install to enable plotting')
         user_ns["ureg"] = get_registry()
         print(shell_name + " " + str(version))
         print("Discovered instances: " + tms_discovered)
@@ -103,11 +111,16 @@ is the index starting from 1"
         print("e.g. the first Tinymovr instance will be tm1.")
         print("Instances are also available by index in the tms list.")
 
+        # Imported here, so that importing tinymovr does not import IPython
+        import IPython
+        from traitlets.config import Config
+
         c = Config()
         c.InteractiveShellApp.gui = "tk"
         c.TerminalIPythonApp.display_banner = False
         IPython.start_ipython(argv=[], config=c, user_ns=user_ns)
         logger.debug("Exiting shell...")
+    iface.shutdown()
 
 
 def configure_logging() -> logging.Logger:
@@ -0,0 +1,199 @@
+""" Tinymovr statistics module.
+
+This module includes classes that collect statistics of endpoint calls:
+a compact latency histogram with logarithmic buckets and bounded
+relative error (in the spirit of HDR histograms), and per-endpoint
+counters of calls, bytes and errors. It also includes functions that
+export statistics as Prometheus text or JSON.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+from typing import Dict, List, Sequence
+
+
+# Upper bounds of the buckets of exported histograms, in seconds
+export_buckets: Sequence[float] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25
+)
+
+
+class LatencyHistogram:
+    """
+    Histogram of durations, recorded in microseconds. Durations shorter
+    than 2^precision microseconds are recorded exactly; longer ones are
+    recorded in logarithmic buckets, each power of two being divided in
+    2^(precision - 1) sub-buckets, so that the relative error is below
+    2^(1 - precision) (about 3% for the default precision of 5).
+    """
+
+    def __init__(self, precision: int = 5, max_exponent: int = 40):
+        self.precision: int = precision
+        self._linear: int = 1 << precision
+        self._half: int = 1 << (precision - 1)
+        self.counts: List[int] = [0] * (self._linear + max_exponent * self._half)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.min: float = None
+        self.max: float = None
+
+    def record(self, duration: float):
+        """
+        Record a duration, in seconds
+        """
+        micros: int = int(duration * 1e6 + 0.5)
+        if micros < self._linear:
+            index: int = micros if micros > 0 else 0
+        else:
+            exponent: int = micros.bit_length() - self.precision
+            index = self._linear + (exponent - 1) * self._half + (micros >> exponent) - self._half
+            if index >= len(self.counts):
+                index = len(self.counts) - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += duration
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if self.max is None or duration > self.max:
+            self.max = duration
+
+    def upper_bound(self, index: int) -> float:
+        """
+        Return the upper bound of a bucket, in seconds
+        """
+        if index < self._linear:
+            return (index + 1) * 1e-6
+        exponent, offset = divmod(index - self._linear, self._half)
+        return ((self._half + offset + 1) << (exponent + 1)) * 1e-6
+
+    def percentile(self, percent: float) -> float:
+        """
+        Return an estimate of a percentile of the recorded
+        durations, in seconds, or None if none were recorded
+        """
+        if not self.count:
+            return None
+        rank: float = self.count * percent / 100.0
+        cumulative: int = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if count and cumulative >= rank:
+                if index == len(self.counts) - 1:
+                    return self.max
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def cumulative(self, bounds: Sequence[float]) -> List[int]:
+        """
+        Return the number of durations up to each of a
+        sequence of increasing bounds, in seconds
+        """
+        counts: List[int] = []
+        cumulative: int = 0
+        index: int = 0
+        for bound in bounds:
+            while index < len(self.counts) and self.upper_bound(index) <= bound + 1e-12:
+                cumulative += self.counts[index]
+                index += 1
+            counts.append(cumulative)
+        return counts
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else None
+
+    def clear(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+
+class EndpointStats:
+    """
+    Statistics of the calls to a single endpoint
+    """
+
+    def __init__(self):
+        self.calls: int = 0
+        self.bytes_sent: int = 0
+        self.bytes_received: int = 0
+        self.timeouts: int = 0
+        self.retries: int = 0
+        self.mismatches: int = 0
+        self.latency: LatencyHistogram = LatencyHistogram()
+
+    def as_dict(self) -> Dict:
+        """
+        Return a summary of the statistics as a dictionary,
+        with latencies in seconds
+        """
+        return {
+            "calls": self.calls,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "mismatches": self.mismatches,
+            "latency": {
+                "mean": self.latency.mean,
+                "min": self.latency.min,
+                "p50": self.latency.percentile(50),
+                "p90": self.latency.percentile(90),
+                "p99": self.latency.percentile(99),
+                "max": self.latency.max,
+            },
+        }
+
+
+def to_json(stats: Dict[str, EndpointStats], **kwargs) -> str:
+    """
+    Export endpoint statistics as JSON
+    """
+    return json.dumps({name: s.as_dict() for name, s in stats.items()}, **kwargs)
+
+
+def to_prometheus(
+    stats: Dict[str, EndpointStats], node_id: int, prefix: str = "tinymovr"
+) -> str:
+    """
+    Export endpoint statistics in the Prometheus text format
+    """
+    counters = (
+        ("calls", "Endpoint calls"),
+        ("bytes_sent", "Payload bytes sent"),
+        ("bytes_received", "Payload bytes received"),
+        ("timeouts", "Endpoint call timeouts"),
+        ("retries", "Endpoint call retries"),
+        ("mismatches", "Responses with unexpected ids"),
+    )
+    lines: List[str] = []
+    for attr, description in counters:
+        metric: str = "{}_{}_total".format(prefix, attr)
+        lines.append("# HELP {} {}".format(metric, description))
+        lines.append("# TYPE {} counter".format(metric))
+        for name, s in stats.items():
+            lines.append(
+                '{}{{node="{}",endpoint="{}"}} {}'.format(metric, node_id, name, getattr(s, attr))
+            )
+    metric = "{}_latency_seconds".format(prefix)
+    lines.append("# HELP {} Endpoint call round-trip latency".format(metric))
+    lines.append("# TYPE {} histogram".format(metric))
+    for name, s in stats.items():
+        labels: str = 'node="{}",endpoint="{}"'.format(node_id, name)
+        for bound, count in zip(export_buckets, s.latency.cumulative(export_buckets)):
+            lines.append('{}_bucket{{{},le="{}"}} {}'.format(metric, labels, bound, count))
+        lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(metric, labels, s.latency.count))
+        lines.append("{}_sum{{{}}} {}".format(metric, labels, s.latency.total))
+        lines.append("{}_count{{{}}} {}".format(metric, labels, s.latency.count))
+    return "\n".join(lines) + "\n"
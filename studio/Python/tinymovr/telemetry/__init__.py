@@ -0,0 +1,3 @@
+from tinymovr.telemetry.ring_buffer import RingBuffer
+from tinymovr.telemetry.stream import TelemetryStream
+from tinymovr.telemetry.recorder import TelemetryRecorder, TelemetryLog
@@ -0,0 +1,267 @@
+""" Tinymovr telemetry recorder module.
+
+This module includes a recorder that appends raw CAN frames to a compact
+binary log, and a reader that memory-maps the log and decodes endpoint
+values lazily, and in a vectorized manner, into NumPy arrays.
+
+The log consists of a 16-byte header followed by fixed-size 24-byte
+records (timestamp, arbitration id, dlc, flags, data). Since records
+have a fixed size, a log that was not closed properly (e.g. after a
+crash) remains readable up to the last complete record. On close, the
+recorder writes an index of the records of each arbitration id to a
+sidecar file (<path>.idx.npz). The reader uses the index if it is
+up to date, and rebuilds it in memory otherwise.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import struct
+import threading
+from typing import Dict, Tuple
+import numpy as np
+import can
+
+from tinymovr.codec.vectorized import decode_payloads
+from tinymovr.iface.can_bus import can_endpoints, create_frame, extract_node_message_id
+from tinymovr.iface.can_bus.can_bus import create_node_id
+
+
+log_magic: bytes = b"TMLOG\x00"
+log_version: int = 1
+
+header_struct: struct.Struct = struct.Struct("<6sHH6x")
+record_struct: struct.Struct = struct.Struct("<dIBBH8s")
+
+record_dtype: np.dtype = np.dtype(
+    [
+        ("timestamp", "<f8"),
+        ("arbitration_id", "<u4"),
+        ("dlc", "u1"),
+        ("flags", "u1"),
+        ("reserved", "<u2"),
+        ("data", "V8"),
+    ]
+)
+
+FLAG_REMOTE: int = 0x01
+FLAG_EXTENDED: int = 0x02
+FLAG_ERROR: int = 0x04
+
+assert record_dtype.itemsize == record_struct.size
+
+
+def index_path(path: str) -> str:
+    return path + ".idx.npz"
+
+
+class TelemetryRecorder:
+    """
+    Appends CAN frames to a binary log, e.g. all frames received
+    by a dispatching CANBus:
+
+        with TelemetryRecorder("run.tmlog", iface.dispatcher):
+            ...
+    """
+
+    def __init__(self, path: str, dispatcher=None, chunk_size: int = 4096):
+        self.path: str = path
+        self.dispatcher = dispatcher
+        self.count: int = 0
+        self._chunk: bytearray = bytearray(chunk_size * record_struct.size)
+        self._offset: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._file.write(header_struct.pack(log_magic, log_version, record_struct.size))
+        if dispatcher:
+            dispatcher.add_listener(self.record)
+
+    def record(self, frame: can.Message):
+        """
+        Append a frame to the log
+        """
+        flags: int = (
+            (FLAG_REMOTE if frame.is_remote_frame else 0)
+            | (FLAG_EXTENDED if frame.is_extended_id else 0)
+            | (FLAG_ERROR if frame.is_error_frame else 0)
+        )
+        with self._lock:
+            record_struct.pack_into(
+                self._chunk,
+                self._offset,
+                frame.timestamp,
+                frame.arbitration_id,
+                frame.dlc,
+                flags,
+                0,
+                bytes(frame.data),
+            )
+            self._offset += record_struct.size
+            self.count += 1
+            if self._offset == len(self._chunk):
+                self._write()
+
+    def flush(self):
+        """
+        Write buffered records to the file
+        """
+        with self._lock:
+            self._write()
+            self._file.flush()
+
+    def close(self):
+        """
+        Stop recording, write remaining records and the index
+        """
+        if self.dispatcher:
+            self.dispatcher.remove_listener(self.record)
+            self.dispatcher = None
+        with self._lock:
+            if self._file.closed:
+                return
+            self._write()
+            self._file.close()
+        TelemetryLog(self.path).save_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write(self):
+        if self._offset:
+            self._file.write(memoryview(self._chunk)[: self._offset])
+            self._offset = 0
+
+
+class TelemetryLog:
+    """
+    Reads a binary log written by TelemetryRecorder. Records are
+    memory-mapped, and endpoint values are decoded on demand, e.g.:
+
+        log = TelemetryLog("run.tmlog")
+        estimates = log.endpoint("encoder_estimates", node_id=1)
+        estimates["timestamp"], estimates["position"]
+    """
+
+    def __init__(self, path: str, ep_map: Dict = can_endpoints):
+        self.path: str = path
+        self.ep_map: Dict = ep_map
+        with open(path, "rb") as f:
+            magic, version, record_size = header_struct.unpack(f.read(header_struct.size))
+        if magic != log_magic or record_size != record_dtype.itemsize:
+            raise IOError("{} is not a Tinymovr telemetry log".format(path))
+        if version > log_version:
+            raise IOError("Unsupported log version {}".format(version))
+        count: int = (os.path.getsize(path) - header_struct.size) // record_dtype.itemsize
+        self.records: np.ndarray = (
+            np.memmap(path, dtype=record_dtype, mode="r", offset=header_struct.size, shape=(count,))
+            if count > 0
+            else np.empty(0, dtype=record_dtype)
+        )
+        self._index: Dict[int, np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def index(self) -> Dict[int, np.ndarray]:
+        """
+        Map of arbitration ids to the (ordered) record numbers of frames
+        with that id
+        """
+        if self._index is None:
+            self._index = self._load_index()
+            if self._index is None:
+                self._index = self._build_index()
+        return self._index
+
+    def save_index(self):
+        """
+        Write the index to its sidecar file
+        """
+        index = self._build_index()
+        ids = np.array(list(index.keys()), dtype=np.uint32)
+        lengths = np.array([len(rows) for rows in index.values()], dtype=np.int64)
+        rows = (
+            np.concatenate(list(index.values()))
+            if index
+            else np.empty(0, dtype=np.int64)
+        )
+        with open(index_path(self.path), "wb") as f:
+            np.savez(f, count=len(self), ids=ids, lengths=lengths, rows=rows)
+        self._index = index
+
+    def ids(self) -> Tuple[Tuple[int, int], ...]:
+        """
+        Return the (node id, endpoint id) pairs present in the log
+        """
+        return tuple(extract_node_message_id(int(i)) for i in self.index.keys())
+
+    def rows(self, node_id: int, endpoint_id: int) -> np.ndarray:
+        """
+        Return the record numbers of frames of a node and endpoint
+        """
+        return self.index.get(create_node_id(node_id, endpoint_id), np.empty(0, dtype=np.int64))
+
+    def endpoint(
+        self,
+        ep_name: str,
+        node_id: int,
+        include_remote: bool = False,
+        units: Dict[str, str] = None,
+        as_quantity: bool = False,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Decode the values of an endpoint of a node into a dictionary of
+        columns (timestamp, followed by one column per endpoint label).
+        See decode_payloads for unit conversion.
+        """
+        ep: Dict = self.ep_map[ep_name]
+        records: np.ndarray = self.records[self.rows(node_id, ep["ep_id"])]
+        if not include_remote:
+            records = records[(records["flags"] & FLAG_REMOTE) == 0]
+        columns: Dict[str, np.ndarray] = {"timestamp": records["timestamp"]}
+        columns.update(
+            decode_payloads(records["data"], ep, units=units, as_quantity=as_quantity)
+        )
+        return columns
+
+    def frames(self):
+        """
+        Iterate over all records as python-can messages
+        """
+        for record in self.records:
+            dlc: int = int(record["dlc"])
+            frame: can.Message = create_frame(
+                *extract_node_message_id(int(record["arbitration_id"])),
+                rtr=bool(record["flags"] & FLAG_REMOTE),
+                payload=bytes(record["data"])[:dlc],
+            )
+            frame.timestamp = float(record["timestamp"])
+            yield frame
+
+    def _load_index(self) -> Dict[int, np.ndarray]:
+        try:
+            with np.load(index_path(self.path)) as data:
+                if int(data["count"]) != len(self):
+                    return None
+                rows = np.split(data["rows"], np.cumsum(data["lengths"])[:-1])
+                return dict(zip(data["ids"].tolist(), rows))
+        except (IOError, KeyError, ValueError):
+            return None
+
+    def _build_index(self) -> Dict[int, np.ndarray]:
+        ids: np.ndarray = np.asarray(self.records["arbitration_id"])
+        order: np.ndarray = np.argsort(ids, kind="stable")
+        unique, starts = np.unique(ids[order], return_index=True)
+        return dict(zip(unique.tolist(), np.split(order, starts[1:])))
@@ -0,0 +1,54 @@
+from typing import Sequence
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity ring buffer of rows, backed by a preallocated NumPy
+    array of twice the capacity. Each row is written twice, capacity rows
+    apart, so that the latest rows are always contiguous in memory and
+    can be returned as a view, without copying.
+    """
+
+    def __init__(self, capacity: int, columns: int, dtype=np.float64):
+        self.capacity: int = capacity
+        self._data: np.ndarray = np.zeros((2 * capacity, columns), dtype=dtype)
+        self._index: int = 0
+        self._count: int = 0
+
+    def append(self, row: Sequence):
+        """
+        Append a row, overwriting the oldest one if the buffer is full
+        """
+        i: int = self._index
+        self._data[i] = row
+        self._data[i + self.capacity] = row
+        self._index = (i + 1) % self.capacity
+        self._count += 1
+
+    def latest(self, n: int = None) -> np.ndarray:
+        """
+        Return a read-only view of the latest n rows (or all available
+        rows), oldest first. Rows are only valid until they are
+        overwritten, i.e. for at most capacity - n appends.
+        """
+        available: int = len(self)
+        n = available if n is None else min(n, available)
+        end: int = self._index + self.capacity
+        view: np.ndarray = self._data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def count(self) -> int:
+        """
+        Total number of rows appended since creation
+        """
+        return self._count
+
+    def clear(self):
+        self._index = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
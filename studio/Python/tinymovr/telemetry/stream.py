@@ -0,0 +1,170 @@
+""" Tinymovr telemetry stream module.
+
+This module includes the TelemetryStream class, which periodically
+requests a set of endpoints from a Tinymovr instance in a background
+thread, and writes timestamped samples into preallocated ring buffers.
+Consumers, such as loggers and plotters, read the latest samples
+directly from the buffers, without issuing any bus traffic.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+from tinymovr.telemetry.ring_buffer import RingBuffer
+
+
+logger = logging.getLogger("tinymovr")
+
+
+class TelemetryStream:
+    """
+    Streams endpoint values into ring buffers at a fixed rate, e.g.:
+
+        stream = tm.stream(["encoder_estimates", "Iq", "Vbus"], rate_hz=500)
+        samples = stream.latest("encoder_estimates", 100)
+        t, position, velocity = samples.T
+
+    Each buffer row holds the time of arrival of a response (seconds
+    since the epoch), followed by the endpoint values, without units.
+    Requests of each period are sent back-to-back; responses that have
+    not arrived by the next period are dropped. If the instance is also
+    used by other threads, use an interface with a dispatcher, such as
+    CANBus(bus, dispatch=True).
+    """
+
+    def __init__(
+        self,
+        tinymovr,
+        ep_names: Sequence[str],
+        rate_hz: float = 100.0,
+        capacity: int = 10000,
+    ):
+        self.tinymovr = tinymovr
+        self.period: float = 1.0 / rate_hz
+        self.accessors = [tinymovr.endpoint(name) for name in ep_names]
+        self.buffers: Dict[str, RingBuffer] = {
+            a.name: RingBuffer(capacity, 1 + len(a.endpoint["types"]))
+            for a in self.accessors
+        }
+        self._callbacks = [self._callback(a) for a in self.accessors]
+        self.dropped: int = 0
+        self._inflight: List[Tuple] = []
+        self._running: bool = False
+        self._thread: threading.Thread = None
+
+    def start(self):
+        """
+        Start streaming
+        """
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="tinymovr-telemetry", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop streaming. Buffered samples remain available.
+        """
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._expire()
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def latest(self, ep_name: str, n: int = None) -> np.ndarray:
+        """
+        Return a read-only view of the latest n samples of an endpoint
+        """
+        return self.buffers[ep_name].latest(n)
+
+    def columns(self, ep_name: str) -> Tuple[str, ...]:
+        """
+        Return the column names of an endpoint buffer
+        """
+        endpoint: Dict = self.tinymovr.eps[ep_name]
+        size: int = len(endpoint["types"])
+        labels: Tuple[str, ...] = tuple(endpoint.get("labels", (ep_name,)))
+        return ("time",) + labels[:size]
+
+    def units(self, ep_name: str) -> Tuple[str, ...]:
+        """
+        Return the units of the values of an endpoint buffer
+        """
+        endpoint: Dict = self.tinymovr.eps[ep_name]
+        return ("second",) + tuple(endpoint.get("units", (None,) * len(endpoint["types"])))
+
+    def __getitem__(self, ep_name: str) -> RingBuffer:
+        return self.buffers[ep_name]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _expire(self):
+        # Expired requests are removed from the interface, so that late
+        # responses are not recorded as samples of later requests
+        for accessor, future in self._inflight:
+            if not future.done():
+                accessor.iface.cancel(accessor.node_id, accessor.ep_id, future)
+                if future.cancelled():
+                    self.dropped += 1
+        self._inflight = []
+
+    def _request(self):
+        self._expire()
+        for accessor, callback in zip(self.accessors, self._callbacks):
+            future: Future = accessor.iface.request_async(accessor.node_id, accessor.ep_id)
+            future.add_done_callback(callback)
+            self._inflight.append((accessor, future))
+
+    def _callback(self, accessor):
+        buffer: RingBuffer = self.buffers[accessor.name]
+        codec = accessor.codec
+
+        def on_response(future: Future):
+            if future.cancelled():
+                return
+            if future.exception():
+                self.dropped += 1
+                return
+            buffer.append((time.time(),) + tuple(codec.deserialize(future.result())))
+
+        return on_response
+
+    def _run(self):
+        next_time: float = time.perf_counter()
+        while self._running:
+            try:
+                self._request()
+            except Exception as e:
+                logger.error(str(e))
+            next_time += self.period
+            delay: float = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind, do not try to catch up
+                next_time = time.perf_counter()
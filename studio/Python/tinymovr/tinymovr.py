@@ -14,15 +14,19 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
-import time
 from copy import copy
-import pkg_resources
+from functools import lru_cache
 from packaging import version
 import json
+from typing import Dict, List
 from tinymovr.iface import IFace
-from tinymovr.presenter import presenter_map, strip_end
+from tinymovr.accessors import Accessor, Getter, create_accessor
+from tinymovr.policy import CallPolicy
+from tinymovr.cache import EndpointCache
+from tinymovr.config import read_config, write_config
+from tinymovr.stats import EndpointStats, to_json, to_prometheus
+from tinymovr.presenter import strip_end
 from tinymovr.constants import ControlStates, ControlModes
-from pint import Quantity as _Q
 
 
 min_fw_version = "0.8.15"
@@ -39,87 +43,252 @@ class VersionError(Exception):
         self.required = required
 
 
+def version_string(info) -> str:
+    """
+    Generate a version string from a device_info or
+    min_studio_version endpoint value
+    """
+    return ".".join([str(info.fw_major), str(info.fw_minor), str(info.fw_patch)])
+
+
+@lru_cache(maxsize=None)
+def get_studio_version() -> str:
+    """
+    Get the installed version of Studio, which is
+    looked up once, and cached
+    """
+    try:
+        from importlib.metadata import version as package_version
+    except ImportError:
+        # Python < 3.8, where importing pkg_resources is slow
+        import pkg_resources
+
+        return pkg_resources.require("tinymovr")[0].version
+    return package_version("tinymovr")
+
+
+def check_fw_version(fw_version: str):
+    """
+    Raise a VersionError if the firmware version is older
+    than the minimum required by Studio
+    """
+    if version.parse(fw_version) < version.parse(min_fw_version):
+        raise VersionError(kw="fw", found=fw_version, required=min_fw_version)
+
+
+def check_studio_version(min_studio_version: str):
+    """
+    Raise a VersionError if the Studio version is older
+    than the minimum required by the firmware
+    """
+    studio_version_string = get_studio_version()
+    if version.parse(studio_version_string) < version.parse(min_studio_version):
+        raise VersionError(
+            kw="studio", found=studio_version_string, required=min_studio_version
+        )
+
+
 class Tinymovr:
-    def __init__(self, node_id: int, iface: IFace, version_check=True):
+    def __init__(
+        self,
+        node_id: int,
+        iface: IFace,
+        version_check=True,
+        raw=False,
+        policy: CallPolicy = None,
+        policies: Dict[str, CallPolicy] = None,
+        device_info=None,
+        cache=False,
+    ):
         self.node_id: int = node_id
         self.iface: IFace = iface
         self.eps = self.iface.get_ep_map()
         self.codec = self.iface.get_codec()
+        self._raw: bool = raw
+        self._policy: CallPolicy = policy or CallPolicy()
+        self._policies: Dict[str, CallPolicy] = dict(policies or {})
+        self._stats_enabled: bool = False
+        # Responses of slow-changing endpoints are cached if cache is
+        # True, or a dictionary of endpoint names to time-to-live
+        self.cache: EndpointCache = None
+        if cache:
+            self.cache = EndpointCache(self.eps, None if cache is True else cache)
+        # Accessors are created on first use, as most programs
+        # use a few endpoints of each of many instances
+        self._accessors: Dict[str, Accessor] = {}
 
-        di = self.device_info
-        self.fw_version = ".".join(
-            [str(di.fw_major), str(di.fw_minor), str(di.fw_patch)]
-        )
+        if device_info is None:
+            device_info = self.device_info
+        self.fw_version = version_string(device_info)
         if version_check:
-            # Check FW version
-            if version.parse(self.fw_version) < version.parse(min_fw_version):
-                raise VersionError(
-                    kw="fw", found=self.fw_version, required=min_fw_version
-                )
-            # Check studio version
-            msv = self.min_studio_version
-            msv_str = ".".join(
-                [str(msv.fw_major), str(msv.fw_minor), str(msv.fw_patch)]
-            )
-            studio_version_string = pkg_resources.require("tinymovr")[0].version
-            if version.parse(studio_version_string) < version.parse(msv_str):
-                raise VersionError(
-                    kw="studio", found=studio_version_string, required=msv_str
-                )
+            self.check_versions()
+
+    def check_versions(self):
+        """
+        Check firmware and Studio version compatibility, raising a
+        VersionError if incompatible, e.g. if the check was deferred
+        by creating the instance with version_check=False
+        """
+        check_fw_version(self.fw_version)
+        check_studio_version(version_string(self.min_studio_version))
 
     def __getattr__(self, attr: str):
+        # Only reached when regular attribute lookup fails, i.e. for read
+        # endpoints, and for write endpoints used for the first time, as
+        # write endpoint accessors become instance attributes
+        try:
+            accessor: Accessor = self.__dict__["_accessors"][attr]
+        except KeyError:
+            if attr not in self.__dict__.get("eps", ()):
+                raise AttributeError(
+                    "'{}' object has no attribute '{}'".format(type(self).__name__, attr)
+                ) from None
+            accessor = self._create_accessor(attr)
+        if isinstance(accessor, Getter):
+            return accessor()
+        return accessor
+
+    def _create_accessor(self, ep_name: str) -> Accessor:
+        ep: Dict = self.eps[ep_name]
+        accessor: Accessor = create_accessor(self, ep_name, ep)
+        if self._stats_enabled:
+            accessor.enable_stats()
+        if self.cache is not None:
+            accessor.cache = self.cache
+        self._accessors[ep_name] = accessor
+        if "w" in ep["type"]:
+            setattr(self, ep_name, accessor)
+        return accessor
+
+    @property
+    def raw(self) -> bool:
+        """
+        Whether raw mode is enabled. In raw mode, endpoint values are
+        returned as plain numbers (or named tuples) without units, and
+        setters accept plain numbers without unit conversion.
+        """
+        return self._raw
+
+    @raw.setter
+    def raw(self, raw: bool):
+        self._raw = raw
+        for accessor in self._accessors.values():
+            accessor.set_raw(raw)
+
+    @property
+    def policy(self) -> CallPolicy:
+        """
+        The call policy (timeout, retries, deadline) of endpoints
+        without a policy of their own. Retries do not apply to
+        endpoints marked as fail_fast, such as setpoints.
+        """
+        return self._policy
+
+    @policy.setter
+    def policy(self, policy: CallPolicy):
+        self._policy = policy
+        for accessor in self._accessors.values():
+            accessor.set_policy(policy, self._policies)
+
+    @property
+    def policies(self) -> Dict[str, CallPolicy]:
+        """
+        Call policies of individual endpoints, by endpoint name
+        """
+        return dict(self._policies)
+
+    def set_policy(self, ep_name: str, policy: CallPolicy = None):
+        """
+        Set the call policy of an endpoint, or revert it to the
+        instance policy if policy is None
+        """
+        accessor: Accessor = self.endpoint(ep_name)
+        if policy:
+            self._policies[ep_name] = policy
+        else:
+            self._policies.pop(ep_name, None)
+        accessor.set_policy(self._policy, self._policies)
+
+    def counters(self) -> Dict[str, Dict[str, int]]:
+        """
+        Return the number of timeouts and retries of
+        each endpoint that had any
+        """
+        return {
+            name: {"timeouts": a.timeouts, "retries": a.retries}
+            for name, a in self._accessors.items()
+            if a.timeouts or a.retries
+        }
+
+    def reset_counters(self):
+        for accessor in self._accessors.values():
+            accessor.timeouts = 0
+            accessor.retries = 0
 
-        if attr in self.eps:
-            d = self.eps[attr]
-            ep_type = d["type"]
-
-            if "w" in ep_type:
-                # This is a write or read-write endpoint
-                def wrapper(*args, **kwargs):
-                    assert (
-                        len(args) == 0 or len(kwargs) == 0
-                    ), "Either positional or keyword arguments are supported, not both"
-                    if len(kwargs) > 0:
-                        assert "labels" in d
-                        inputs = [
-                            kwargs[k] if k in kwargs else d["defaults"][k]
-                            for k in d["labels"]
-                        ]
-                    elif len(args) > 0:
-                        inputs = [
-                            args[i] if i < len(args) else d["defaults"][k]
-                            for i, k in enumerate(d["labels"])
-                        ]
-                    else:
-                        inputs = []
-                    if "units" in d:
-                        inputs = [
-                            v.to(d["units"][i]).magnitude if isinstance(v, _Q) else v
-                            for i, v in enumerate(inputs)
-                        ]
-                    payload = None
-                    if len(inputs) > 0:
-                        payload = self.codec.serialize(inputs, *d["types"])
-                    self.iface.send(self.node_id, d["ep_id"], payload=payload)
-                    if "r" in ep_type:
-                        return self.present_response(
-                            attr, d, self.iface.receive(self.node_id, d["ep_id"])
-                        )
-
-                return wrapper
-
-            elif ep_type == "r":
-                # This is a read-type endpoint
-                self.iface.send(self.node_id, d["ep_id"])
-                return self.present_response(
-                    attr, d, self.iface.receive(self.node_id, d["ep_id"])
-                )
-
-    def present_response(self, attr, ep, response):
-        data = self.codec.deserialize(response, *ep["types"])
-        if attr in presenter_map:
-            return presenter_map[attr](attr, data, ep)
-        return presenter_map["default"](attr, data, ep)
+    def enable_stats(self, enabled: bool = True):
+        """
+        Enable or disable collection of per-endpoint call statistics
+        (call counts, bytes, errors and latency histograms)
+        """
+        self._stats_enabled = enabled
+        for accessor in self._accessors.values():
+            accessor.enable_stats(enabled)
+
+    def stats(self) -> Dict[str, EndpointStats]:
+        """
+        Return the statistics of each endpoint that has been called
+        since statistics were enabled
+        """
+        stats: Dict[str, EndpointStats] = {}
+        for name, accessor in self._accessors.items():
+            s: EndpointStats = accessor.stats
+            if s is not None and (s.calls or accessor.timeouts):
+                s.timeouts = accessor.timeouts
+                s.retries = accessor.retries
+                stats[name] = s
+        return stats
+
+    def export_stats(self, format: str = "json") -> str:
+        """
+        Export endpoint statistics as JSON ("json"), or
+        in the Prometheus text format ("prometheus")
+        """
+        if format == "prometheus":
+            return to_prometheus(self.stats(), self.node_id)
+        elif format == "json":
+            return to_json(self.stats())
+        raise ValueError("Unknown format: {}".format(format))
+
+    def endpoint(self, ep_name: str) -> Accessor:
+        """
+        Get the accessor of an endpoint, e.g. for use in control
+        loops, or for raw access to a single endpoint:
+
+            tm.endpoint("encoder_estimates").raw()
+        """
+        try:
+            return self._accessors[ep_name]
+        except KeyError:
+            return self._create_accessor(ep_name)
+
+    def refresh(self, ep_names: List[str] = None):
+        """
+        Drop cached responses of a list of endpoints, or of all
+        endpoints if None, so that they are read again on next use
+        """
+        if self.cache is not None:
+            self.cache.invalidate(ep_names)
+
+    def stream(self, ep_names: List[str], rate_hz: float = 100.0, capacity: int = 10000):
+        """
+        Start streaming a list of endpoints into ring buffers at a
+        fixed rate, and return the TelemetryStream instance
+        """
+        from tinymovr.telemetry import TelemetryStream
+
+        stream = TelemetryStream(self, ep_names, rate_hz, capacity)
+        stream.start()
+        return stream
 
     def calibrate(self):
         self.set_state(ControlStates.Calibration)
@@ -136,76 +305,24 @@ class Tinymovr:
     def current_control(self):
         self.set_state(ControlStates.ClosedLoopControl, ControlModes.CurrentControl)
 
-    def export_config(self, file_path: str):
+    def export_config(self, file_path: str, timeout: float = 1.0):
         """
-        Export the board config to a file
+        Export the board config to a file, reading all
+        config endpoints at once (see tinymovr.config)
         """
-        config_map = {}
-        for ep_name, ep in self.iface.get_ep_map().items():
-            if ep["type"] == "r" and "ser_map" in ep:
-                # Node can be serialized (saved)
-                print("Exporting {}...".format(ep_name))
-                config_map.update(
-                    self._data_from_arguments(getattr(self, ep_name), ep["ser_map"])
-                )
+        config: Dict = read_config([self], timeout)[0]
         with open(file_path, "w") as f:
-            json.dump(config_map, f)
+            json.dump(config, f)
 
-    def restore_config(self, file_path: str):
+    def restore_config(self, file_path: str, timeout: float = 1.0) -> List[str]:
         """
-        Restore the board config from a file
+        Restore the board config from a file, writing only the
+        endpoints whose values differ from the current ones, and
+        return the names of the endpoints written (see tinymovr.config)
         """
         with open(file_path, "r") as f:
-            data = json.load(f)
-        for ep_name, ep in self.iface.get_ep_map().items():
-            if ep["type"] == "w" and "ser_map" in ep:
-                # Node has saved data and can be deserialized (restored)
-                kwargs = self._arguments_from_data(ep["ser_map"], data)
-                if len(kwargs):
-                    f = getattr(self, ep_name)
-                    print("Restoring {}...".format(ep_name))
-                    f(**kwargs)
-                    time.sleep(0.001) #safer to sleep cause setting is async
-
-    # "ser_map": {"can": ("id", "baud_rate")}
-    def _data_from_arguments(self, values, ep_map):
-        """
-        Generate a nested dictionary from a dictionary of values,
-        following the template in ep_map
-        """
-        data = {}
-        for key, value in ep_map.items():
-            if isinstance(value, dict):
-                data[key] = self._data_from_arguments(values, value)
-            elif isinstance(value, tuple):
-                content = {}
-                for k in value:
-                    try:
-                        content[k] = getattr(values, k).magnitude
-                    except AttributeError:
-                        content[k] = getattr(values, k)
-                data[key] = content
-            else:
-                raise TypeError("Map is not a dictionary or tuple")
-        return data
-
-    def _arguments_from_data(self, ep_map, ep_data):
-        """
-        Generate a flat argument dictionary from a nested dictionary
-        containing values for keys in endpoint labels
-        """
-        kwargs = {}
-        if isinstance(ep_map, dict) and isinstance(ep_data, dict):
-            for key, value in ep_map.items():
-                if key in ep_data:
-                    kwargs.update(self._arguments_from_data(value, ep_data[key]))
-        elif isinstance(ep_map, tuple) and isinstance(ep_data, dict):
-            for key in ep_map:
-                if key in ep_data:
-                    kwargs[key] = ep_data[key]
-        else:
-            raise TypeError("Mismatch in passed arguments")
-        return kwargs
+            config: Dict = json.load(f)
+        return write_config([self], [config], timeout)[0]
 
     def __dir__(self):
         eps = list(self.iface.get_ep_map().keys())
@@ -213,7 +330,7 @@ class Tinymovr:
         self_attrs = [
             k
             for k in object.__dir__(self)
-            if not k.startswith("_") and k not in blacklist
+            if not k.startswith("_") and k not in blacklist and k not in eps
         ]
         self_attrs
         return eps + self_attrs
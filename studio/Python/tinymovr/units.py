@@ -1,10 +1,35 @@
-import pint
 
 _registry = None
+_units = {}
 
 def get_registry():
+    '''
+    Get the unit registry, creating it on first use, so that
+    pint is only imported by programs that use units
+    '''
     global _registry
     if not _registry:
+        import pint
         _registry = pint.UnitRegistry()
         _registry.define('tick = turn / 8192')
-    return _registry
\ No newline at end of file
+    return _registry
+
+def get_quantity_type() -> type:
+    '''
+    Get the base class of quantities, e.g. for
+    isinstance() checks
+    '''
+    import pint
+    return pint.Quantity
+
+def get_unit(unit_string):
+    '''
+    Get the unit corresponding to a unit string, such as the ones
+    found in endpoint definitions. Each string is parsed only once,
+    and None maps to dimensionless.
+    '''
+    try:
+        return _units[unit_string]
+    except KeyError:
+        unit = _units[unit_string] = get_registry().Unit(unit_string or "")
+        return unit
@@ -3,7 +3,7 @@ import sys
 import signal
 from time import sleep
 import can
-from tinymovr import Tinymovr
+from tinymovr import Tinymovr, TinymovrGroup
 from tinymovr.iface import IFace
 from tinymovr.iface.can_bus import CANBus, guess_channel
 
@@ -19,9 +19,10 @@ def main():
     can_bus: can.Bus = can.Bus(bustype='slcan',
                                channel=channel,
                                bitrate=1000000)
-    iface: IFace = CANBus(can_bus)
+    iface: IFace = CANBus(can_bus, dispatch=True)
     tm1 = Tinymovr(node_id=1, iface=iface)
     tm2 = Tinymovr(node_id=2, iface=iface)
+    group = TinymovrGroup([tm1, tm2])
 
     assert(tm1.motor_config.flags == 1)
     assert(tm2.motor_config.flags == 1)
@@ -43,8 +44,7 @@ def main():
     offset_2 = tm2.encoder_estimates.position
 
     while True:
-        est_1 = tm1.encoder_estimates
-        est_2 = tm2.encoder_estimates
+        est_1, est_2 = group.read("encoder_estimates")
 
         mean_pos = ((est_1.position - offset_1) + (est_2.position - offset_2)) / 2.0
         mean_vel = (est_1.velocity + est_2.velocity) / 2.0